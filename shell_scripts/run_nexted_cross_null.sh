@@ -35,31 +35,32 @@ fi
 # =========================
 # Run all null assignments
 # =========================
-for IDX in $(seq "$START_IDX" "$END_IDX"); do
-    echo "=================================================================="
-    echo "Running TF-IDF nested null experiment"
-    echo "Dataset       : $DATASET"
-    echo "Log type      : $LOG_TYPE"
-    echo "Model         : $MODEL"
-    echo "Assignment idx: $IDX"
-    echo "n_jobs        : $N_JOBS"
-    echo "=================================================================="
+# One process covers the whole index range: logs are parsed once and every
+# assignment x outer split shares the same worker pool. One CSV is written
+# per assignment, as before.
+echo "=================================================================="
+echo "Running TF-IDF nested null experiment"
+echo "Dataset       : $DATASET"
+echo "Log type      : $LOG_TYPE"
+echo "Model         : $MODEL"
+echo "Assignment idx: ${START_IDX}-${END_IDX}"
+echo "n_jobs        : $N_JOBS"
+echo "=================================================================="
 
-    OUT_CSV="${OUT_DIR}/tfidf_360_nested_${DATASET}_${LOG_TYPE}_${MODEL}_null_idx_${IDX}.csv"
+OUT_CSV="${OUT_DIR}/tfidf_360_nested_${DATASET}_${LOG_TYPE}_${MODEL}_null_idx_{assignment_idx}.csv"
 
-    OMP_NUM_THREADS=1 \
-    MKL_NUM_THREADS=1 \
-    OPENBLAS_NUM_THREADS=1 \
-    NUMEXPR_NUM_THREADS=1 \
-    python -m "$PYTHON_MODULE" \
-        --dataset "$DATASET" \
-        --model "$MODEL" \
-        --log_type "$LOG_TYPE" \
-        --limit_outer "$LIMIT_OUTER" \
-        --n_jobs "$N_JOBS" \
-        --randomize_actor_labels \
-        --assignment_idx "$IDX" \
-        --out_csv "$OUT_CSV"
-done
+OMP_NUM_THREADS=1 \
+MKL_NUM_THREADS=1 \
+OPENBLAS_NUM_THREADS=1 \
+NUMEXPR_NUM_THREADS=1 \
+python -m "$PYTHON_MODULE" \
+    --dataset "$DATASET" \
+    --model "$MODEL" \
+    --log_type "$LOG_TYPE" \
+    --limit_outer "$LIMIT_OUTER" \
+    --n_jobs "$N_JOBS" \
+    --randomize_actor_labels \
+    --assignment_idx "${START_IDX}-${END_IDX}" \
+    --out_csv "$OUT_CSV"
 
-echo "Finished all TF-IDF null runs."
\ No newline at end of file
+echo "Finished all TF-IDF null runs."
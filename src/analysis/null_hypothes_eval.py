@@ -20,18 +20,26 @@ Example:
         --actual-csv ./correct.csv \
         --larger-is-better \
         --output ./mcc_null_plot.pdf
+
+With a results database (see ``src.runners.results_db``), null and observed
+runs are selected by filters and the per-run means are computed in SQL:
+    python -m src.analysis.null_hypothes_eval \
+        --metric test_f1_macro \
+        --db results.db --tool tfidf --dataset WordPress --log-type audit --model svm \
+        --actual-like '%_split_144_%'
 """
 
 from __future__ import annotations
 
 import argparse
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
+from src.core.shared.results_store import ResultsStore
+
 
 def parse_args() -> argparse.Namespace:
     """Parse command-line arguments for null-distribution visualization.
@@ -55,15 +63,33 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument(
         "--null-dir",
-        required=True,
         type=Path,
-        help="Directory containing null-hypothesis CSV files.",
+        default=None,
+        help="Directory containing null-hypothesis CSV files (required without --db).",
     )
     parser.add_argument(
         "--actual-csv",
-        required=True,
         type=Path,
-        help="CSV file containing the correctly labeled run.",
+        default=None,
+        help=(
+            "CSV file containing the correctly labeled run. Required without --db; "
+            "with --db it overrides the observed run selected from the database."
+        ),
+    )
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=None,
+        help="Results database to read instead of --null-dir (see src.runners.results_db).",
+    )
+    parser.add_argument("--tool", default=None, help="With --db: runner/tool name, e.g. tfidf.")
+    parser.add_argument("--dataset", default=None, help="With --db: dataset, e.g. WordPress.")
+    parser.add_argument("--log-type", default=None, help="With --db: log type, e.g. audit.")
+    parser.add_argument("--model", default=None, help="With --db: model name, e.g. svm.")
+    parser.add_argument(
+        "--actual-like",
+        default=None,
+        help="With --db: SQL LIKE pattern on the source path that picks one observed run.",
     )
     parser.add_argument(
         "--output",
@@ -138,11 +164,20 @@ def validate_args(args: argparse.Namespace) -> None:
     The script allows at most one explicit tail mode so the null comparison has
     a single interpretation.
     """
-    if not args.null_dir.exists():
+    if args.db is not None:
+        if not args.db.exists():
+            raise FileNotFoundError(f"Results database does not exist: {args.db}")
+        if args.tool is None:
+            raise ValueError("--db requires --tool")
+        if args.actual_csv is not None and not args.actual_csv.exists():
+            raise FileNotFoundError(f"Actual CSV does not exist: {args.actual_csv}")
+    elif args.null_dir is None or args.actual_csv is None:
+        raise ValueError("--null-dir and --actual-csv are required without --db")
+    elif not args.null_dir.exists():
         raise FileNotFoundError(f"Null directory does not exist: {args.null_dir}")
-    if not args.null_dir.is_dir():
+    elif not args.null_dir.is_dir():
         raise NotADirectoryError(f"Null path is not a directory: {args.null_dir}")
-    if not args.actual_csv.exists():
+    elif not args.actual_csv.exists():
         raise FileNotFoundError(f"Actual CSV does not exist: {args.actual_csv}")
 
     tail_flags = sum([args.larger_is_better, args.smaller_is_better, args.two_sided])
@@ -190,6 +225,61 @@ def collect_null_means(null_dir: Path, glob_pattern: str, metric: str) -> List[T
     return results
 
 
+def db_filters(args: argparse.Namespace) -> Dict[str, Optional[str]]:
+    """Return the results-database run filters given on the command line."""
+    return {
+        "kind": "ml",
+        "tool": args.tool,
+        "dataset": args.dataset,
+        "log_type": args.log_type,
+        "model": args.model,
+    }
+
+
+def collect_null_means_db(
+    store: ResultsStore,
+    metric: str,
+    filters: Dict[str, Optional[str]],
+) -> List[Tuple[Path, float]]:
+    """Collect per-run mean metric values of the null runs in a results database.
+
+    Only runs matching ``filters`` are read, and the means are aggregated in
+    SQL. Raises like the CSV path if no run matches or a run has no values.
+    """
+    results = store.metric_means(metric, null=True, **filters)
+    if not results:
+        raise FileNotFoundError(f"No null runs in {store.path} matching {filters}")
+
+    missing = [run["source"] for run, mean in results if mean is None]
+    if missing:
+        raise ValueError(
+            f"No valid numeric values found for metric '{metric}' in {missing[0]}"
+            + (f" and {len(missing) - 1} more runs" if len(missing) > 1 else "")
+        )
+    return [(Path(run["source"]), float(mean)) for run, mean in results]
+
+
+def read_observed_mean_db(
+    store: ResultsStore,
+    metric: str,
+    filters: Dict[str, Optional[str]],
+    source_like: Optional[str],
+) -> float:
+    """Return the mean metric value of the single observed run matching the filters."""
+    results = store.metric_means(metric, null=False, source_like=source_like, **filters)
+    if len(results) != 1:
+        sources = "\n  ".join(run["source"] for run, _ in results) or "(none)"
+        raise ValueError(
+            f"Expected exactly one observed run in {store.path}, found {len(results)}; "
+            f"narrow the selection with --model or --actual-like:\n  {sources}"
+        )
+    run, mean = results[0]
+    if mean is None:
+        raise ValueError(f"No valid numeric values found for metric '{metric}' in {run['source']}")
+    print(f"Observed run:          {run['source']}")
+    return float(mean)
+
+
 def empirical_p_value(
     null_values: np.ndarray,
     observed: float,
@@ -239,6 +329,8 @@ def make_plot(
     The plot is intentionally compact and single-panel because the goal is to
     compare one observed score against one permutation-based null distribution.
     """
+    import matplotlib.pyplot as plt
+
     rng = np.random.default_rng(seed)
 
     # A single horizontal panel makes the observed-vs-null comparison immediate.
@@ -343,10 +435,22 @@ def main() -> None:
     validate_args(args)
 
     # ---- Load null and observed summary values ----
-    null_results = collect_null_means(args.null_dir, args.glob, args.metric)
-    null_values = np.array([value for _, value in null_results], dtype=float)
+    if args.db is not None:
+        store = ResultsStore(str(args.db))
+        try:
+            filters = db_filters(args)
+            null_results = collect_null_means_db(store, args.metric, filters)
+            if args.actual_csv is not None:
+                observed_value = read_metric_mean(args.actual_csv, args.metric)
+            else:
+                observed_value = read_observed_mean_db(store, args.metric, filters, args.actual_like)
+        finally:
+            store.close()
+    else:
+        null_results = collect_null_means(args.null_dir, args.glob, args.metric)
+        observed_value = read_metric_mean(args.actual_csv, args.metric)
 
-    observed_value = read_metric_mean(args.actual_csv, args.metric)
+    null_values = np.array([value for _, value in null_results], dtype=float)
 
     # Unless specified otherwise, treat larger scores as better and test the right tail.
     p_value = empirical_p_value(
@@ -3,6 +3,8 @@
 
 The script aggregates per-run metric values from matching CSV files, sorts models
 by their mean score, and optionally compares the top three with paired Wilcoxon tests.
+With ``--db`` the observed runs are read from a results database instead (see
+``src.runners.results_db``), filtered by tool, dataset and log type.
 """
 
 from __future__ import annotations
@@ -12,6 +14,8 @@ import csv
 from itertools import combinations
 from pathlib import Path
 
+from src.core.shared.results_store import ResultsStore
+
 
 def find_matching_csvs(results_dir: Path, split_size: int) -> list[Path]:
     """Return result CSVs whose filenames encode the requested split size.
@@ -57,6 +61,35 @@ def load_metric_values(csv_path: Path, metric: str) -> list[float]:
     return values
 
 
+def load_db_rows(
+    store: ResultsStore,
+    split_size: int,
+    metric: str,
+    *,
+    tool: str | None,
+    dataset: str | None,
+    log_type: str | None,
+) -> list[tuple[str, float, list[float]]]:
+    """Load (filename, mean, values) for observed runs in a results database.
+
+    Runs are filtered by tool, dataset and log type in SQL; the split size is
+    matched on the source filename like in the directory mode.
+    """
+    pattern = f"_{split_size}_"
+    rows: list[tuple[str, float, list[float]]] = []
+    for run in store.find_runs(kind="ml", tool=tool, dataset=dataset, log_type=log_type, null=False):
+        name = Path(run["source"]).name
+        if pattern not in name:
+            continue
+        if metric not in run["columns"]:
+            raise ValueError(f"Metric '{metric}' not found in {name}.")
+        values = store.metric_values(run["id"], metric)
+        if not values:
+            raise ValueError(f"Metric '{metric}' has no non-NaN values in {name}.")
+        rows.append((name, compute_mean(values), values))
+    return rows
+
+
 def compute_mean(values: list[float]) -> float:
     return sum(values) / len(values)
 
@@ -289,6 +322,14 @@ def main() -> None:
         default="results",
         help="Directory containing result CSVs (default: results).",
     )
+    parser.add_argument(
+        "--db",
+        default=None,
+        help="Results database to read instead of --results-dir (see src.runners.results_db).",
+    )
+    parser.add_argument("--tool", default=None, help="With --db: runner/tool name, e.g. tfidf.")
+    parser.add_argument("--dataset", default=None, help="With --db: dataset, e.g. WordPress.")
+    parser.add_argument("--log-type", default=None, help="With --db: log type, e.g. audit.")
     parser.add_argument(
         "--ascending",
         action="store_true",
@@ -306,17 +347,35 @@ def main() -> None:
 
     # ---- Load and rank results ----
     results_dir = Path(args.results_dir)
-    csv_paths = find_matching_csvs(results_dir, args.split_size)
-    if not csv_paths:
-        raise ValueError(
-            f"No CSV files found in {results_dir} with _{args.split_size}_ in the filename."
-        )
-
     rows: list[tuple[str, float, list[float]]] = []
-    for csv_path in csv_paths:
-        metric_values = load_metric_values(csv_path, args.metric)
-        mean_value = compute_mean(metric_values)
-        rows.append((csv_path.name, mean_value, metric_values))
+    if args.db is not None:
+        store = ResultsStore(args.db)
+        try:
+            rows = load_db_rows(
+                store,
+                args.split_size,
+                args.metric,
+                tool=args.tool,
+                dataset=args.dataset,
+                log_type=args.log_type,
+            )
+        finally:
+            store.close()
+        if not rows:
+            raise ValueError(
+                f"No observed runs in {args.db} with _{args.split_size}_ in the filename."
+            )
+    else:
+        csv_paths = find_matching_csvs(results_dir, args.split_size)
+        if not csv_paths:
+            raise ValueError(
+                f"No CSV files found in {results_dir} with _{args.split_size}_ in the filename."
+            )
+
+        for csv_path in csv_paths:
+            metric_values = load_metric_values(csv_path, args.metric)
+            mean_value = compute_mean(metric_values)
+            rows.append((csv_path.name, mean_value, metric_values))
 
     rows.sort(key=lambda item: item[1], reverse=not args.ascending)
 
@@ -4,17 +4,22 @@
 For each null CSV, the script keeps only the best-scoring row under a chosen
 metric, compares that distribution against the best row from the correctly
 labeled run, and reports an empirical p-value plus a compact visualization.
+
+Instead of a directory of CSVs, the runs can be read from a results database
+(``--db``, see ``src.runners.results_db``); only runs matching ``--tool``,
+``--dataset`` and ``--log-type`` are loaded.
 """
 from __future__ import annotations
 
 import argparse
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
+from src.core.shared.results_store import ResultsStore
+
 
 METRIC_CHOICES = ["silhouette", "cliffs", "norm_mean_diff"]
 
@@ -46,16 +51,28 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument(
         "--null-dir",
-        required=True,
         type=Path,
-        help="Directory containing null-hypothesis CSV files.",
+        default=None,
+        help="Directory containing null-hypothesis CSV files (required without --db).",
     )
     parser.add_argument(
         "--actual-csv",
-        required=True,
         type=Path,
-        help="CSV file for the correctly labeled run.",
+        default=None,
+        help=(
+            "CSV file for the correctly labeled run. Required without --db; "
+            "with --db it overrides the observed run selected from the database."
+        ),
     )
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=None,
+        help="Results database to read instead of --null-dir (see src.runners.results_db).",
+    )
+    parser.add_argument("--tool", default=None, help="With --db: statistic tool, e.g. one_gram.")
+    parser.add_argument("--dataset", default=None, help="With --db: dataset, e.g. WordPress.")
+    parser.add_argument("--log-type", default=None, help="With --db: log type, e.g. audit.")
     parser.add_argument(
         "--output",
         type=Path,
@@ -112,11 +129,20 @@ def validate_args(args: argparse.Namespace) -> None:
     The script assumes a directory of null CSVs and a single observed CSV,
     so path errors are surfaced before any analysis starts.
     """
-    if not args.null_dir.exists():
+    if args.db is not None:
+        if not args.db.exists():
+            raise FileNotFoundError(f"Results database does not exist: {args.db}")
+        if args.tool is None:
+            raise ValueError("--db requires --tool")
+        if args.actual_csv is not None and not args.actual_csv.exists():
+            raise FileNotFoundError(f"Actual CSV does not exist: {args.actual_csv}")
+    elif args.null_dir is None or args.actual_csv is None:
+        raise ValueError("--null-dir and --actual-csv are required without --db")
+    elif not args.null_dir.exists():
         raise FileNotFoundError(f"Null directory does not exist: {args.null_dir}")
-    if not args.null_dir.is_dir():
+    elif not args.null_dir.is_dir():
         raise NotADirectoryError(f"Null path is not a directory: {args.null_dir}")
-    if not args.actual_csv.exists():
+    elif not args.actual_csv.exists():
         raise FileNotFoundError(f"Actual CSV does not exist: {args.actual_csv}")
 
 
@@ -174,13 +200,16 @@ def extract_best_row_value(csv_path: Path, metric: str) -> Tuple[float, pd.Serie
     Rows with undefined metric values are ignored. The returned row is copied
     and annotated with the derived metric for downstream reporting.
     """
-    df = pd.read_csv(csv_path)
+    return best_row_in_frame(pd.read_csv(csv_path), metric, csv_path)
+
 
+def best_row_in_frame(df: pd.DataFrame, metric: str, source: Path) -> Tuple[float, pd.Series]:
+    """Return the highest valid metric value and its row from one loaded result table."""
     metric_values = compute_metric_series(df, metric)
     valid_mask = metric_values.notna()
 
     if not valid_mask.any():
-        raise ValueError(f"No valid rows for metric '{metric}' in {csv_path}")
+        raise ValueError(f"No valid rows for metric '{metric}' in {source}")
 
     valid_metric_values = metric_values[valid_mask]
     best_idx = valid_metric_values.idxmax()
@@ -214,6 +243,56 @@ def collect_null_best_values(
     return results
 
 
+def db_filters(args: argparse.Namespace) -> Dict[str, Optional[str]]:
+    """Return the results-database run filters given on the command line."""
+    return {
+        "kind": "stats",
+        "tool": args.tool,
+        "dataset": args.dataset,
+        "log_type": args.log_type,
+    }
+
+
+def collect_null_best_values_db(
+    store: ResultsStore,
+    metric: str,
+    filters: Dict[str, Optional[str]],
+) -> List[Tuple[Path, float, pd.Series]]:
+    """Collect the best row of each null run in a results database.
+
+    Runs are selected by ``filters`` in SQL, so only the matching tables are
+    read from the database.
+    """
+    runs = store.find_runs(null=True, **filters)
+    if not runs:
+        raise FileNotFoundError(f"No null runs in {store.path} matching {filters}")
+
+    results: List[Tuple[Path, float, pd.Series]] = []
+    for run in runs:
+        source = Path(run["source"])
+        best_value, best_row = best_row_in_frame(store.run_frame(run["id"]), metric, source)
+        results.append((source, best_value, best_row))
+    return results
+
+
+def observed_best_value_db(
+    store: ResultsStore,
+    metric: str,
+    filters: Dict[str, Optional[str]],
+) -> Tuple[Path, float, pd.Series]:
+    """Return the best row of the single observed run matching ``filters``."""
+    runs = store.find_runs(null=False, **filters)
+    if len(runs) != 1:
+        sources = "\n  ".join(run["source"] for run in runs) or "(none)"
+        raise ValueError(
+            f"Expected exactly one observed run in {store.path}, found {len(runs)}; "
+            f"narrow the selection with --dataset or --log-type:\n  {sources}"
+        )
+    source = Path(runs[0]["source"])
+    best_value, best_row = best_row_in_frame(store.run_frame(runs[0]["id"]), metric, source)
+    return source, best_value, best_row
+
+
 def empirical_p_value(
     null_values: np.ndarray,
     observed: float,
@@ -289,6 +368,8 @@ def make_plot(
     The figure combines a compact boxplot, jittered null points, and an
     annotation for the observed best score and empirical p-value.
     """
+    import matplotlib.pyplot as plt
+
     rng = np.random.default_rng(seed)
 
     fig, ax = plt.subplots(figsize=figsize)
@@ -420,13 +501,29 @@ def main() -> None:
     validate_args(args)
 
     # ---- Load best-per-file values ----
-    null_results = collect_null_best_values(args.null_dir, args.glob, args.metric)
-    null_values = np.array([value for _, value, _ in null_results], dtype=float)
+    if args.db is not None:
+        store = ResultsStore(str(args.db))
+        try:
+            filters = db_filters(args)
+            null_results = collect_null_best_values_db(store, args.metric, filters)
+            if args.actual_csv is not None:
+                observed_path = args.actual_csv
+                observed_value, observed_best_row = extract_best_row_value(observed_path, args.metric)
+            else:
+                observed_path, observed_value, observed_best_row = observed_best_value_db(
+                    store, args.metric, filters
+                )
+        finally:
+            store.close()
+    else:
+        null_results = collect_null_best_values(args.null_dir, args.glob, args.metric)
+        observed_path = args.actual_csv
+        observed_value, observed_best_row = extract_best_row_value(
+            args.actual_csv,
+            args.metric,
+        )
 
-    observed_value, observed_best_row = extract_best_row_value(
-        args.actual_csv,
-        args.metric,
-    )
+    null_values = np.array([value for _, value, _ in null_results], dtype=float)
 
     # ---- Evaluate observed result against the null distribution ----
     p_value = empirical_p_value(
@@ -451,7 +548,7 @@ def main() -> None:
     print(f"Empirical p-value:     {p_value:.6g}")
 
     print("\nObserved best row:")
-    print_best_row_summary("Observed", args.actual_csv, observed_value, observed_best_row)
+    print_best_row_summary("Observed", observed_path, observed_value, observed_best_row)
 
     print("\nNull file best values:")
     for csv_path, best_value, best_row in null_results:
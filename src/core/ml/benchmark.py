@@ -2,15 +2,23 @@
 
 The key detail is that CUDA work is synchronized before and after a measured
 block so reported timings reflect actual GPU execution rather than queued ops.
+torch is never imported here: a process that has not imported it cannot have
+queued GPU work, and CPU-only runners should not pay for loading it.
 """
 
 from __future__ import annotations
 
+import sys
 import time
 from contextlib import contextmanager
 from typing import Callable, Optional, Dict, Any, Iterator
 
-import torch
+
+def _cuda_synchronize() -> None:
+    """Wait for queued CUDA work if this process uses torch with CUDA."""
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.synchronize()
 
 
 @contextmanager
@@ -32,8 +40,7 @@ def bench(
         return
 
     # CUDA kernels are asynchronous, so wall-clock timing needs synchronization.
-    if torch.cuda.is_available():
-        torch.cuda.synchronize()
+    _cuda_synchronize()
 
     t0 = time.perf_counter()
 
@@ -41,8 +48,7 @@ def bench(
         yield
 
     finally:
-        if torch.cuda.is_available():
-            torch.cuda.synchronize()
+        _cuda_synchronize()
 
         dt = time.perf_counter() - t0
 
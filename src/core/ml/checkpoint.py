@@ -0,0 +1,101 @@
+"""Append-only row journal for resumable nested runs.
+
+Nested runners write one CSV row per outer split, but only after every split
+has finished. The journal records each row as soon as it is available in a
+JSON-lines sidecar next to the CSV, so an interrupted run can be restarted with
+the same arguments and only the missing outer splits are recomputed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Set
+
+
+def config_hash(config: Mapping[str, Any]) -> str:
+    """Return a stable hash for a run configuration.
+
+    Values that are not JSON-serializable (dataclasses, tuples of configs) are
+    hashed via ``repr`` so the grids built by the runners can be passed as-is.
+    """
+    payload = json.dumps(config, sort_keys=True, default=repr)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def journal_path(out_csv: str) -> str:
+    """Return the sidecar journal path used for ``out_csv``."""
+    return f"{out_csv}.journal.jsonl"
+
+
+class RowJournal:
+    """JSON-lines journal of completed outer splits for one output CSV.
+
+    The first line stores the configuration hash. Each following line stores
+    ``{"outer_i": ..., "row": ...}``; ``row`` is ``None`` for splits that ran
+    but produced no valid result, so they are not retried on resume either.
+    """
+
+    def __init__(self, out_csv: str, config: Mapping[str, Any], *, resume: bool = True):
+        self.path = journal_path(out_csv)
+        self.config_hash = config_hash(config)
+        self._entries: Dict[int, Optional[Dict[str, Any]]] = {}
+
+        p = Path(self.path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+
+        if resume and p.exists() and p.stat().st_size > 0:
+            self._load()
+        else:
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"config_hash": self.config_hash, "config": config}, default=repr) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            text = f.read()
+
+        # A crash mid-write can leave a torn last line; drop it so later
+        # appends start on a fresh line and the split is simply recomputed.
+        if not text.endswith("\n"):
+            text = text[: text.rfind("\n") + 1]
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(text)
+            print(f"  ⚠ Dropped truncated last line in {self.path}")
+
+        lines = text.splitlines()
+        if not lines:
+            raise ValueError(f"Journal {self.path} has no header; delete it to start over.")
+
+        header = json.loads(lines[0])
+        if header.get("config_hash") != self.config_hash:
+            raise ValueError(
+                f"Journal {self.path} was written with a different configuration "
+                f"(hash {header.get('config_hash')} != {self.config_hash}). "
+                "Delete it or pass --no_resume to start over."
+            )
+
+        for line in lines[1:]:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            self._entries[int(entry["outer_i"])] = entry["row"]
+
+    def completed(self) -> Set[int]:
+        """Return the outer split indices already recorded."""
+        return set(self._entries)
+
+    def append(self, outer_i: int, row: Optional[Dict[str, Any]]) -> None:
+        """Durably record the result of one outer split."""
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"outer_i": int(outer_i), "row": row}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._entries[int(outer_i)] = row
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Return all recorded non-empty rows ordered by ``outer_i``."""
+        return [self._entries[i] for i in sorted(self._entries) if self._entries[i] is not None]
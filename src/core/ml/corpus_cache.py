@@ -0,0 +1,103 @@
+"""Process-wide cache of loaded corpora shared with pool workers.
+
+Nested runners evaluate every outer split against the same handful of load
+configurations. Parsing the logs once in the parent and letting forked workers
+inherit the result keeps one copy of the corpus in memory instead of one per
+worker, and nothing large is pickled per task.
+"""
+
+from __future__ import annotations
+
+import gc
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from src.core.ml.benchmark import bench
+from src.core.ml.data import Example
+from src.core.ml.resources import apply_thread_budget
+from src.core.shared.loader import LoadConfig, load_examples
+
+_CORPUS: Dict[LoadConfig, List[Example]] = {}
+
+
+def cached_examples(cfg: LoadConfig) -> List[Example]:
+    """Return the examples for ``cfg``, loading them on first use in this process."""
+    examples = _CORPUS.get(cfg)
+    if examples is None:
+        examples = load_examples(cfg)
+        _CORPUS[cfg] = examples
+    return examples
+
+
+def preload(cfgs: Iterable[LoadConfig], *, benchmark: bool = False) -> int:
+    """Load each configuration into the cache before a worker pool starts.
+
+    Configurations that fail to load are skipped here; workers retry them and
+    report the failure in the usual per-split log. Returns the number of
+    examples held in the cache.
+    """
+    for cfg in cfgs:
+        if cfg in _CORPUS:
+            continue
+        try:
+            with bench(benchmark, "preload_examples", meta_fn=lambda: {"n": len(_CORPUS.get(cfg, ()))}):
+                cached_examples(cfg)
+        except Exception as e:
+            print(f"  ⚠ preload failed: {e}")
+    return sum(len(v) for v in _CORPUS.values())
+
+
+def _init_worker(corpus: Dict[LoadConfig, List[Example]], threads: Optional[int]) -> None:
+    # Under fork this receives the parent's dict without pickling; under spawn
+    # it is pickled once per worker rather than once per task.
+    _CORPUS.update(corpus)
+    if threads is not None:
+        apply_thread_budget(threads)
+
+
+class _CorpusPool(ProcessPoolExecutor):
+    """Process pool that lifts the parent's ``gc.freeze`` once its workers exist."""
+
+    def __init__(self, *args, frozen: bool, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._frozen = frozen
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = super().submit(fn, *args, **kwargs)
+        # A fork-context pool starts all of its workers on the first submit;
+        # they keep the frozen generation, the parent gets its collector back.
+        self._unfreeze()
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        super().shutdown(wait=wait, cancel_futures=cancel_futures)
+        self._unfreeze()
+
+    def _unfreeze(self) -> None:
+        if self._frozen:
+            self._frozen = False
+            gc.unfreeze()
+
+
+def make_process_pool(max_workers: int, *, threads_per_worker: Optional[int] = None) -> ProcessPoolExecutor:
+    """Create a process pool whose workers start with the cached corpus.
+
+    Fork is used where available so workers share the parent's pages
+    copy-on-write. ``gc.freeze`` moves the cached objects out of the
+    collector's reach so collections in the workers do not touch (and copy)
+    those pages; the parent unfreezes them once the workers are forked.
+    ``threads_per_worker`` limits each worker's library thread pools (see
+    ``src.core.ml.resources``).
+    """
+    ctx = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else None
+    if ctx is not None:
+        gc.collect()
+        gc.freeze()
+    return _CorpusPool(
+        max_workers=max_workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(dict(_CORPUS), threads_per_worker),
+        frozen=ctx is not None,
+    )
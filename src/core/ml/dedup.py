@@ -0,0 +1,49 @@
+"""Exact-duplicate collapsing for neural pipelines.
+
+Soft-normalized log windows repeat heavily, so neural pipelines predict each
+distinct text once and broadcast the result, and can optionally train on
+distinct (text, label) pairs weighted by their multiplicity.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+import numpy as np
+
+
+def unique_inverse(keys: Sequence[Hashable]) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(first, inverse)`` so that ``keys[i] == keys[first[inverse[i]]]``.
+
+    ``first`` holds the position of the first occurrence of each distinct key,
+    in order of appearance.
+    """
+    seen: Dict[Hashable, int] = {}
+    first: List[int] = []
+    inverse = np.empty(len(keys), dtype=np.int64)
+    for i, k in enumerate(keys):
+        j = seen.get(k)
+        if j is None:
+            j = len(first)
+            seen[k] = j
+            first.append(i)
+        inverse[i] = j
+    return np.asarray(first, dtype=np.int64), inverse
+
+
+def unique_pairs(keys: Sequence[Hashable], labels: Sequence[Hashable]) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(first, counts)`` for distinct (key, label) pairs.
+
+    Identical texts with different labels stay separate rows, so a loss
+    weighted by ``counts`` equals the loss over all rows.
+    """
+    first, inverse = unique_inverse(list(zip(keys, labels)))
+    return first, np.bincount(inverse, minlength=len(first)).astype(np.float32)
+
+
+def dedup_stats(texts: Sequence[str]) -> str:
+    """Describe the duplication of ``texts`` for runner logs."""
+    n = len(texts)
+    n_unique = len(set(texts))
+    ratio = n / n_unique if n_unique else 1.0
+    return f"unique texts={n_unique}/{n} ({ratio:.2f}x duplication)"
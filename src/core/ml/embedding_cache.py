@@ -0,0 +1,168 @@
+"""On-disk cache of frozen-encoder embeddings aligned with the token-id cache.
+
+A frozen encoder maps each (model, max_length, text) to the same pooled vector
+in every candidate and outer split. ``EmbeddingCache`` stores those vectors
+keyed by the row of the matching ``TokenIdCache``, so the encoder runs once
+per text and head candidates only read features.
+
+Files next to the token cache (``<token cache>/emb_<name>/``):
+
+- ``vectors.bin``: raw float16 rows ``[n_vectors, dim]``, append-only
+- ``rows.bin``: token-cache row of each vector, raw int64, append-only
+- ``meta.json``: vector dimension
+- ``.lock``: serializes writers (see ``src.core.ml.file_lock``)
+
+Like the token cache this may be shared by concurrent runs. Vectors are
+appended before their rows, so every vector with a row is complete; a writer
+takes the exclusive lock, picks up the vectors other processes added, appends
+only rows still missing and cuts off the tail of an interrupted append.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import tempfile
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from src.core.ml.file_lock import file_lock
+from src.core.ml.token_cache import TokenIdCache
+
+_EMB_CACHES: Dict[Tuple[str, str], "EmbeddingCache"] = {}
+
+_ROW_BYTES = 8
+_VEC_DTYPE = np.dtype(np.float16)
+
+
+def get_embedding_cache(token_cache: TokenIdCache, name: str) -> "EmbeddingCache":
+    """Return the process-wide embedding cache ``name`` for ``token_cache``."""
+    key = (str(token_cache.path), name)
+    emb = _EMB_CACHES.get(key)
+    if emb is None:
+        emb = EmbeddingCache(token_cache, name)
+        _EMB_CACHES[key] = emb
+    return emb
+
+
+class EmbeddingCache:
+    """Pooled float16 vectors for rows of one ``TokenIdCache``."""
+
+    def __init__(self, token_cache: TokenIdCache, name: str):
+        slug = re.sub(r"[^A-Za-z0-9._-]+", "_", name)
+        self.path = token_cache.path / f"emb_{slug}"
+        self._dim: Optional[int] = None
+        self._n = 0  # vectors indexed so far
+        # Vector index of each token-cache row (-1: not cached).
+        self._slot = np.full(0, -1, dtype=np.int64)
+        self._vectors: Optional[np.ndarray] = None
+        self._open()
+
+    def missing(self, rows: np.ndarray) -> np.ndarray:
+        """Return the distinct rows among ``rows`` that have no vector yet."""
+        self._refresh()
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        known = rows < len(self._slot)
+        todo = np.ones(len(rows), dtype=bool)
+        todo[known] = self._slot[rows[known]] < 0
+        return rows[todo]
+
+    def get(self, rows: np.ndarray) -> np.ndarray:
+        """Return float32 vectors for ``rows`` (all of which must be cached)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) and (rows.max() >= len(self._slot) or (self._slot[rows] < 0).any()):
+            raise KeyError("EmbeddingCache.get: some rows have no cached vector")
+        if self._vectors is None:
+            return np.zeros((0, self._dim or 1), dtype=np.float32)
+        return np.asarray(self._vectors[self._slot[rows]], dtype=np.float32)
+
+    def put(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        """Store ``vectors`` for ``rows`` that no process has stored yet."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) == 0:
+            return
+        with file_lock(self.path / ".lock"):
+            self._refresh()
+            known = rows < len(self._slot)
+            todo = np.ones(len(rows), dtype=bool)
+            todo[known] = self._slot[rows[known]] < 0
+            if todo.any():
+                self._append(rows[todo], np.asarray(vectors)[todo])
+
+    # ---- Storage ----
+    def _refresh(self) -> None:
+        if self._dim is None:
+            self._open()
+        else:
+            self._sync()
+
+    def _committed(self) -> int:
+        """Number of complete vectors on disk."""
+        assert self._dim is not None
+        try:
+            n_rows = (self.path / "rows.bin").stat().st_size // _ROW_BYTES
+            n_vecs = (self.path / "vectors.bin").stat().st_size // (self._dim * _VEC_DTYPE.itemsize)
+        except OSError:
+            return 0
+        return min(n_rows, n_vecs)
+
+    def _open(self) -> None:
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            return
+        try:
+            self._dim = int(json.loads(meta_path.read_text(encoding="utf-8"))["dim"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        self._sync()
+
+    def _sync(self) -> None:
+        """Index and map the vectors committed on disk, including other processes' vectors."""
+        n = self._committed()
+        if n <= self._n:
+            return
+        new = np.fromfile(self.path / "rows.bin", dtype=np.int64, count=n - self._n, offset=self._n * _ROW_BYTES)
+        self._index(new)
+
+    def _index(self, new_rows: np.ndarray) -> None:
+        need = int(new_rows.max()) + 1
+        if need > len(self._slot):
+            # Grow in steps so adding a few rows at a time stays cheap.
+            slot = np.full(max(need, 2 * len(self._slot)), -1, dtype=np.int64)
+            slot[:len(self._slot)] = self._slot
+            self._slot = slot
+        self._slot[new_rows] = np.arange(self._n, self._n + len(new_rows))
+        self._n += len(new_rows)
+        assert self._dim is not None
+        self._vectors = np.memmap(self.path / "vectors.bin", dtype=_VEC_DTYPE, mode="r", shape=(self._n, self._dim))
+
+    def _append(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        """Append ``vectors`` for ``rows``; the caller holds the exclusive lock."""
+        dim = int(vectors.shape[1])
+        if self._dim is None:
+            # No usable cache yet: whatever data files remain are unusable.
+            for name in ("vectors.bin", "rows.bin", "vectors.npy", "done.npy"):
+                (self.path / name).unlink(missing_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".json")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"dim": dim}, f)
+            os.replace(tmp, self.path / "meta.json")
+            self._dim = dim
+        elif dim != self._dim:
+            raise ValueError(f"EmbeddingCache: dim {dim} does not match cached dim {self._dim}")
+
+        # Drop the tail of an interrupted append so the new vectors line up.
+        for name, row_bytes in (("vectors.bin", dim * _VEC_DTYPE.itemsize), ("rows.bin", _ROW_BYTES)):
+            f = self.path / name
+            if f.exists() and f.stat().st_size != self._n * row_bytes:
+                os.truncate(f, self._n * row_bytes)
+
+        with open(self.path / "vectors.bin", "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=_VEC_DTYPE).tobytes())
+        # Rows last: a vector counts as stored once its row is on disk.
+        with open(self.path / "rows.bin", "ab") as f:
+            f.write(np.ascontiguousarray(rows, dtype=np.int64).tobytes())
+
+        self._index(rows)
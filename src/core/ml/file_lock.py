@@ -0,0 +1,32 @@
+"""Advisory file locks for on-disk caches shared between processes.
+
+Several runs (e.g. one per dataset) may use the same cache directory at once.
+``file_lock`` serializes their writers with ``fcntl.flock`` on a lock file
+next to the data. The lock is advisory and per host: it does not protect a
+cache shared over NFS. Without ``fcntl`` (Windows) it does nothing.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ModuleNotFoundError:
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: Path, *, exclusive: bool = True) -> Iterator[None]:
+    """Hold an exclusive (or shared) lock on ``path`` for the duration of the block."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
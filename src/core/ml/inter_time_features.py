@@ -0,0 +1,193 @@
+"""Fixed-size summary features of inter-event time windows.
+
+The raw inter-time representation feeds each gap of a window to the
+classifiers as one positional column, padded to the longest training window.
+``summary_features`` instead describes every window by the same set of
+statistics of its gaps, whatever the window length:
+
+- ``zero_frac``: share of gaps at or below ``min_gap_s`` (same-timestamp events)
+- ``q<p>``: quantiles of the log10 gaps
+- ``mean``, ``std``, ``skew``, ``kurt``: moments of the log10 gaps
+- ``burstiness``: (sigma - mu) / (sigma + mu) of the gaps in seconds, from -1
+  (periodic) over 0 (Poisson) to 1 (bursty)
+- ``burst_frac``, ``burst_starts``: share of gaps at or below ``burst_gap_s``
+  and number of such runs per gap; ``run<r>_frac``: share of positions that
+  start ``r`` consecutive burst gaps
+- ``hist[a,b)``: share of log10 gaps per bin of ``hist_edges``
+- ``acf<k>``: autocorrelation of the log10 gaps at lag ``k``
+
+All windows are parsed into one NaN-padded matrix and every statistic is
+computed over all rows at once; runs of burst gaps are found with
+``sliding_window_view``.
+"""
+
+from __future__ import annotations
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+INTER_TIME_UNITS = ("seconds", "log10_seconds")
+
+QUANTILES: Tuple[float, ...] = (0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0)
+RUN_LENGTHS: Tuple[int, ...] = (2, 4, 8)
+ACF_LAGS: Tuple[int, ...] = (1, 2, 3)
+# Decades from 1 ms to 1 h; the outer bins collect everything beyond.
+HIST_EDGES: Tuple[float, ...] = (-3.0, -2.0, -1.0, 0.0, 1.0, 2.0, 3.0)
+
+
+def summary_feature_names(
+    *,
+    quantiles: Sequence[float] = QUANTILES,
+    run_lengths: Sequence[int] = RUN_LENGTHS,
+    hist_edges: Sequence[float] = HIST_EDGES,
+    acf_lags: Sequence[int] = ACF_LAGS,
+) -> List[str]:
+    """Return the column names of ``summary_features`` in order."""
+    edges = [-np.inf, *hist_edges, np.inf]
+    return [
+        "zero_frac",
+        *(f"q{round(q * 100):d}" for q in quantiles),
+        "mean",
+        "std",
+        "skew",
+        "kurt",
+        "burstiness",
+        "burst_frac",
+        "burst_starts",
+        *(f"run{r}_frac" for r in run_lengths),
+        *(f"hist[{a:g},{b:g})" for a, b in zip(edges[:-1], edges[1:])),
+        *(f"acf{k}" for k in acf_lags),
+    ]
+
+
+def parse_windows(texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Parse serialized windows into a NaN-padded ``float64`` matrix.
+
+    Returns the matrix (one row per window, as wide as the longest window)
+    and the number of gaps per row.
+    """
+    parts = [(t or "").split() for t in texts]
+    lengths = np.fromiter((len(p) for p in parts), dtype=np.int64, count=len(parts))
+    width = int(lengths.max()) if lengths.size else 0
+    flat = np.asarray([v for p in parts for v in p], dtype=np.float64)
+    if lengths.size and (lengths == width).all():
+        return flat.reshape(len(parts), width), lengths
+    X = np.full((len(parts), width), np.nan, dtype=np.float64)
+    X[np.arange(width)[None, :] < lengths[:, None]] = flat
+    return X, lengths
+
+
+def _row_quantiles(x: np.ndarray, lengths: np.ndarray, quantiles: Sequence[float]) -> np.ndarray:
+    """Linear-interpolated quantiles per row of a NaN-padded matrix."""
+    # np.sort moves NaN to the end, so the valid values of a row come first.
+    s = np.sort(x, axis=1)
+    n = np.maximum(lengths, 1)[:, None]
+    pos = np.asarray(quantiles, dtype=np.float64)[None, :] * (n - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, n - 1)
+    frac = pos - lo
+    return np.take_along_axis(s, lo, axis=1) * (1 - frac) + np.take_along_axis(s, hi, axis=1) * frac
+
+
+def summary_features(
+    texts: Sequence[str],
+    *,
+    unit: str = "seconds",
+    min_gap_s: float = 1e-6,
+    burst_gap_s: float = 1.0,
+    quantiles: Sequence[float] = QUANTILES,
+    run_lengths: Sequence[int] = RUN_LENGTHS,
+    hist_edges: Sequence[float] = HIST_EDGES,
+    acf_lags: Sequence[int] = ACF_LAGS,
+) -> np.ndarray:
+    """Compute the summary features of serialized inter-time windows.
+
+    ``unit`` is the ``inter_time_unit`` the windows were written with. Gaps
+    below ``min_gap_s`` are raised to it before taking log10, so a zero gap
+    maps to the same value in both units (the log10 load configs add an
+    epsilon of 1e-6). Returns a ``float32`` matrix with one row per window and
+    the columns of ``summary_feature_names``; windows without gaps get zeros.
+    """
+    if unit not in INTER_TIME_UNITS:
+        raise ValueError(f"Unknown inter_time_unit={unit!r}")
+
+    n_features = len(summary_feature_names(
+        quantiles=quantiles, run_lengths=run_lengths, hist_edges=hist_edges, acf_lags=acf_lags
+    ))
+    raw, lengths = parse_windows(texts)
+    if raw.shape[0] == 0 or raw.shape[1] == 0:
+        return np.zeros((raw.shape[0], n_features), dtype=np.float32)
+
+    valid = ~np.isnan(raw)
+    n = np.maximum(lengths, 1).astype(np.float64)
+    log_floor = np.log10(min_gap_s)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if unit == "seconds":
+            secs = np.where(valid, np.maximum(raw, 0.0), np.nan)
+            lg = np.log10(np.maximum(secs, min_gap_s))
+        else:
+            lg = np.maximum(raw, log_floor)
+            secs = np.power(10.0, raw)
+
+        # ---- Location and shape of the log gaps ----
+        zero_frac = np.sum(lg <= log_floor, axis=1) / n
+        qs = _row_quantiles(lg, lengths, quantiles)
+
+        mean = np.nansum(lg, axis=1) / n
+        centered = np.where(valid, lg - mean[:, None], 0.0)
+        m2 = np.sum(centered ** 2, axis=1) / n
+        std = np.sqrt(m2)
+        skew = np.where(m2 > 0, np.sum(centered ** 3, axis=1) / n / m2 ** 1.5, 0.0)
+        kurt = np.where(m2 > 0, np.sum(centered ** 4, axis=1) / n / m2 ** 2 - 3.0, 0.0)
+
+        sec_mean = np.nansum(secs, axis=1) / n
+        sec_std = np.sqrt(np.nansum((secs - sec_mean[:, None]) ** 2, axis=1) / n)
+        burstiness = np.where(sec_mean + sec_std > 0, (sec_std - sec_mean) / (sec_std + sec_mean), 0.0)
+
+        # ---- Bursts: runs of short gaps ----
+        burst = valid & (secs <= burst_gap_s)
+        burst_frac = burst.sum(axis=1) / n
+        starts = burst.copy()
+        starts[:, 1:] &= ~burst[:, :-1]
+        burst_starts = starts.sum(axis=1) / n
+        runs = []
+        for r in run_lengths:
+            if raw.shape[1] < r:
+                runs.append(np.zeros(raw.shape[0]))
+                continue
+            full = sliding_window_view(burst, r, axis=1).all(axis=-1).sum(axis=1)
+            runs.append(full / np.maximum(lengths - r + 1, 1))
+
+        # ---- Histogram of the log gaps ----
+        n_bins = len(hist_edges) + 1
+        bins = np.digitize(lg, hist_edges)
+        rows = np.broadcast_to(np.arange(raw.shape[0])[:, None], bins.shape)
+        counts = np.bincount((rows * n_bins + bins)[valid], minlength=raw.shape[0] * n_bins)
+        hist = counts.reshape(raw.shape[0], n_bins) / n[:, None]
+
+        # ---- Autocorrelation of the log gaps ----
+        denom = np.sum(centered ** 2, axis=1)
+        acf = [
+            np.where(denom > 0, np.sum(centered[:, :-k] * centered[:, k:], axis=1) / denom, 0.0)
+            if raw.shape[1] > k else np.zeros(raw.shape[0])
+            for k in acf_lags
+        ]
+
+    X = np.column_stack([
+        zero_frac,
+        qs,
+        mean,
+        std,
+        skew,
+        kurt,
+        burstiness,
+        burst_frac,
+        burst_starts,
+        *runs,
+        hist,
+        *acf,
+    ])
+    X[lengths == 0] = 0.0
+    return np.nan_to_num(X, nan=0.0, posinf=0.0, neginf=0.0).astype(np.float32)
@@ -0,0 +1,135 @@
+"""SQLite cache of chat-model responses for the LLM fallback.
+
+Rerunning an experiment sends the same prompts to the chat API again, although
+with a fixed model and decoding settings the request is fully determined by
+(chat_model, temperature, max_tokens, system_msg, user_msg). ``LLMResponseCache``
+stores the validated response of each such request under the sha256 of those
+fields, so a rerun can be served from disk.
+
+How a run uses the cache is set per configuration (``llm_cache_mode``):
+
+- ``off``: no cache
+- ``read``: serve cached responses, send misses without storing them
+- ``write``: always send, store (or refresh) every response
+- ``readwrite``: serve cached responses, send and store misses
+- ``replay_only``: serve cached responses only; misses are never sent and keep
+  the embedding-only decision, so no API key or network is needed
+
+Writes are single autocommitted statements, so an interrupted run keeps every
+response it received. As with the results store, a database shared over NFS
+should not use WAL mode.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key        TEXT PRIMARY KEY,
+    chat_model TEXT NOT NULL,
+    response   TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+LLM_CACHE_MODES = ("off", "read", "write", "readwrite", "replay_only")
+
+_DEFAULT_CACHE_PATH = os.environ.get("DATAANALYSIS_LLM_CACHE", os.path.join(".cache", "llm_responses.sqlite"))
+_CACHE_PATH: str = _DEFAULT_CACHE_PATH
+
+_CACHES: Dict[str, "LLMResponseCache"] = {}
+
+
+def configure_llm_cache(path: Optional[str]) -> None:
+    """Set the database used by ``get_llm_cache`` (``None`` restores the default)."""
+    global _CACHE_PATH
+    _CACHE_PATH = path or _DEFAULT_CACHE_PATH
+    for cache in _CACHES.values():
+        cache.close()
+    _CACHES.clear()
+
+
+def get_llm_cache() -> "LLMResponseCache":
+    """Return the process-wide response cache."""
+    cache = _CACHES.get(_CACHE_PATH)
+    if cache is None:
+        cache = LLMResponseCache(_CACHE_PATH)
+        _CACHES[_CACHE_PATH] = cache
+    return cache
+
+
+def llm_cache_summary() -> str:
+    """Describe the hit rate of the response cache used in this process."""
+    parts = [f"{c.path}: {c.summary()}" for c in _CACHES.values()]
+    return "; ".join(parts) if parts else "not used"
+
+
+def response_key(chat_model: str, temperature: float, max_tokens: int, system_msg: str, user_msg: str) -> str:
+    """Return the cache key of one chat request."""
+    payload = json.dumps([chat_model, float(temperature), int(max_tokens), system_msg, user_msg], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """Chat responses keyed by ``response_key`` in one SQLite database."""
+
+    def __init__(self, path: str, *, busy_timeout_s: float = 60.0):
+        self.path = str(path)
+        p = Path(self.path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not p.exists()
+
+        # The cache is shared process-wide, and ``_run_coroutine`` may drive the
+        # LLM calls from a fresh worker thread; calls never overlap, so the
+        # connection can be used from whichever thread is running.
+        self._conn = sqlite3.connect(
+            self.path, timeout=busy_timeout_s, isolation_level=None, check_same_thread=False
+        )
+        if is_new:
+            self._conn.execute("PRAGMA journal_mode=wal")
+        self._conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_s * 1000)}")
+        self._conn.executescript(_SCHEMA)
+
+        # Lookups served vs. missed and responses stored since this process
+        # opened the cache.
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return int(self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0])
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> str:
+        return f"hits={self.hits} misses={self.misses} hit_rate={self.hit_rate:.1%} writes={self.writes} stored={len(self)}"
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for ``key`` (``None`` on a miss)."""
+        row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return str(row[0])
+
+    def put(self, key: str, chat_model: str, response: str) -> None:
+        """Store (or replace) the response for ``key``."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, chat_model, response, created_at) VALUES (?, ?, ?, ?)",
+            (key, chat_model, response, time.time()),
+        )
+        self.writes += 1
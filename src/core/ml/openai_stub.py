@@ -0,0 +1,288 @@
+"""Local OpenAI-compatible ``chat.completions`` server for offline benchmarks.
+
+The LLM fallback of the RAG pipeline and the agent runners talk to the chat
+API through the OpenAI SDK and LangChain, which both accept a base URL
+(``RAGLLMConfig.llm_base_url``, ``OPENAI_BASE_URL``). ``OpenAIStubServer``
+answers ``POST /v1/chat/completions`` on localhost with
+
+- a configurable latency per request (fixed, uniform, exponential or
+  lognormal around ``latency_mean_s``),
+- injected 429 responses: at random (``rate_limit_prob``), above a server-side
+  requests-per-minute limit (``rate_limit_rpm``) or as exhausted quota after
+  ``quota_after`` requests,
+- scripted answers (``script``: one entry per request, in order) or, once the
+  script is used up, deterministic answers derived from the request.
+
+Deterministic answers: a prompt of the RAG fallback gets one of its two valid
+labels, chosen by a hash of the prompt; a request offering ``finish_tool``
+calls that tool once the conversation has ``tool_turns`` assistant messages
+and gets a plain progress message before; anything else gets a short text
+that depends only on the request.
+
+Each request runs on its own thread, so client concurrency shows up as
+overlapping requests; ``stats`` reports what the server saw. Streaming is not
+supported.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+LATENCY_DISTS = ("fixed", "uniform", "exponential", "lognormal")
+
+_LABELS_RE = re.compile(r'Valid labels are: "([^"]+)" and "([^"]+)"')
+
+
+@dataclass
+class StubConfig:
+    """Behaviour of one stub server."""
+    # Latency per request; latency_spread is the half-width of the uniform
+    # distribution as a fraction of the mean, or the sigma of the lognormal.
+    latency: str = "lognormal"
+    latency_mean_s: float = 0.2
+    latency_spread: float = 0.5
+
+    # 429 injection
+    rate_limit_prob: float = 0.0             # share of requests answered with 429
+    rate_limit_rpm: Optional[float] = None   # server-side requests-per-minute limit
+    quota_after: Optional[int] = None        # insufficient_quota after this many requests
+    retry_after_s: float = 1.0               # Retry-After header of 429 responses
+
+    # Answers: script entries are {"content": str} or
+    # {"tool_calls": [{"name": str, "arguments": dict}]}
+    script: List[Dict[str, Any]] = field(default_factory=list)
+    finish_tool: str = "terminate"
+    tool_turns: int = 3
+
+    seed: int = 0
+
+
+def _sha1_int(text: str) -> int:
+    return int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "big")
+
+
+def _text_of(message: Dict[str, Any]) -> str:
+    content = message.get("content")
+    if isinstance(content, list):
+        return "".join(str(part.get("text", "")) if isinstance(part, dict) else str(part) for part in content)
+    return str(content or "")
+
+
+def deterministic_answer(request: Dict[str, Any], cfg: StubConfig) -> Dict[str, Any]:
+    """Return the answer (``{"content": ...}`` or ``{"tool_calls": [...]}``) for a request."""
+    messages = request.get("messages") or []
+    transcript = "\n".join(_text_of(m) for m in messages)
+    user_text = next((_text_of(m) for m in reversed(messages) if m.get("role") == "user"), "")
+
+    labels = _LABELS_RE.search(transcript)
+    if labels:
+        label = labels.group(1 + _sha1_int(user_text) % 2)
+        return {"content": json.dumps({"label": label})}
+
+    tool_names = {t.get("function", {}).get("name") for t in request.get("tools") or []}
+    if cfg.finish_tool in tool_names:
+        turns = sum(1 for m in messages if m.get("role") == "assistant")
+        if turns >= cfg.tool_turns:
+            return {"tool_calls": [{"name": cfg.finish_tool, "arguments": {"summary": f"done after {turns} turns"}}]}
+        return {"content": f"Step {turns + 1}: checking the current state."}
+
+    return {"content": f"stub answer {_sha1_int(transcript) % 10**8:08d}"}
+
+
+class OpenAIStubServer:
+    """Threaded HTTP server answering ``/v1/chat/completions`` from a ``StubConfig``."""
+
+    def __init__(self, cfg: Optional[StubConfig] = None, *, host: str = "127.0.0.1", port: int = 0):
+        self.cfg = cfg or StubConfig()
+        if self.cfg.latency not in LATENCY_DISTS:
+            raise ValueError(f"StubConfig.latency must be one of {LATENCY_DISTS}, got {self.cfg.latency!r}")
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.cfg.seed)
+        self._script_pos = 0
+        self._bucket = self._bucket_capacity()
+        self._bucket_stamp = time.monotonic()
+        self.reset_stats()
+
+        stub = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                stub._handle(self)
+
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    # ---- Lifecycle ----
+    def start(self) -> "OpenAIStubServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="openai-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "OpenAIStubServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    # ---- Statistics ----
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._n = 0
+            self._inflight = 0
+            self._max_inflight = 0
+            self._status: Dict[int, int] = {}
+            self._latencies: List[float] = []
+
+    def stats(self) -> Dict[str, Any]:
+        """Requests seen since the last reset: counts per status, concurrency and latency."""
+        with self._lock:
+            lat = np.asarray(self._latencies, dtype=np.float64)
+            return {
+                "requests": self._n,
+                "ok": self._status.get(200, 0),
+                "rate_limited": self._status.get(429, 0),
+                "errors": sum(n for code, n in self._status.items() if code not in (200, 429)),
+                "max_inflight": self._max_inflight,
+                "latency_mean_s": float(lat.mean()) if lat.size else float("nan"),
+                "latency_p50_s": float(np.percentile(lat, 50)) if lat.size else float("nan"),
+                "latency_p95_s": float(np.percentile(lat, 95)) if lat.size else float("nan"),
+            }
+
+    # ---- Request handling ----
+    def _bucket_capacity(self) -> float:
+        return max(1.0, self.cfg.rate_limit_rpm / 60.0) if self.cfg.rate_limit_rpm else 0.0
+
+    def _sample_latency(self) -> float:
+        cfg, mean = self.cfg, max(0.0, self.cfg.latency_mean_s)
+        if cfg.latency == "fixed" or mean == 0.0:
+            return mean
+        if cfg.latency == "uniform":
+            return self._rng.uniform(mean * (1 - cfg.latency_spread), mean * (1 + cfg.latency_spread))
+        if cfg.latency == "exponential":
+            return self._rng.expovariate(1.0 / mean)
+        # Lognormal with the requested mean.
+        sigma = cfg.latency_spread
+        return self._rng.lognormvariate(np.log(mean) - sigma * sigma / 2, sigma)
+
+    def _admit(self) -> Optional[Dict[str, Any]]:
+        """Decide (under the lock) whether a request is rejected; returns the error body if so."""
+        cfg = self.cfg
+        if cfg.quota_after is not None and self._n > cfg.quota_after:
+            return {"message": "You exceeded your current quota.", "type": "insufficient_quota", "code": "insufficient_quota"}
+        if cfg.rate_limit_rpm:
+            now = time.monotonic()
+            rate = cfg.rate_limit_rpm / 60.0
+            self._bucket = min(self._bucket_capacity(), self._bucket + (now - self._bucket_stamp) * rate)
+            self._bucket_stamp = now
+            if self._bucket < 1.0:
+                return {"message": "Rate limit reached for requests.", "type": "requests", "code": "rate_limit_exceeded"}
+            self._bucket -= 1.0
+        if cfg.rate_limit_prob > 0 and self._rng.random() < cfg.rate_limit_prob:
+            return {"message": "Rate limit reached (injected).", "type": "requests", "code": "rate_limit_exceeded"}
+        return None
+
+    def _handle(self, h: BaseHTTPRequestHandler) -> None:
+        t0 = time.perf_counter()
+        try:
+            body = json.loads(h.rfile.read(int(h.headers.get("Content-Length") or 0)) or b"{}")
+        except ValueError:
+            self._send(h, 400, {"error": {"message": "invalid JSON body", "type": "invalid_request_error"}}, t0)
+            return
+        if h.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+            self._send(h, 404, {"error": {"message": f"unknown path {h.path}", "type": "invalid_request_error"}}, t0)
+            return
+        if body.get("stream"):
+            self._send(h, 400, {"error": {"message": "streaming is not supported", "type": "invalid_request_error"}}, t0)
+            return
+
+        with self._lock:
+            self._n += 1
+            n = self._n
+            self._inflight += 1
+            self._max_inflight = max(self._max_inflight, self._inflight)
+            error = self._admit()
+            delay = self._sample_latency()
+            answer: Optional[Dict[str, Any]] = None
+            if error is None and self._script_pos < len(self.cfg.script):
+                answer = self.cfg.script[self._script_pos]
+                self._script_pos += 1
+        try:
+            time.sleep(max(0.0, delay))
+            if error is not None:
+                headers = {"retry-after": f"{self.cfg.retry_after_s:g}"} if error["code"] != "insufficient_quota" else {}
+                self._send(h, 429, {"error": error}, t0, headers)
+                return
+            if answer is None:
+                answer = deterministic_answer(body, self.cfg)
+            self._send(h, 200, self._completion(body, answer, n), t0)
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+    def _completion(self, request: Dict[str, Any], answer: Dict[str, Any], n: int) -> Dict[str, Any]:
+        message: Dict[str, Any] = {"role": "assistant", "content": answer.get("content")}
+        finish_reason = "stop"
+        if answer.get("tool_calls"):
+            message["tool_calls"] = [
+                {
+                    "id": f"call_{n}_{i}",
+                    "type": "function",
+                    "function": {"name": tc["name"], "arguments": json.dumps(tc.get("arguments") or {})},
+                }
+                for i, tc in enumerate(answer["tool_calls"])
+            ]
+            finish_reason = "tool_calls"
+        prompt_chars = sum(len(_text_of(m)) for m in request.get("messages") or [])
+        completion_chars = len(message["content"] or "") + len(json.dumps(message.get("tool_calls") or []))
+        usage = {"prompt_tokens": prompt_chars // 4, "completion_tokens": max(1, completion_chars // 4)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        return {
+            "id": f"chatcmpl-stub-{n}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+            "usage": usage,
+        }
+
+    def _send(self, h: BaseHTTPRequestHandler, code: int, obj: Dict[str, Any], t0: float, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(obj).encode("utf-8")
+        try:
+            h.send_response(code)
+            h.send_header("Content-Type", "application/json")
+            h.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                h.send_header(k, v)
+            h.end_headers()
+            h.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        with self._lock:
+            self._status[code] = self._status.get(code, 0) + 1
+            self._latencies.append(time.perf_counter() - t0)
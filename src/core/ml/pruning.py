@@ -0,0 +1,212 @@
+"""Racing-based pruning of load configurations across outer splits.
+
+Nested runners evaluate the full load grid on every outer split, although the
+validation ranking of load configurations barely changes between splits. The
+racer below runs an F-race (Birattari et al., 2002) over the outer splits:
+each split is a block in which the active configurations are ranked by
+validation score. After a warm-up phase, every round first runs a Friedman
+test over the active configurations; only when it rejects equal rankings are
+configurations compared with the best rank sum by Conover's post-hoc test and
+dropped if they rank significantly worse (Holm-corrected over the
+comparisons). With two configurations left the race falls back to a two-sided
+Wilcoxon matched-pairs test. The omnibus test gates the pairwise ones, so no
+configuration is dropped against a leader that is merely the largest of
+several equal means.
+
+A race tests once per round, so the level of each round is ``alpha`` divided
+by the number of rounds that can test (Bonferroni): at most one per outer
+split after the warm-up. The probability that the whole race drops any
+configuration that is not worse thus stays below ``alpha``.
+
+Only validation scores enter the test, so pruning never looks at test data.
+Every decision is appended to a JSON-lines log for auditing.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def pruning_log_path(out_csv: str) -> str:
+    """Return the pruning log path used for ``out_csv``."""
+    return f"{out_csv}.pruning.jsonl"
+
+
+class LoadConfigRacer:
+    """Track per-split validation scores and drop dominated load configurations.
+
+    The tests of one round use the outer splits on which every active
+    configuration produced a score, and nothing is dropped before ``warmup``
+    such splits exist. ``n_splits`` is the number of outer splits the race
+    will see; each round is tested at ``alpha / (n_splits - warmup + 1)``
+    (``alpha`` itself without ``n_splits``). The log records the p-value and
+    the corrected threshold of every test.
+    """
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        *,
+        warmup: int = 5,
+        alpha: float = 0.05,
+        min_survivors: int = 1,
+        n_splits: Optional[int] = None,
+        log_path: Optional[str] = None,
+    ):
+        # Grids may repeat a name for identical configs (e.g. ws=1 strides).
+        self.names = list(dict.fromkeys(names))
+        self.warmup = int(warmup)
+        self.alpha = float(alpha)
+        self.min_survivors = max(1, int(min_survivors))
+        self.n_splits = n_splits
+        self.log_path = log_path
+        # Bonferroni over the rounds that can test: one per split after the warm-up.
+        n_tests = 1 if n_splits is None else max(1, int(n_splits) - self.warmup + 1)
+        self.round_alpha = self.alpha / n_tests
+        self._tested_splits = 0
+
+        self._active: List[str] = list(self.names)
+        self._scores: Dict[int, Dict[str, float]] = {}
+
+    def active(self) -> List[str]:
+        """Return the configurations still in the race, in grid order."""
+        return list(self._active)
+
+    def observe(self, outer_i: int, scores: Dict[str, float]) -> None:
+        """Record the validation score of each configuration evaluated on one split."""
+        self._scores[int(outer_i)] = {k: float(v) for k, v in scores.items() if np.isfinite(v)}
+
+    def _contenders(self) -> List[str]:
+        """Active configurations with at least ``warmup`` scores, in grid order.
+
+        A config that is skipped on a split (e.g. too few windows) cannot be
+        ranked there; one that rarely scores would leave no complete split for
+        the others, so it stays in the race untested.
+        """
+        return [
+            name for name in self._active
+            if sum(name in s for s in self._scores.values()) >= self.warmup
+        ]
+
+    def _blocks(self, names: Sequence[str]) -> np.ndarray:
+        """Scores ``[n_splits, len(names)]`` of the splits where every one of ``names`` scored."""
+        rows = [
+            [s[name] for name in names]
+            for _, s in sorted(self._scores.items())
+            if all(name in s for name in names)
+        ]
+        return np.asarray(rows, dtype=float).reshape(len(rows), len(names))
+
+    def update(self) -> List[str]:
+        """Run one F-race step over the active configurations.
+
+        Returns the names dropped in this round.
+        """
+        # A round without new splits repeats the last test and would spend
+        # the error budget twice.
+        if len(self._active) <= self.min_survivors or len(self._scores) <= self._tested_splits:
+            return []
+        names = self._contenders()
+        blocks = self._blocks(names)
+        n, k = blocks.shape
+        if n < self.warmup or k < 2:
+            return []
+        self._tested_splits = len(self._scores)
+
+        try:
+            from scipy.stats import friedmanchisquare, rankdata, t as student_t, wilcoxon
+        except ModuleNotFoundError as exc:
+            raise ModuleNotFoundError(
+                "scipy is required for load-config pruning. "
+                "Install it with: python3 -m pip install scipy"
+            ) from exc
+
+        # Rank 1 is the best validation score of a split.
+        ranks = rankdata(-blocks, axis=1)
+        rank_sums = ranks.sum(axis=0)
+        best = int(np.argmin(rank_sums))
+        leader = names[best]
+        means = blocks.mean(axis=0)
+
+        p_values: Dict[str, float] = {}
+        if k == 2:
+            # F-race falls back to the Wilcoxon matched-pairs test for two configs.
+            diffs = blocks[:, best] - blocks[:, 1 - best]
+            omnibus_p = float("nan")
+            if np.any(diffs != 0):
+                p_values[names[1 - best]] = float(wilcoxon(diffs).pvalue)
+        else:
+            if np.all(blocks == blocks[:, :1]):
+                return []
+            omnibus_p = float(friedmanchisquare(*blocks.T).pvalue)
+            self.log(
+                event="friedman",
+                active=list(names),
+                untested=[name for name in self._active if name not in names],
+                n_blocks=int(n),
+                p_value=omnibus_p,
+                threshold=self.round_alpha,
+                rank_sums={name: float(r) for name, r in zip(names, rank_sums)},
+            )
+            if omnibus_p >= self.round_alpha:
+                return []
+            # Conover's post-hoc test of every config against the best rank sum.
+            dof = (n - 1) * (k - 1)
+            scale = np.sqrt(2.0 * (n * np.sum(ranks ** 2) - np.sum(rank_sums ** 2)) / dof)
+            if scale <= 0:
+                return []
+            for j, name in enumerate(names):
+                if j != best:
+                    stat = abs(rank_sums[j] - rank_sums[best]) / scale
+                    p_values[name] = float(2.0 * student_t.sf(stat, dof))
+
+        dropped: List[str] = []
+        # Holm: the i-th smallest p-value is tested at round_alpha / (m - i).
+        # Smaller p-values belong to weaker configs, so min_survivors keeps the
+        # strongest challengers.
+        ordered = sorted(p_values, key=lambda n: (p_values[n], -rank_sums[names.index(n)]))
+        for i, name in enumerate(ordered):
+            threshold = self.round_alpha / (len(ordered) - i)
+            if p_values[name] >= threshold or len(self._active) - len(dropped) <= self.min_survivors:
+                break
+            dropped.append(name)
+            self.log(
+                event="drop",
+                config=name,
+                leader=leader,
+                n_blocks=int(n),
+                n_active=int(k),
+                mean_val_leader=float(means[best]),
+                mean_val_dropped=float(means[names.index(name)]),
+                friedman_p_value=omnibus_p,
+                p_value=p_values[name],
+                threshold=threshold,
+            )
+
+        self._active = [n for n in self._active if n not in dropped]
+        return dropped
+
+    def log_round(self, outer_splits: Sequence[int]) -> None:
+        """Record which configurations are evaluated on the next outer splits."""
+        self.log(event="round", outer_splits=[int(i) for i in outer_splits], active=self.active())
+
+    def log(self, **record: object) -> None:
+        """Append one record to the pruning log, if logging is enabled."""
+        if self.log_path is None:
+            return
+        record = {
+            "time": time.time(),
+            "n_observed": len(self._scores),
+            "warmup": self.warmup,
+            "alpha": self.alpha,
+            "round_alpha": self.round_alpha,
+            **record,
+        }
+        Path(self.log_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
@@ -0,0 +1,45 @@
+"""Asyncio token buckets for client-side API rate limits.
+
+Chat APIs enforce limits per minute on both requests and tokens. Each limit is
+modelled as one ``AsyncTokenBucket``: the bucket refills continuously at
+``rate_per_minute / 60`` units per second up to ``capacity`` and ``acquire``
+waits until enough units are available. A single request larger than the
+capacity is let through once the bucket is full and leaves it in debt, so it
+delays later requests instead of blocking forever.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Optional
+
+
+class AsyncTokenBucket:
+    """Continuous-refill token bucket shared by the tasks of one event loop."""
+
+    def __init__(self, rate_per_minute: float, *, capacity: Optional[float] = None):
+        if rate_per_minute <= 0:
+            raise ValueError("AsyncTokenBucket: rate_per_minute must be > 0")
+        self.rate = float(rate_per_minute) / 60.0
+        # Default burst: one second's allowance (at least one unit).
+        self.capacity = float(capacity) if capacity is not None else max(1.0, self.rate)
+        self._level = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait until ``amount`` units (capped at the capacity) are available, then take them."""
+        need = min(float(amount), self.capacity)
+        # The lock keeps waiters first come, first served.
+        async with self._lock:
+            self._refill()
+            while self._level < need:
+                await asyncio.sleep((need - self._level) / self.rate)
+                self._refill()
+            self._level -= float(amount)
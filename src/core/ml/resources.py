@@ -0,0 +1,118 @@
+"""CPU budget shared between process workers and in-process thread pools.
+
+Runners that fan out over a process pool would otherwise let every worker
+start its own BLAS, OpenMP, joblib and torch thread pools sized to the whole
+machine. ``configure_threads`` splits one core budget evenly across the
+processes, and each process then limits its libraries to its share.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from dataclasses import dataclass
+from typing import Optional
+
+# Read by BLAS/OpenMP/numexpr when they initialize, and by forked or spawned
+# children; threadpoolctl covers pools that are already running.
+_THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+
+# Per-process thread share; ``None`` until a budget has been applied.
+_THREADS: Optional[int] = None
+_LIMITER = None
+
+
+@dataclass(frozen=True)
+class ThreadBudget:
+    """How a core budget is split: ``n_procs`` processes x ``threads_per_proc`` threads."""
+    total_cores: int
+    n_procs: int
+    threads_per_proc: int
+
+
+def available_cores() -> int:
+    """Return the usable core count, honoring ``DATAANALYSIS_CPU_BUDGET`` and CPU affinity."""
+    env = os.environ.get("DATAANALYSIS_CPU_BUDGET")
+    if env:
+        return max(1, int(env))
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+def plan_budget(n_procs: int, *, cpu_budget: Optional[int] = None) -> ThreadBudget:
+    """Split ``cpu_budget`` (default: all available cores) across ``n_procs`` processes."""
+    total = int(cpu_budget) if cpu_budget else available_cores()
+    n_procs = max(1, int(n_procs))
+    return ThreadBudget(
+        total_cores=total,
+        n_procs=n_procs,
+        threads_per_proc=max(1, total // n_procs),
+    )
+
+
+def apply_thread_budget(threads: int) -> None:
+    """Limit this process's BLAS/OpenMP, joblib and torch thread pools to ``threads``."""
+    global _THREADS, _LIMITER
+    threads = max(1, int(threads))
+    _THREADS = threads
+
+    for var in _THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+
+    try:
+        from threadpoolctl import threadpool_limits
+    except ModuleNotFoundError:
+        # scikit-learn depends on threadpoolctl; without it the env vars above
+        # still apply to libraries that have not started their pools yet.
+        pass
+    else:
+        _LIMITER = threadpool_limits(limits=threads)
+
+    # Only touch torch when the runner already imported it.
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+
+def configure_threads(n_procs: int, *, cpu_budget: Optional[int] = None, verbose: bool = True) -> ThreadBudget:
+    """Plan a budget for ``n_procs`` workers and apply the per-process share here.
+
+    Call this in a runner before creating its worker pool: forked and spawned
+    workers inherit the environment, and ``make_process_pool`` re-applies the
+    share in each worker for pools that were already initialized.
+    """
+    budget = plan_budget(n_procs, cpu_budget=cpu_budget)
+    apply_thread_budget(budget.threads_per_proc)
+    if verbose:
+        print(
+            f"CPU budget  : {budget.total_cores} cores = "
+            f"{budget.n_procs} procs x {budget.threads_per_proc} threads"
+        )
+    return budget
+
+
+def library_n_jobs() -> int:
+    """Return the ``n_jobs`` value for estimators created in this process.
+
+    Falls back to ``-1`` (all cores) when no budget has been applied, which
+    matches the previous behavior for callers outside the runners.
+    """
+    return _THREADS if _THREADS is not None else -1
+
+
+def dataloader_workers(default: int) -> int:
+    """Cap DataLoader worker processes so they fit in this process's share.
+
+    One thread of the share stays with the training loop itself.
+    """
+    if _THREADS is None:
+        return default
+    return max(0, min(default, _THREADS - 1))
@@ -0,0 +1,26 @@
+"""Write transactions for SQLite databases shared between processes.
+
+The work queue and the results store are opened in autocommit mode by many
+processes at once. ``immediate_transaction`` groups a read-modify-write into
+one ``BEGIN IMMEDIATE`` block: the write lock is taken up front, so two
+writers never both read the old state and the loser of the lock waits for the
+connection's busy timeout instead of failing on upgrade.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from contextlib import contextmanager
+from typing import Iterator
+
+
+@contextmanager
+def immediate_transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """``BEGIN IMMEDIATE`` ... ``COMMIT`` block that takes the write lock up front."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
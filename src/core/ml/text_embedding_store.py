@@ -0,0 +1,219 @@
+"""Persistent store of sentence embeddings keyed by text.
+
+The RAG pipeline embeds the same bundles again for every candidate and outer
+split, although a vector depends only on the embedding model, the
+normalization flag and the text itself. ``TextEmbeddingStore`` keeps every
+vector it has computed and encodes only texts it has never seen.
+
+Layout of one store (``<store_dir>/<model>_norm<0|1>_<dtype>/``):
+
+- ``vectors.bin``: raw float16 or float32 rows ``[n_texts, dim]``, append-only
+- ``keys.bin``: sha1 digest of each row's text (20 bytes per row), append-only;
+  this is the on-disk hash index and is read into a dict on open
+- ``meta.json``: model, normalize flag, dtype and dimension
+- ``.lock``: serializes writers (see ``src.core.ml.file_lock``)
+
+Vectors are appended before their keys, so the rows with a key are complete;
+readers map only those. Several processes may share a store: texts are
+encoded without the lock, then the writer takes the exclusive lock, picks up
+the rows other processes added meanwhile, appends only the texts still
+missing and cuts off the tail of an interrupted append.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.core.ml.file_lock import file_lock
+from src.core.ml.token_cache import text_key
+
+_DEFAULT_STORE_DIR = os.environ.get("DATAANALYSIS_EMBEDDING_STORE", os.path.join(".cache", "text_embeddings"))
+_STORE_DIR: str = _DEFAULT_STORE_DIR
+
+_STORES: Dict[Tuple[str, bool, str], "TextEmbeddingStore"] = {}
+
+_KEY_BYTES = 20
+STORE_DTYPES = ("float32", "float16")
+
+
+def configure_embedding_store(store_dir: Optional[str]) -> None:
+    """Set the directory used by ``get_embedding_store`` (``None`` restores the default)."""
+    global _STORE_DIR
+    _STORE_DIR = store_dir or _DEFAULT_STORE_DIR
+    _STORES.clear()
+
+
+def get_embedding_store(model_name: str, normalize: bool, dtype: str = "float32") -> "TextEmbeddingStore":
+    """Return the process-wide store for one embedding model and normalization flag."""
+    key = (model_name, bool(normalize), dtype)
+    store = _STORES.get(key)
+    if store is None:
+        store = TextEmbeddingStore(model_name, bool(normalize), store_dir=_STORE_DIR, dtype=dtype)
+        _STORES[key] = store
+    return store
+
+
+def embedding_store_summary() -> str:
+    """Describe the hit rate of every store used in this process."""
+    parts = [f"{s.model_name} (norm={int(s.normalize)}, {s.dtype.name}): {s.summary()}" for s in _STORES.values()]
+    return "; ".join(parts) if parts else "not used"
+
+
+class TextEmbeddingStore:
+    """Embedding vectors of every text seen so far for one model/normalize flag."""
+
+    def __init__(self, model_name: str, normalize: bool, *, store_dir: str, dtype: str = "float32"):
+        if dtype not in STORE_DTYPES:
+            raise ValueError(f"TextEmbeddingStore: dtype must be one of {STORE_DTYPES}, got {dtype!r}")
+        self.model_name = model_name
+        self.normalize = bool(normalize)
+        self.dtype = np.dtype(dtype)
+        slug = re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)
+        self.path = Path(store_dir) / f"{slug}_norm{int(self.normalize)}_{dtype}"
+
+        # Texts served from the store vs. texts sent to the encoder, counted
+        # since this process opened the store.
+        self.hits = 0
+        self.misses = 0
+
+        self._index: Dict[bytes, int] = {}
+        self._dim: Optional[int] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._open()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> str:
+        return f"hits={self.hits} misses={self.misses} hit_rate={self.hit_rate:.1%} stored={len(self)}"
+
+    # ---- Lookup ----
+    def embed(self, texts: Sequence[str], encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """Return float32 vectors for ``texts``, encoding only distinct unseen texts.
+
+        ``encode`` receives the texts to compute and returns one row per text.
+        Every returned row is read back from the store, so a text gets the same
+        vector whether it was computed in this call or an earlier one.
+        """
+        keys = [text_key(t) for t in texts]
+        # Pick up rows other processes stored since the last call.
+        if self._dim is None:
+            self._open()
+        else:
+            self._sync()
+        missing: Dict[bytes, str] = {}
+        for k, t in zip(keys, texts):
+            if k not in self._index and k not in missing:
+                missing[k] = t
+
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)
+
+        if missing:
+            vecs = np.asarray(encode(list(missing.values())))
+            if vecs.ndim != 2 or vecs.shape[0] != len(missing):
+                raise ValueError(f"TextEmbeddingStore: encoder returned shape {vecs.shape} for {len(missing)} texts")
+            self._add(list(missing.keys()), vecs)
+
+        if not keys:
+            return np.zeros((0, self._dim or 1), dtype=np.float32)
+        assert self._vectors is not None
+        rows = np.fromiter((self._index[k] for k in keys), dtype=np.int64, count=len(keys))
+        return np.asarray(self._vectors[rows], dtype=np.float32)
+
+    # ---- Storage ----
+    def _committed(self) -> int:
+        """Number of complete rows on disk."""
+        assert self._dim is not None
+        try:
+            n_keys = (self.path / "keys.bin").stat().st_size // _KEY_BYTES
+            n_vecs = (self.path / "vectors.bin").stat().st_size // (self._dim * self.dtype.itemsize)
+        except OSError:
+            return 0
+        return min(n_keys, n_vecs)
+
+    def _open(self) -> None:
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            return
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            dim = int(meta["dim"])
+            if np.dtype(meta["dtype"]) != self.dtype:
+                return
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        self._dim = dim
+        self._sync()
+
+    def _sync(self) -> None:
+        """Index and map the rows committed on disk, including other processes' rows."""
+        n = self._committed()
+        n_known = len(self._index)
+        if n <= n_known:
+            return
+        with open(self.path / "keys.bin", "rb") as f:
+            f.seek(n_known * _KEY_BYTES)
+            new = f.read((n - n_known) * _KEY_BYTES)
+        self._index.update({new[i * _KEY_BYTES:(i + 1) * _KEY_BYTES]: n_known + i for i in range(n - n_known)})
+        self._map()
+
+    def _map(self) -> None:
+        n = len(self._index)
+        self._vectors = None
+        if n and self._dim:
+            self._vectors = np.memmap(self.path / "vectors.bin", dtype=self.dtype, mode="r", shape=(n, self._dim))
+
+    def _add(self, keys: List[bytes], vecs: np.ndarray) -> None:
+        with file_lock(self.path / ".lock"):
+            if self._dim is None:
+                self._open()
+            else:
+                self._sync()
+            todo = [i for i, k in enumerate(keys) if k not in self._index]
+            if todo:
+                self._append([keys[i] for i in todo], vecs[todo])
+
+    def _append(self, keys: List[bytes], vecs: np.ndarray) -> None:
+        """Append ``vecs`` under ``keys``; the caller holds the exclusive lock."""
+        dim = int(vecs.shape[1])
+        if self._dim is None:
+            # No readable metadata: whatever data files remain are unusable.
+            for name in ("vectors.bin", "keys.bin"):
+                (self.path / name).unlink(missing_ok=True)
+            meta = {"model": self.model_name, "normalize": self.normalize, "dtype": self.dtype.name, "dim": dim}
+            fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".json")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp, self.path / "meta.json")
+            self._dim = dim
+        elif dim != self._dim:
+            raise ValueError(f"TextEmbeddingStore: dim {dim} does not match stored dim {self._dim}")
+
+        # Drop the tail of an interrupted append so the new rows line up.
+        n_old = len(self._index)
+        for name, row_bytes in (("vectors.bin", dim * self.dtype.itemsize), ("keys.bin", _KEY_BYTES)):
+            f = self.path / name
+            if f.exists() and f.stat().st_size != n_old * row_bytes:
+                os.truncate(f, n_old * row_bytes)
+
+        with open(self.path / "vectors.bin", "ab") as f:
+            f.write(np.ascontiguousarray(vecs, dtype=self.dtype).tobytes())
+        # Keys last: a row counts as stored once its key is on disk.
+        with open(self.path / "keys.bin", "ab") as f:
+            f.write(b"".join(keys))
+
+        self._index.update({k: n_old + i for i, k in enumerate(keys)})
+        self._map()
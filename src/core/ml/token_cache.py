@@ -0,0 +1,258 @@
+"""On-disk token-id cache for transformer pipelines.
+
+Every transformer candidate and every outer split tokenizes the same log
+texts again, although the result depends only on the tokenizer, ``max_length``
+and the text itself. ``TokenIdCache`` tokenizes each distinct text once per
+(tokenizer name, max_length) with the fast tokenizer in batched mode and keeps
+the padded ids in a memory-mapped int32 array; splits look up their rows by
+text hash and index into it.
+
+Layout of one cache entry (``<cache_dir>/<tokenizer>_L<max_length>/``):
+
+- ``ids.bin``: padded input ids, raw int32 rows ``[n_texts, max_length]``
+- ``lengths.bin``: number of non-padding tokens per text, raw int32
+- ``keys.bin``: sha1 digest of each row's text (20 bytes per row)
+- ``meta.json``: padding side and the tokenizer's model input names
+- ``.lock``: serializes writers (see ``src.core.ml.file_lock``)
+
+All three data files are append-only and keys are appended last, so the rows
+with a key are complete; readers map only those. Several processes may share
+an entry: a writer takes the exclusive lock, first picks up the rows other
+processes added (texts they tokenized are not tokenized again), then appends
+its own, and cuts off the tail of an interrupted append.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.core.ml.file_lock import file_lock
+
+_DEFAULT_CACHE_DIR = os.environ.get("DATAANALYSIS_TOKEN_CACHE", os.path.join(".cache", "token_ids"))
+_CACHE_DIR: str = _DEFAULT_CACHE_DIR
+
+_CACHES: Dict[Tuple[str, int], "TokenIdCache"] = {}
+_TOKENIZERS: Dict[str, object] = {}
+
+# Texts per tokenizer call when filling the cache.
+_TOKENIZE_BATCH = 2048
+
+_KEY_BYTES = 20
+
+
+def configure_token_cache(cache_dir: Optional[str]) -> None:
+    """Set the directory used by ``get_token_cache`` (``None`` restores the default)."""
+    global _CACHE_DIR
+    _CACHE_DIR = cache_dir or _DEFAULT_CACHE_DIR
+    _CACHES.clear()
+
+
+def get_token_cache(tokenizer_name: str, max_length: int) -> "TokenIdCache":
+    """Return the process-wide cache for one tokenizer and ``max_length``."""
+    key = (tokenizer_name, int(max_length))
+    cache = _CACHES.get(key)
+    if cache is None:
+        cache = TokenIdCache(tokenizer_name, int(max_length), cache_dir=_CACHE_DIR)
+        _CACHES[key] = cache
+    return cache
+
+
+def load_tokenizer(tokenizer_name: str):
+    """Load (once per process) the fast tokenizer for ``tokenizer_name``."""
+    tok = _TOKENIZERS.get(tokenizer_name)
+    if tok is None:
+        try:
+            from transformers import AutoTokenizer
+        except ModuleNotFoundError as exc:
+            raise ModuleNotFoundError(
+                "transformers is required for tokenization. "
+                "Install it with: python3 -m pip install transformers"
+            ) from exc
+        tok = AutoTokenizer.from_pretrained(tokenizer_name, use_fast=True)
+        _TOKENIZERS[tokenizer_name] = tok
+    return tok
+
+
+def text_key(text: str) -> bytes:
+    """Return the cache key of one text."""
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+
+class TokenIdCache:
+    """Padded token ids of every text seen so far for one tokenizer/max_length."""
+
+    def __init__(self, tokenizer_name: str, max_length: int, *, cache_dir: str):
+        self.tokenizer_name = tokenizer_name
+        self.max_length = int(max_length)
+        slug = re.sub(r"[^A-Za-z0-9._-]+", "_", tokenizer_name)
+        self.path = Path(cache_dir) / f"{slug}_L{self.max_length}"
+
+        self._index: Dict[bytes, int] = {}
+        self._ids: Optional[np.ndarray] = None
+        self._lengths: Optional[np.ndarray] = None
+        self._meta: Optional[Dict[str, object]] = None
+        self._open()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def _row_bytes(self) -> int:
+        return self.max_length * 4
+
+    @property
+    def padding_side(self) -> str:
+        """Side on which cached rows are padded ("right" unless the tokenizer says otherwise)."""
+        return str((self._meta or {}).get("padding_side", "right"))
+
+    # ---- Lookup ----
+    def rows_for(self, texts: Sequence[str], *, verbose: bool = False) -> np.ndarray:
+        """Return the cache row of each text, tokenizing texts not cached yet."""
+        keys = [text_key(t) for t in texts]
+        missing: Dict[bytes, str] = {}
+        for k, t in zip(keys, texts):
+            if k not in self._index and k not in missing:
+                missing[k] = t
+        if missing:
+            self._add(list(missing.keys()), list(missing.values()), verbose=verbose)
+        return np.fromiter((self._index[k] for k in keys), dtype=np.int64, count=len(keys))
+
+    def arrays(self, rows: np.ndarray) -> Dict[str, np.ndarray]:
+        """Return model inputs for ``rows``, matching ``padding="max_length"`` tokenizer output."""
+        assert self._ids is not None and self._lengths is not None and self._meta is not None
+        rows = np.asarray(rows, dtype=np.int64)
+        input_ids = np.asarray(self._ids[rows], dtype=np.int64)
+        lengths = np.asarray(self._lengths[rows], dtype=np.int64)[:, None]
+
+        positions = np.arange(self.max_length, dtype=np.int64)[None, :]
+        if self._meta["padding_side"] == "left":
+            attention_mask = (positions >= self.max_length - lengths).astype(np.int64)
+        else:
+            attention_mask = (positions < lengths).astype(np.int64)
+
+        out = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._meta["model_input_names"]:
+            # Single-sequence inputs only ever use segment 0.
+            out["token_type_ids"] = np.zeros_like(input_ids)
+        return out
+
+    # ---- Storage ----
+    def _committed(self) -> int:
+        """Number of complete rows on disk."""
+        try:
+            sizes = [
+                (self.path / "keys.bin").stat().st_size // _KEY_BYTES,
+                (self.path / "ids.bin").stat().st_size // self._row_bytes,
+                (self.path / "lengths.bin").stat().st_size // 4,
+            ]
+        except OSError:
+            return 0
+        return min(sizes)
+
+    def _open(self) -> None:
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            return
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if meta.get("max_length") != self.max_length:
+            return
+        self._meta = meta
+        self._sync()
+
+    def _sync(self) -> None:
+        """Index and map the rows committed on disk, including other processes' rows."""
+        n = self._committed()
+        n_known = len(self._index)
+        if n > n_known:
+            with open(self.path / "keys.bin", "rb") as f:
+                f.seek(n_known * _KEY_BYTES)
+                new = f.read((n - n_known) * _KEY_BYTES)
+            self._index.update(
+                {new[i * _KEY_BYTES:(i + 1) * _KEY_BYTES]: n_known + i for i in range(n - n_known)}
+            )
+        self._map()
+
+    def _map(self) -> None:
+        n = len(self._index)
+        self._ids = self._lengths = None
+        if n:
+            self._ids = np.memmap(self.path / "ids.bin", dtype=np.int32, mode="r", shape=(n, self.max_length))
+            self._lengths = np.memmap(self.path / "lengths.bin", dtype=np.int32, mode="r", shape=(n,))
+
+    def _add(self, keys: List[bytes], texts: List[str], *, verbose: bool) -> None:
+        with file_lock(self.path / ".lock"):
+            if self._meta is None:
+                self._open()
+            else:
+                self._sync()
+            todo = [(k, t) for k, t in zip(keys, texts) if k not in self._index]
+            if todo:
+                self._append([k for k, _ in todo], [t for _, t in todo], verbose=verbose)
+
+    def _append(self, keys: List[bytes], texts: List[str], *, verbose: bool) -> None:
+        """Tokenize ``texts`` and append them; the caller holds the exclusive lock."""
+        tokenizer = load_tokenizer(self.tokenizer_name)
+        if self._meta is None:
+            # No usable entry yet: whatever data files remain are unusable.
+            for name in ("ids.bin", "lengths.bin", "keys.bin", "ids.npy", "lengths.npy", "keys.npy"):
+                (self.path / name).unlink(missing_ok=True)
+            meta = {
+                "tokenizer": self.tokenizer_name,
+                "max_length": self.max_length,
+                "padding_side": getattr(tokenizer, "padding_side", "right"),
+                "model_input_names": list(getattr(tokenizer, "model_input_names", ["input_ids", "attention_mask"])),
+            }
+            fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".json")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp, self.path / "meta.json")
+            self._meta = meta
+
+        new_ids = np.empty((len(texts), self.max_length), dtype=np.int32)
+        new_lengths = np.empty(len(texts), dtype=np.int32)
+        starts = range(0, len(texts), _TOKENIZE_BATCH)
+        if verbose:
+            from tqdm.auto import tqdm
+
+            starts = tqdm(starts, desc=f"tokenize {len(texts)} texts", leave=False)
+        for i in starts:
+            enc = tokenizer(
+                texts[i:i + _TOKENIZE_BATCH],
+                padding="max_length",
+                truncation=True,
+                max_length=self.max_length,
+                return_attention_mask=True,
+                return_token_type_ids=False,
+                return_tensors="np",
+            )
+            new_ids[i:i + _TOKENIZE_BATCH] = enc["input_ids"]
+            new_lengths[i:i + _TOKENIZE_BATCH] = enc["attention_mask"].sum(axis=1)
+
+        # Drop the tail of an interrupted append so the new rows line up.
+        n_old = len(self._index)
+        for name, row_bytes in (("ids.bin", self._row_bytes), ("lengths.bin", 4), ("keys.bin", _KEY_BYTES)):
+            f = self.path / name
+            if f.exists() and f.stat().st_size != n_old * row_bytes:
+                os.truncate(f, n_old * row_bytes)
+
+        with open(self.path / "ids.bin", "ab") as f:
+            f.write(new_ids.tobytes())
+        with open(self.path / "lengths.bin", "ab") as f:
+            f.write(new_lengths.tobytes())
+        # Keys last: a row counts as stored once its key is on disk.
+        with open(self.path / "keys.bin", "ab") as f:
+            f.write(b"".join(keys))
+
+        self._index.update({k: n_old + i for i, k in enumerate(keys)})
+        self._map()
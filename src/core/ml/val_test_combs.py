@@ -71,3 +71,41 @@ def make_val_test_splits(
     # Keep ordering stable across runs while avoiding systematic pair ordering.
     random.Random(SPLIT_SHUFFLE_SEED).shuffle(splits)
     return splits
+
+
+def parse_assignment_indices(spec: str, n_assignments: int) -> List[int]:
+    """Expand an ``--assignment_idx`` value into concrete null indices.
+
+    Accepts a single index, ``all``, an inclusive range ``START-END``, or a
+    comma-separated mix of indices and ranges. Duplicates are removed while
+    keeping the first-seen order, and out-of-range entries raise ``ValueError``.
+    """
+    spec = str(spec).strip()
+    if spec.lower() == "all":
+        return list(range(n_assignments))
+
+    out: List[int] = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo_str, hi_str = part.split("-", 1)
+            lo, hi = int(lo_str), int(hi_str)
+            if hi < lo:
+                raise ValueError(f"Empty assignment range {part!r}")
+            idxs = range(lo, hi + 1)
+        else:
+            idxs = range(int(part), int(part) + 1)
+
+        for idx in idxs:
+            if not (0 <= idx < n_assignments):
+                raise ValueError(
+                    f"assignment_idx={idx} out of range. Valid range: 0..{n_assignments - 1}"
+                )
+            if idx not in out:
+                out.append(idx)
+
+    if not out:
+        raise ValueError(f"No assignment indices selected by {spec!r}")
+    return out
@@ -0,0 +1,252 @@
+"""SQLite-backed task queue for spreading nested outer splits across workers.
+
+One task corresponds to one outer split of one run, identified by
+(runner, dataset, log_type, model, assignment_idx, outer_i, out_csv). Runners
+enqueue their pending splits, workers on any machine that can open the database
+claim tasks atomically and write the resulting CSV row back, and the
+coordinator assembles the per-run CSVs once everything is done.
+
+Claims are kept alive by heartbeats. A claim whose heartbeat is older than
+``stale_after_s`` is returned to the pending state on the next claim attempt,
+so a worker that died mid-task does not block the sweep.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.core.ml.sqlite_tx import immediate_transaction
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    runner        TEXT    NOT NULL,
+    dataset       TEXT    NOT NULL,
+    log_type      TEXT    NOT NULL DEFAULT '',
+    model         TEXT    NOT NULL DEFAULT '',
+    assignment_idx INTEGER NOT NULL DEFAULT -1,
+    outer_i       INTEGER NOT NULL,
+    out_csv       TEXT    NOT NULL,
+    payload       TEXT    NOT NULL,
+    journal_config TEXT   NOT NULL,
+    state         TEXT    NOT NULL DEFAULT 'pending',
+    worker        TEXT,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    claimed_at    REAL,
+    heartbeat_at  REAL,
+    finished_at   REAL,
+    result        TEXT,
+    error         TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS tasks_key
+    ON tasks(runner, dataset, log_type, model, assignment_idx, outer_i, out_csv);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks(state, id);
+"""
+
+TASK_STATES = ("pending", "claimed", "done", "failed")
+
+
+class WorkQueue:
+    """Thin wrapper around the task table of one queue database.
+
+    New databases are created in WAL mode unless ``journal_mode`` says
+    otherwise; existing ones keep the mode they were created with. WAL relies
+    on shared memory, so a database on NFS shared between machines should be
+    created with ``journal_mode="delete"``.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        stale_after_s: float = 600.0,
+        max_attempts: int = 3,
+        journal_mode: Optional[str] = None,
+        busy_timeout_s: float = 60.0,
+    ):
+        self.path = str(path)
+        self.stale_after_s = float(stale_after_s)
+        self.max_attempts = int(max_attempts)
+
+        p = Path(self.path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        if journal_mode is None and not p.exists():
+            journal_mode = "wal"
+
+        # Autocommit mode: every transaction below is opened explicitly.
+        self._conn = sqlite3.connect(self.path, timeout=busy_timeout_s, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if journal_mode is not None:
+            self._conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        self._conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_s * 1000)}")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # ---- Producer side ----
+    def enqueue(self, tasks: Iterable[Dict[str, Any]]) -> int:
+        """Insert tasks that are not queued yet and return how many were added.
+
+        Each task dict carries the key columns plus ``payload`` (keyword
+        arguments for the runner's task function) and ``journal_config`` (the
+        configuration used to build the run's ``RowJournal``).
+        """
+        added = 0
+        with immediate_transaction(self._conn):
+            for t in tasks:
+                cur = self._conn.execute(
+                    """
+                    INSERT OR IGNORE INTO tasks
+                        (runner, dataset, log_type, model, assignment_idx, outer_i, out_csv, payload, journal_config)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        t["runner"],
+                        t["dataset"],
+                        t.get("log_type") or "",
+                        t.get("model") or "",
+                        -1 if t.get("assignment_idx") is None else int(t["assignment_idx"]),
+                        int(t["outer_i"]),
+                        t["out_csv"],
+                        json.dumps(t["payload"]),
+                        json.dumps(t["journal_config"], default=repr),
+                    ),
+                )
+                added += cur.rowcount
+        return added
+
+    # ---- Worker side ----
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Atomically claim the oldest pending task, or return ``None``."""
+        now = time.time()
+        with immediate_transaction(self._conn):
+            self._requeue_stale(now)
+            row = self._conn.execute(
+                "SELECT * FROM tasks WHERE state = 'pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                """
+                UPDATE tasks
+                SET state = 'claimed', worker = ?, claimed_at = ?, heartbeat_at = ?, attempts = attempts + 1
+                WHERE id = ?
+                """,
+                (worker, now, now, row["id"]),
+            )
+        return _task_dict(row)
+
+    def heartbeat(self, task_id: int, worker: str) -> bool:
+        """Refresh a claim; returns ``False`` if the claim was lost."""
+        cur = self._conn.execute(
+            "UPDATE tasks SET heartbeat_at = ? WHERE id = ? AND worker = ? AND state = 'claimed'",
+            (time.time(), task_id, worker),
+        )
+        return cur.rowcount == 1
+
+    def complete(self, task_id: int, worker: str, result: Optional[Dict[str, Any]]) -> None:
+        """Store a task result. ``result`` may be ``None`` for splits without a valid row.
+
+        Results are deterministic per task, so a result from a worker whose
+        claim went stale is still accepted as long as nobody finished first.
+        """
+        self._conn.execute(
+            """
+            UPDATE tasks
+            SET state = 'done', worker = ?, finished_at = ?, result = ?, error = NULL
+            WHERE id = ? AND state != 'done'
+            """,
+            (worker, time.time(), json.dumps(result), task_id),
+        )
+
+    def fail(self, task_id: int, worker: str, error: str) -> None:
+        """Record a failure; the task is retried until ``max_attempts`` is reached."""
+        with immediate_transaction(self._conn):
+            row = self._conn.execute("SELECT attempts, state FROM tasks WHERE id = ?", (task_id,)).fetchone()
+            if row is None or row["state"] == "done":
+                return
+            state = "failed" if row["attempts"] >= self.max_attempts else "pending"
+            self._conn.execute(
+                "UPDATE tasks SET state = ?, worker = ?, error = ?, finished_at = ? WHERE id = ?",
+                (state, worker, error, time.time(), task_id),
+            )
+
+    def _requeue_stale(self, now: float) -> int:
+        # A task whose workers keep dying (e.g. OOM) stops after max_attempts.
+        cur = self._conn.execute(
+            """
+            UPDATE tasks
+            SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                worker = NULL,
+                error = 'claim went stale (no heartbeat)'
+            WHERE state = 'claimed' AND heartbeat_at < ?
+            """,
+            (self.max_attempts, now - self.stale_after_s),
+        )
+        return cur.rowcount
+
+    # ---- Coordinator side ----
+    def requeue(self, *, stale: bool = True, failed: bool = False) -> int:
+        """Return stale claims and optionally failed tasks to the pending state."""
+        n = 0
+        with immediate_transaction(self._conn):
+            if stale:
+                n += self._requeue_stale(time.time())
+            if failed:
+                n += self._conn.execute(
+                    "UPDATE tasks SET state = 'pending', worker = NULL, attempts = 0 WHERE state = 'failed'"
+                ).rowcount
+        return n
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of tasks per state."""
+        out = {s: 0 for s in TASK_STATES}
+        for row in self._conn.execute("SELECT state, COUNT(*) AS n FROM tasks GROUP BY state"):
+            out[row["state"]] = int(row["n"])
+        return out
+
+    def has_open_tasks(self) -> bool:
+        """Return ``True`` while any task is pending or claimed."""
+        row = self._conn.execute(
+            "SELECT 1 FROM tasks WHERE state IN ('pending', 'claimed') LIMIT 1"
+        ).fetchone()
+        return row is not None
+
+    def out_csvs(self) -> List[Dict[str, Any]]:
+        """Return per-output-CSV progress: total, done and failed task counts."""
+        rows = self._conn.execute(
+            """
+            SELECT out_csv,
+                   COUNT(*) AS n_tasks,
+                   SUM(state = 'done') AS n_done,
+                   SUM(state = 'failed') AS n_failed
+            FROM tasks GROUP BY out_csv ORDER BY out_csv
+            """
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def tasks_for(self, out_csv: str) -> List[Dict[str, Any]]:
+        """Return all tasks writing to ``out_csv`` ordered by ``outer_i``."""
+        rows = self._conn.execute(
+            "SELECT * FROM tasks WHERE out_csv = ? ORDER BY outer_i", (out_csv,)
+        ).fetchall()
+        return [_task_dict(r) for r in rows]
+
+    def failures(self) -> List[Dict[str, Any]]:
+        """Return failed tasks together with their last error."""
+        rows = self._conn.execute("SELECT * FROM tasks WHERE state = 'failed' ORDER BY id").fetchall()
+        return [_task_dict(r) for r in rows]
+
+
+def _task_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    d = dict(row)
+    d["assignment_idx"] = None if d["assignment_idx"] < 0 else d["assignment_idx"]
+    d["payload"] = json.loads(d["payload"])
+    d["journal_config"] = json.loads(d["journal_config"])
+    d["result"] = json.loads(d["result"]) if d.get("result") is not None else None
+    return d
@@ -6,7 +6,7 @@ alternative windowing schemes including template- and timing-based views.
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 import os
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Tuple, Literal
@@ -180,6 +180,30 @@ def resolve_human_ai_groups(cfg: LoadConfig) -> Tuple[Tuple[str, ...], Tuple[str
     """Expose the resolved human/AI group split for external callers."""
     return _resolve_groups(cfg)
 
+
+def relabel_examples(examples: List[Example], cfg: LoadConfig) -> List[Example]:
+    """Reassign example labels to the human/AI split resolved from `cfg`.
+
+    Parsing and windowing never look at labels, so null assignments can reuse
+    one loaded corpus and only swap the group-to-label mapping. Drain3 cluster
+    ids keep the numbering of the original load's group order.
+    """
+    human_groups, ai_groups = _resolve_groups(cfg)
+
+    label_by_group: Dict[str, str] = {}
+    for g in human_groups:
+        label_by_group[g] = "human"
+    for g in ai_groups:
+        label_by_group[g] = "ai"
+
+    out: List[Example] = []
+    for ex in examples:
+        if ex.group not in label_by_group:
+            raise ValueError(f"Example group {ex.group!r} is not part of the resolved assignment")
+        label = label_by_group[ex.group]
+        out.append(ex if ex.label == label else replace(ex, label=label))
+    return out
+
 # -----------------------------
 # Log type detection (filename-level)
 # -----------------------------
@@ -0,0 +1,545 @@
+"""SQLite store for result tables of ML and statistics runs.
+
+A results tree holds one CSV per run and analysis, which makes every analysis
+script glob and parse hundreds of files. The store keeps each run as one row
+in ``runs``, keyed by (tool, dataset, log_type, model, assignment_idx, source)
+and indexed on the leading five columns. Its table rows go to ``rows`` as JSON
+arrays in the column order recorded on the run. Analysis scripts filter runs
+in SQL and aggregate a metric column with ``json_extract`` instead of reading
+whole files.
+
+Runners write finished runs directly (``--results_db``), and existing trees of
+the form ``results_*/{dataset}/{ml|stats}/{log_type}/{tool}/...`` are imported
+with ``python -m src.runners.results_db import``.
+
+Conventions shared with the work queue: a missing log type or model is stored
+as ``''`` and an observed (non-null) run has ``assignment_idx = -1``. Dataset
+names are stored lowercased so ``WordPress`` (runners) and ``wordpress``
+(result directories) match.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import math
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from src.core.ml.sqlite_tx import immediate_transaction
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id             INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind           TEXT    NOT NULL,
+    tool           TEXT    NOT NULL,
+    dataset        TEXT    NOT NULL,
+    log_type       TEXT    NOT NULL DEFAULT '',
+    model          TEXT    NOT NULL DEFAULT '',
+    assignment_idx INTEGER NOT NULL DEFAULT -1,
+    source         TEXT    NOT NULL,
+    columns        TEXT    NOT NULL,
+    n_rows         INTEGER NOT NULL,
+    source_mtime   REAL,
+    source_size    INTEGER,
+    written_at     REAL    NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS runs_key
+    ON runs(tool, dataset, log_type, model, assignment_idx, source);
+CREATE TABLE IF NOT EXISTS rows (
+    id     INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL,
+    row_i  INTEGER NOT NULL,
+    data   TEXT    NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS rows_run ON rows(run_id, row_i);
+"""
+
+RUN_KINDS = ("ml", "stats")
+
+_KEY_WHERE = (
+    "kind = ? AND tool = ? AND dataset = ? AND log_type = ? AND model = ? "
+    "AND assignment_idx = ? AND source = ?"
+)
+
+# Observed runs of the ML runners: {tool}_{model}_split_{n}_nested.csv, with
+# the model part missing for single-model runners (cnn_split_25_nested.csv).
+_RUN_NAME = re.compile(r"^(?P<model>.*?)_?(?:split_\d+|all_splits)_nested$")
+_NULL_IDX = re.compile(r"null_idx_(\d+)$")
+
+# Result directories that name a log type differently from the runners' --log_type.
+_LOG_TYPE_DIRS = {"application_log": "nextcloud"}
+
+
+# Legacy runner aliases (Data, Data_WP) are stored under their canonical name,
+# as in src.core.shared.actor_catalog.normalize_dataset_name.
+_DATASET_ALIASES = {"data": "nextcloud", "data_wp": "wordpress"}
+
+# ``PRAGMA user_version`` of an up-to-date database; see ``ResultsStore._migrate``.
+_SCHEMA_VERSION = 1
+
+
+def _norm_dataset(dataset: str) -> str:
+    name = str(dataset).lower()
+    return _DATASET_ALIASES.get(name, name)
+
+
+def _clean_value(value: Any) -> Any:
+    # JSON has no NaN/inf and SQLite's JSON functions reject them, so
+    # non-finite numbers become null (read back as NaN by pandas).
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if hasattr(value, "item"):
+        return _clean_value(value.item())
+    return str(value)
+
+
+def _parse_csv_value(raw: str) -> Any:
+    # CSV cells are text; store numbers as JSON numbers so metric queries can
+    # aggregate them directly.
+    if raw == "":
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        pass
+    try:
+        value = float(raw)
+    except ValueError:
+        return raw
+    return value if math.isfinite(value) else None
+
+
+def parse_results_path(rel_path: Path) -> Optional[Dict[str, Any]]:
+    """Map a CSV path below a results root to its run metadata.
+
+    Recognized layouts (relative to the root):
+
+    - ``{dataset}/ml/{log_type}/{tool}/null/{model}/*null_idx_{i}.csv``
+    - ``{dataset}/ml/{log_type}/{tool}/runs/{tool}_{model}_split_{n}_nested.csv``
+    - ``{dataset}/stats/{log_type}/{tool}/observed.csv``
+    - ``{dataset}/stats/{log_type}/{tool}/null/null_idx_{i}.csv``
+    - ``{dataset}/stats/summary/{tool}/sweep.csv`` (stored with log type ``summary``)
+
+    The ``application_log`` directory is stored as log type ``nextcloud``, the
+    name the runners use for it.
+
+    Returns ``None`` for paths that do not fit any of them.
+    """
+    parts = rel_path.parts
+    if len(parts) < 5 or parts[1] not in RUN_KINDS:
+        return None
+    dataset, kind, log_type, tool = parts[0], parts[1], parts[2], parts[3]
+    rest = parts[4:]
+    stem = Path(parts[-1]).stem
+
+    meta: Dict[str, Any] = {
+        "kind": kind,
+        "tool": tool,
+        "dataset": dataset,
+        "log_type": _LOG_TYPE_DIRS.get(log_type, log_type),
+        "model": None,
+        "assignment_idx": None,
+    }
+
+    if rest[0] == "null":
+        m = _NULL_IDX.search(stem)
+        if m is None:
+            return None
+        meta["assignment_idx"] = int(m.group(1))
+        if kind == "ml":
+            if len(rest) != 3:
+                return None
+            meta["model"] = rest[1]
+        return meta
+
+    if kind == "ml":
+        if rest[0] != "runs" or len(rest) != 2:
+            return None
+        name = stem[len(tool) + 1:] if stem.startswith(f"{tool}_") else stem
+        m = _RUN_NAME.match(name)
+        meta["model"] = (m.group("model") if m else name) or None
+        return meta
+
+    return meta if len(rest) == 1 else None
+
+
+class ResultsStore:
+    """Read and write runs in one results database.
+
+    Writes go through short ``BEGIN IMMEDIATE`` transactions, so several
+    runners may share a database on one machine. As with the work queue, a
+    database shared over NFS should not use WAL mode.
+    """
+
+    def __init__(self, path: str, *, busy_timeout_s: float = 60.0):
+        self.path = str(path)
+        p = Path(self.path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not p.exists()
+
+        # Autocommit mode: every transaction below is opened explicitly.
+        self._conn = sqlite3.connect(self.path, timeout=busy_timeout_s, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if is_new:
+            self._conn.execute("PRAGMA journal_mode=wal")
+        self._conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_s * 1000)}")
+        self._conn.executescript(_SCHEMA)
+        if self._user_version() < _SCHEMA_VERSION:
+            self._migrate()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _user_version(self) -> int:
+        return int(self._conn.execute("PRAGMA user_version").fetchone()[0])
+
+    def _migrate(self) -> None:
+        """Bring a database written by an older version up to ``_SCHEMA_VERSION``.
+
+        Runs once per database, so opening an up-to-date one for reading never
+        takes the write lock.
+        """
+        with immediate_transaction(self._conn):
+            # Another process may have migrated while this one waited for the lock.
+            if self._user_version() >= _SCHEMA_VERSION:
+                return
+            # Version 1: databases written before aliases were normalized stored
+            # them as-is. A run already present under the canonical name keeps
+            # its alias row.
+            for alias, canonical in _DATASET_ALIASES.items():
+                self._conn.execute("UPDATE OR IGNORE runs SET dataset = ? WHERE dataset = ?", (canonical, alias))
+            self._conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    # ---- Writing ----
+    def write_run(
+        self,
+        rows: Sequence[Mapping[str, Any]],
+        *,
+        kind: str,
+        tool: str,
+        dataset: str,
+        source: str,
+        log_type: Optional[str] = None,
+        model: Optional[str] = None,
+        assignment_idx: Optional[int] = None,
+        source_mtime: Optional[float] = None,
+        source_size: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> int:
+        """Store ``rows`` as one run, replacing a run with the same key. Returns the run id.
+
+        ``columns`` fixes the column order; by default it follows the rows.
+        """
+        key = self._key(kind, tool, dataset, log_type, model, assignment_idx, source)
+        columns = list(columns) if columns is not None else _columns(rows)
+        with immediate_transaction(self._conn):
+            old = self._run_id(key)
+            if old is not None:
+                self._conn.execute("DELETE FROM rows WHERE run_id = ?", (old,))
+                self._conn.execute("DELETE FROM runs WHERE id = ?", (old,))
+            run_id = self._insert_run(key, columns, len(rows), source_mtime, source_size)
+            self._insert_rows(run_id, 0, columns, rows)
+        return run_id
+
+    def append_rows(
+        self,
+        rows: Sequence[Mapping[str, Any]],
+        *,
+        kind: str,
+        tool: str,
+        dataset: str,
+        source: str,
+        log_type: Optional[str] = None,
+        model: Optional[str] = None,
+        assignment_idx: Optional[int] = None,
+    ) -> int:
+        """Append ``rows`` to a run, creating it if needed. Returns the run id.
+
+        Used by runners that, like the statistics sweeps, produce their table
+        one row at a time.
+        """
+        key = self._key(kind, tool, dataset, log_type, model, assignment_idx, source)
+        with immediate_transaction(self._conn):
+            run_id = self._run_id(key)
+            if run_id is None:
+                columns = _columns(rows)
+                run_id = self._insert_run(key, columns, 0, None, None)
+                start = 0
+            else:
+                row = self._conn.execute("SELECT n_rows, columns FROM runs WHERE id = ?", (run_id,)).fetchone()
+                start = int(row["n_rows"])
+                columns = json.loads(row["columns"])
+                columns += [c for c in _columns(rows) if c not in columns]
+                self._conn.execute("UPDATE runs SET columns = ? WHERE id = ?", (json.dumps(columns), run_id))
+            self._insert_rows(run_id, start, columns, rows)
+            self._conn.execute(
+                "UPDATE runs SET n_rows = ?, written_at = ? WHERE id = ?",
+                (start + len(rows), time.time(), run_id),
+            )
+        return run_id
+
+    def import_csv(self, csv_path: str, *, force: bool = False, **meta: Any) -> Optional[int]:
+        """Import one CSV as a run. Returns the run id, or ``None`` if it was unchanged.
+
+        A file is skipped when a run with the same key was imported from it at
+        the same modification time and size, unless ``force`` is set.
+        """
+        st = os.stat(csv_path)
+        source = str(csv_path)
+        if not force:
+            key = self._key(meta["kind"], meta["tool"], meta["dataset"], meta.get("log_type"),
+                            meta.get("model"), meta.get("assignment_idx"), source)
+            row = self._conn.execute(
+                "SELECT source_mtime, source_size FROM runs WHERE " + _KEY_WHERE, key
+            ).fetchone()
+            if row is not None and row["source_mtime"] == st.st_mtime and row["source_size"] == st.st_size:
+                return None
+
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            rows = [{k: _parse_csv_value(v or "") for k, v in r.items()} for r in reader]
+            columns = list(reader.fieldnames or [])
+        return self.write_run(
+            rows,
+            source=source,
+            source_mtime=st.st_mtime,
+            source_size=st.st_size,
+            columns=columns,
+            **meta,
+        )
+
+    def import_tree(self, root: str, *, force: bool = False) -> Tuple[int, int, List[str]]:
+        """Import every recognized CSV below ``root``.
+
+        Returns (imported, unchanged, unrecognized paths).
+        """
+        root_p = Path(root)
+        imported, unchanged, skipped = 0, 0, []
+        for csv_path in sorted(root_p.rglob("*.csv")):
+            meta = parse_results_path(csv_path.relative_to(root_p))
+            if meta is None:
+                skipped.append(str(csv_path))
+                continue
+            if self.import_csv(str(csv_path), force=force, **meta) is None:
+                unchanged += 1
+            else:
+                imported += 1
+        return imported, unchanged, skipped
+
+    # ---- Querying ----
+    def find_runs(
+        self,
+        *,
+        kind: Optional[str] = None,
+        tool: Optional[str] = None,
+        dataset: Optional[str] = None,
+        log_type: Optional[str] = None,
+        model: Optional[str] = None,
+        null: Optional[bool] = None,
+        assignment_idx: Optional[int] = None,
+        source_like: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return metadata of the runs matching all given filters.
+
+        ``null=True`` selects runs under a null label assignment, ``null=False``
+        the observed runs. ``source_like`` is an SQL ``LIKE`` pattern on the
+        source path. Runs are ordered by assignment index, then source.
+        """
+        where, params = _filters(kind, tool, dataset, log_type, model, null, assignment_idx, source_like)
+        rows = self._conn.execute(
+            f"SELECT * FROM runs r WHERE {where} ORDER BY r.assignment_idx, r.source", params
+        ).fetchall()
+        return [_run_dict(r) for r in rows]
+
+    def metric_means(self, metric: str, **filters: Any) -> List[Tuple[Dict[str, Any], Optional[float]]]:
+        """Return (run, mean of ``metric``) for the matching runs, aggregated in SQL.
+
+        Non-numeric and missing values are ignored, like ``pd.to_numeric(...,
+        errors="coerce")``. The mean is ``None`` for runs without any value.
+        """
+        where, params = _filters(**filters)
+        # The metric's array position can differ between runs, so it is looked
+        # up per run in the recorded column list.
+        rows = self._conn.execute(
+            f"""
+            WITH target AS (
+                SELECT r.id AS run_id,
+                       '$[' || (SELECT j.key FROM json_each(r.columns) j WHERE j.value = ?) || ']' AS path
+                FROM runs r WHERE {where}
+            )
+            SELECT r.*,
+                   AVG(CASE WHEN json_type(x.data, t.path) IN ('integer', 'real')
+                            THEN json_extract(x.data, t.path) END) AS metric_mean
+            FROM target t
+            JOIN runs r ON r.id = t.run_id
+            LEFT JOIN rows x ON x.run_id = t.run_id
+            GROUP BY r.id
+            ORDER BY r.assignment_idx, r.source
+            """,
+            [metric, *params],
+        ).fetchall()
+        return [(_run_dict(r), r["metric_mean"]) for r in rows]
+
+    def metric_values(self, run_id: int, metric: str) -> List[float]:
+        """Return the numeric values of ``metric`` in one run, in row order."""
+        columns = self._run_columns(run_id)
+        if metric not in columns:
+            return []
+        path = f"$[{columns.index(metric)}]"
+        rows = self._conn.execute(
+            """
+            SELECT json_extract(data, ?) AS v FROM rows
+            WHERE run_id = ? AND json_type(data, ?) IN ('integer', 'real')
+            ORDER BY row_i
+            """,
+            (path, run_id, path),
+        ).fetchall()
+        return [float(r["v"]) for r in rows]
+
+    def run_rows(self, run_id: int) -> List[Dict[str, Any]]:
+        """Return the rows of one run as dicts, in their original order."""
+        columns = self._run_columns(run_id)
+        out = []
+        for r in self._conn.execute("SELECT data FROM rows WHERE run_id = ? ORDER BY row_i", (run_id,)):
+            values = json.loads(r["data"])
+            # Rows appended before a column existed are shorter.
+            values += [None] * (len(columns) - len(values))
+            out.append(dict(zip(columns, values)))
+        return out
+
+    def run_frame(self, run_id: int):
+        """Return one run as a DataFrame with the original column order."""
+        import pandas as pd
+
+        return pd.DataFrame.from_records(self.run_rows(run_id), columns=self._run_columns(run_id))
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Return run counts per (kind, dataset, log_type, tool, model)."""
+        rows = self._conn.execute(
+            """
+            SELECT kind, dataset, log_type, tool, model,
+                   SUM(assignment_idx < 0) AS n_observed,
+                   SUM(assignment_idx >= 0) AS n_null,
+                   SUM(n_rows) AS n_rows
+            FROM runs
+            GROUP BY kind, dataset, log_type, tool, model
+            ORDER BY kind, dataset, log_type, tool, model
+            """
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    # ---- Internals ----
+    @staticmethod
+    def _key(kind, tool, dataset, log_type, model, assignment_idx, source) -> Tuple[Any, ...]:
+        if kind not in RUN_KINDS:
+            raise ValueError(f"kind must be one of {RUN_KINDS}, got {kind!r}")
+        return (
+            kind,
+            str(tool),
+            _norm_dataset(dataset),
+            log_type or "",
+            model or "",
+            -1 if assignment_idx is None else int(assignment_idx),
+            str(source),
+        )
+
+    def _run_columns(self, run_id: int) -> List[str]:
+        row = self._conn.execute("SELECT columns FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No run with id {run_id} in {self.path}")
+        return json.loads(row["columns"])
+
+    def _run_id(self, key: Tuple[Any, ...]) -> Optional[int]:
+        row = self._conn.execute("SELECT id FROM runs WHERE " + _KEY_WHERE, key).fetchone()
+        return None if row is None else int(row["id"])
+
+    def _insert_run(self, key, columns, n_rows, source_mtime, source_size) -> int:
+        cur = self._conn.execute(
+            """
+            INSERT INTO runs
+                (kind, tool, dataset, log_type, model, assignment_idx, source,
+                 columns, n_rows, source_mtime, source_size, written_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (*key, json.dumps(columns), n_rows, source_mtime, source_size, time.time()),
+        )
+        return int(cur.lastrowid)
+
+    def _insert_rows(
+        self,
+        run_id: int,
+        start: int,
+        columns: Sequence[str],
+        rows: Iterable[Mapping[str, Any]],
+    ) -> None:
+        self._conn.executemany(
+            "INSERT INTO rows (run_id, row_i, data) VALUES (?, ?, ?)",
+            (
+                (run_id, start + i, json.dumps([_clean_value(r.get(c)) for c in columns]))
+                for i, r in enumerate(rows)
+            ),
+        )
+
+
+def record_run(db_path: str, rows: Sequence[Mapping[str, Any]], **meta: Any) -> int:
+    """Open ``db_path``, store one run and close it again (see ``ResultsStore.write_run``)."""
+    store = ResultsStore(db_path)
+    try:
+        return store.write_run(rows, **meta)
+    finally:
+        store.close()
+
+
+def _columns(rows: Sequence[Mapping[str, Any]]) -> List[str]:
+    columns: Dict[str, None] = {}
+    for r in rows:
+        columns.update(dict.fromkeys(r.keys()))
+    return list(columns)
+
+
+def _filters(
+    kind: Optional[str] = None,
+    tool: Optional[str] = None,
+    dataset: Optional[str] = None,
+    log_type: Optional[str] = None,
+    model: Optional[str] = None,
+    null: Optional[bool] = None,
+    assignment_idx: Optional[int] = None,
+    source_like: Optional[str] = None,
+) -> Tuple[str, List[Any]]:
+    clauses: List[str] = []
+    params: List[Any] = []
+    for col, value in (("kind", kind), ("tool", tool), ("log_type", log_type), ("model", model)):
+        if value is not None:
+            clauses.append(f"r.{col} = ?")
+            params.append(value)
+    if dataset is not None:
+        clauses.append("r.dataset = ?")
+        params.append(_norm_dataset(dataset))
+    if null is True:
+        clauses.append("r.assignment_idx >= 0")
+    elif null is False:
+        clauses.append("r.assignment_idx < 0")
+    if assignment_idx is not None:
+        clauses.append("r.assignment_idx = ?")
+        params.append(int(assignment_idx))
+    if source_like is not None:
+        clauses.append("r.source LIKE ?")
+        params.append(source_like)
+    return (" AND ".join(clauses) or "1"), params
+
+
+def _run_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    d = {k: row[k] for k in row.keys() if k != "metric_mean"}
+    d["columns"] = json.loads(d["columns"])
+    d["assignment_idx"] = None if d["assignment_idx"] < 0 else d["assignment_idx"]
+    d["log_type"] = d["log_type"] or None
+    d["model"] = d["model"] or None
+    return d
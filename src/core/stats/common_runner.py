@@ -17,7 +17,11 @@ from src.core.stats.pairwise_viz import (
     plot_distance_heatmap,
     plot_mds_embedding,
 )
-from src.core.stats.statistic_evaluation_csv import append_statistic_evaluation_row
+from src.core.shared.results_store import ResultsStore
+from src.core.stats.statistic_evaluation_csv import (
+    append_statistic_evaluation_row,
+    build_statistic_evaluation_row,
+)
 
 
 def evaluate_single_run(
@@ -33,12 +37,15 @@ def evaluate_single_run(
     output_path: str | None = None,
     plot: bool = False,
     anonymize_humans: bool = False,
+    results_db: str | None = None,
+    dataset: str | None = None,
 ) -> dict:
     """Run one evaluation pass from pairwise distances to summary outputs.
 
     Labels are reordered to keep the human/AI block structure interpretable in
-    downstream statistics and plots. Returns the ordered labels, full distance
-    matrix, and computed group-level statistics.
+    downstream statistics and plots. With ``results_db`` the summary row is also
+    appended to that results database (``dataset`` is then required). Returns
+    the ordered labels, full distance matrix, and computed group-level statistics.
     """
     # Keep the matrix layout consistent across runs so group-level structure is
     # directly interpretable in both the statistics and the optional plots.
@@ -77,6 +84,33 @@ def evaluate_single_run(
             output_path=output_path,
         )
 
+    if results_db is not None:
+        if dataset is None:
+            raise ValueError("results_db requires dataset")
+        if assignment_mode == "random_stratified":
+            raise ValueError("random_stratified runs have no assignment index to store in results_db")
+        row = build_statistic_evaluation_row(
+            approach=tool_name,
+            distance_name=distance_name,
+            ordered_labels=ordered_labels,
+            hyperparameters=hyperparameters,
+            group_stats=group_stats,
+        )
+        store = ResultsStore(results_db)
+        try:
+            # One run per output table and log type, like the result tree layout.
+            store.append_rows(
+                [row],
+                kind="stats",
+                tool=tool_name,
+                dataset=dataset,
+                log_type=hyperparameters.get("log_type"),
+                assignment_idx=assignment_idx if assignment_mode == "indexed_stratified" else None,
+                source=str(output_path or ""),
+            )
+        finally:
+            store.close()
+
     if plot:
         # The plotting path mirrors the evaluated ordering/assignment so visual
         # diagnostics stay aligned with the reported statistics.
@@ -10,13 +10,14 @@ from pathlib import Path
 import re
 from collections.abc import Callable, Sequence
 from inspect import signature
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-import matplotlib.pyplot as plt
 import numpy as np
-from matplotlib.patches import Ellipse
 from sklearn.manifold import MDS
 
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
+
 
 PairExtractor = Callable[[Any], tuple[str, str, float]]
 PointStyler = Callable[[str], dict[str, Any]]
@@ -72,6 +73,8 @@ def _finalize_figure(
 
     Returns the resolved output path when the figure is written to disk.
     """
+    import matplotlib.pyplot as plt
+
     output_path = Path(save_path) if save_path is not None else None
     if output_path is not None:
         output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -199,6 +202,8 @@ def plot_distance_heatmap(
     separators. For symmetric matrices, upper-triangle display is usually the
     clearest presentation.
     """
+    import matplotlib.pyplot as plt
+
     matrix = np.asarray(distance_matrix, dtype=float)
     labels = list(labels)
     display_labels = (
@@ -345,6 +350,8 @@ def _add_group_ellipse(
     With two points, the ellipse is derived from the connecting segment; with
     larger groups, it is estimated from the covariance structure.
     """
+    from matplotlib.patches import Ellipse
+
     if len(points) < 2:
         return
 
@@ -414,6 +421,8 @@ def plot_mds_embedding(
     Points can be grouped and styled separately for human versus AI actors.
     Returns the 2D coordinates and the fitted stress value.
     """
+    import matplotlib.pyplot as plt
+
     labels = list(labels)
     display_labels = (
         anonymize_actor_labels(labels, ai_marker=ai_marker, human_prefix=human_prefix)
@@ -60,23 +60,19 @@ def _json_dumps(value: Any) -> str:
     return json.dumps(value, sort_keys=True, ensure_ascii=True)
 
 
-def append_statistic_evaluation_row(
+def build_statistic_evaluation_row(
     *,
     approach: str,
     distance_name: str,
     ordered_labels: list[str],
     hyperparameters: dict[str, Any],
     group_stats: dict[str, Any],
-    output_path: str | Path = DEFAULT_OUTPUT_PATH,
-) -> Path:
-    """Append one evaluation result to the statistics CSV and return its path.
+) -> dict[str, Any]:
+    """Return one evaluation result as a row with the ``CSV_COLUMNS`` schema.
 
     The input is expected to follow the grouped summary structure produced by the
     statistical evaluation pipeline, with both scalar summaries and test outputs.
     """
-    output = Path(output_path)
-    output.parent.mkdir(parents=True, exist_ok=True)
-
     # Keep the nested outputs intact for later inspection while also exposing the
     # most commonly queried summary metrics as flat columns.
     summaries = group_stats["group_summaries"]
@@ -114,6 +110,29 @@ def append_statistic_evaluation_row(
         "mw_ai_human_vs_human_human_p": tests["ai_human_vs_human_human"]["p_value"],
         "mw_ai_human_vs_human_human_cliffs_delta": tests["ai_human_vs_human_human"]["cliffs_delta"],
     }
+    return row
+
+
+def append_statistic_evaluation_row(
+    *,
+    approach: str,
+    distance_name: str,
+    ordered_labels: list[str],
+    hyperparameters: dict[str, Any],
+    group_stats: dict[str, Any],
+    output_path: str | Path = DEFAULT_OUTPUT_PATH,
+) -> Path:
+    """Append one evaluation result to the statistics CSV and return its path."""
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    row = build_statistic_evaluation_row(
+        approach=approach,
+        distance_name=distance_name,
+        ordered_labels=ordered_labels,
+        hyperparameters=hyperparameters,
+        group_stats=group_stats,
+    )
 
     # Write the header only once so repeated appends remain valid CSV exports.
     file_exists = output.exists()
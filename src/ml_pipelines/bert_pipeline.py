@@ -7,27 +7,50 @@ and evaluate the test split only once for the selected model.
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Iterable, Tuple, Any
+from typing import Dict, List, Optional, Iterable, Tuple, Any, Union
 
 import copy
+import os
+import tempfile
+import time
 import numpy as np
 import torch
-from torch.utils.data import Dataset, DataLoader
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, get_linear_schedule_with_warmup
+from torch.utils.data import Dataset, DataLoader, Sampler
+from transformers import AutoModel, AutoModelForSequenceClassification, get_linear_schedule_with_warmup
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
 
 from tqdm.auto import tqdm
 
 from src.core.ml.data import Example
 from src.core.ml.splits import Split
 from src.core.ml.eval import EvalResult, evaluate_classifier
+from src.core.ml.resources import dataloader_workers
+from src.core.ml.token_cache import TokenIdCache, get_token_cache
+from src.core.ml.embedding_cache import get_embedding_cache
+from src.core.ml.dedup import unique_inverse, unique_pairs
 
 
 class TextDataset(Dataset):
-    """Minimal dataset wrapper for tokenized text batches and label tensors."""
+    """Minimal dataset wrapper for tokenized text batches and label tensors.
 
-    def __init__(self, encodings: Dict[str, torch.Tensor], labels: torch.Tensor):
+    Items carry their row index under ``"idx"`` so predictions made in a
+    length-sorted order can be put back into dataset order, and a ``"weight"``
+    (row multiplicity) when duplicate rows were collapsed.
+    """
+
+    def __init__(
+        self,
+        encodings: Dict[str, torch.Tensor],
+        labels: torch.Tensor,
+        weights: Optional[torch.Tensor] = None,
+    ):
         self.encodings = encodings
         self.labels = labels
+        self.weights = weights
+        # Non-padding tokens per row, used for length bucketing.
+        self.lengths = encodings["attention_mask"].sum(dim=1).numpy()
 
     def __len__(self) -> int:
         return self.labels.size(0)
@@ -35,9 +58,112 @@ class TextDataset(Dataset):
     def __getitem__(self, idx: int) -> Dict[str, torch.Tensor]:
         item = {k: v[idx] for k, v in self.encodings.items()}
         item["labels"] = self.labels[idx]
+        item["idx"] = torch.tensor(idx)
+        if self.weights is not None:
+            item["weight"] = self.weights[idx]
         return item
 
 
+# ---- Length-bucketed batching ----
+class LengthBucketSampler(Sampler):
+    """Yield batches of row indices whose texts have similar token lengths.
+
+    For training, rows are shuffled, grouped into pools of ``pool_batches``
+    batches, sorted by length within each pool and cut into batches; the batch
+    order is shuffled again so consecutive steps do not walk from short to long
+    texts. For inference, all rows are sorted by length once.
+    """
+
+    def __init__(
+        self,
+        lengths: np.ndarray,
+        batch_size: int,
+        *,
+        shuffle: bool,
+        seed: int = 0,
+        pool_batches: int = 50,
+    ):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = int(batch_size)
+        self.shuffle = shuffle
+        self.seed = int(seed)
+        self.pool_batches = int(pool_batches)
+        self._epoch = 0
+
+    def __len__(self) -> int:
+        return (len(self.lengths) + self.batch_size - 1) // self.batch_size
+
+    def __iter__(self):
+        n = len(self.lengths)
+        if not self.shuffle:
+            order = np.argsort(self.lengths, kind="stable")
+            for i in range(0, n, self.batch_size):
+                yield order[i:i + self.batch_size].tolist()
+            return
+
+        # A fresh but reproducible permutation per epoch.
+        rng = np.random.default_rng((self.seed, self._epoch))
+        self._epoch += 1
+        perm = rng.permutation(n)
+        pool = self.batch_size * max(1, self.pool_batches)
+        batches: List[np.ndarray] = []
+        for i in range(0, n, pool):
+            chunk = perm[i:i + pool]
+            chunk = chunk[np.argsort(self.lengths[chunk], kind="stable")]
+            batches.extend(chunk[j:j + self.batch_size] for j in range(0, len(chunk), self.batch_size))
+        for b in rng.permutation(len(batches)):
+            yield batches[b].tolist()
+
+
+class DynamicPaddingCollator:
+    """Stack dataset items and cut the padding down to the longest row in the batch.
+
+    Rows are stored padded to ``max_length`` with the tokenizer's pad id, so
+    trimming the shared padding columns yields exactly what the tokenizer
+    returns with ``padding="longest"``.
+    """
+
+    _SEQUENCE_KEYS = ("input_ids", "attention_mask", "token_type_ids")
+
+    def __init__(self, padding_side: str = "right"):
+        self.padding_side = padding_side
+
+    def __call__(self, items: List[Dict[str, torch.Tensor]]) -> Dict[str, torch.Tensor]:
+        batch = {k: torch.stack([it[k] for it in items]) for k in items[0]}
+        width = int(batch["attention_mask"].sum(dim=1).max()) if items else 0
+        width = max(1, width)
+        for k in self._SEQUENCE_KEYS:
+            if k in batch:
+                batch[k] = batch[k][:, -width:] if self.padding_side == "left" else batch[k][:, :width]
+        return batch
+
+
+def _make_loader(
+    ds: TextDataset,
+    cfg: Union["TransformerConfig", "FrozenEncoderConfig"],
+    *,
+    shuffle: bool,
+    padding_side: str,
+) -> DataLoader:
+    """Build a loader that pads each batch to its longest row (or to ``max_length``)."""
+    pin = cfg.device.startswith("cuda")
+    if not cfg.length_bucketing:
+        return DataLoader(
+            ds,
+            batch_size=cfg.batch_size,
+            shuffle=shuffle,
+            num_workers=dataloader_workers(2),
+            pin_memory=pin,
+        )
+    return DataLoader(
+        ds,
+        batch_sampler=LengthBucketSampler(ds.lengths, cfg.batch_size, shuffle=shuffle, seed=cfg.seed),
+        collate_fn=DynamicPaddingCollator(padding_side),
+        num_workers=dataloader_workers(2),
+        pin_memory=pin,
+    )
+
+
 @dataclass(frozen=True)
 class TransformerConfig:
     """Training and evaluation settings for a transformer classifier.
@@ -56,6 +182,11 @@ class TransformerConfig:
     seed: int = 42
     device: str = "cuda" if torch.cuda.is_available() else "cpu"
     grad_clip_norm: float = 1.0  # Stabilizes fine-tuning on small or noisy splits.
+    # Backend for the reported validation/test prediction: torch, int8
+    # (dynamically quantized Linear layers) or onnx (onnxruntime). int8 and
+    # onnx run on the CPU. Early-stopping checks during training always use
+    # torch: each check would otherwise re-quantize or re-export the model.
+    inference_backend: str = "torch"
 
     # ---- Early stopping ----
     early_stopping: bool = True
@@ -64,6 +195,12 @@ class TransformerConfig:
     min_delta: float = 0.0
     eval_every: int = 2  # Evaluate on validation every N epochs.
 
+    # ---- Batching ----
+    # Group texts of similar length and pad each batch only to its longest row.
+    length_bucketing: bool = True
+    # Train on distinct (text, label) pairs with the loss weighted by their count.
+    dedup_train: bool = False
+
 
 def _set_seed(seed: int) -> None:
     """Seed Python, NumPy, and PyTorch for reproducible training runs."""
@@ -76,45 +213,136 @@ def _set_seed(seed: int) -> None:
         torch.cuda.manual_seed_all(seed)
 
 
-def _encode_texts(
-    tokenizer,
-    texts: List[str],
-    max_length: int,
-    *,
-    desc: str,
-    verbose: bool
-) -> Dict[str, torch.Tensor]:
-    """Tokenize raw texts into padded tensors compatible with the model.
+def _encode_rows(cache: TokenIdCache, rows: np.ndarray) -> Dict[str, torch.Tensor]:
+    """Return padded model inputs for cached rows (see ``src.core.ml.token_cache``).
 
-    Uses chunked encoding only when progress reporting is enabled to keep large
-    tokenization jobs transparent without changing the resulting tensors.
+    The tensors equal what the tokenizer returns with ``padding="max_length"``,
+    but each text is tokenized only once across candidates and outer splits.
     """
+    return {k: torch.from_numpy(v) for k, v in cache.arrays(rows).items()}
 
-    if not verbose:
-        return tokenizer(
-            texts,
-            padding="max_length",
-            truncation=True,
-            max_length=max_length,
-            return_tensors="pt",
-        )
 
-    # Chunking is only for progress visibility on large corpora.
-    chunk = 2048
-    enc_parts: Dict[str, List[torch.Tensor]] = {}
-    for i in tqdm(range(0, len(texts), chunk), desc=desc, leave=False):
-        batch = texts[i:i + chunk]
-        out = tokenizer(
-            batch,
-            padding="max_length",
-            truncation=True,
-            max_length=max_length,
-            return_tensors="pt",
-        )
-        for k, v in out.items():
-            enc_parts.setdefault(k, []).append(v)
+class _ParamSnapshot:
+    """CPU copy of a model's trainable parameters for early-stopping restores.
+
+    Buffers and frozen parameters do not change during training, so only
+    parameters with ``requires_grad`` are copied. The CPU tensors are allocated
+    at the first save and overwritten in place at every later improvement, so
+    no device memory is held for the checkpoint.
+    """
+
+    def __init__(self):
+        self._cpu: Dict[str, torch.Tensor] = {}
+        self.n_saves = 0
+        self.seconds = 0.0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(t.numel() * t.element_size() for t in self._cpu.values())
+
+    @torch.no_grad()
+    def save(self, model) -> None:
+        t0 = time.perf_counter()
+        for name, p in model.named_parameters():
+            if not p.requires_grad:
+                continue
+            buf = self._cpu.get(name)
+            if buf is None:
+                buf = torch.empty(p.shape, dtype=p.dtype, device="cpu", pin_memory=p.is_cuda)
+                self._cpu[name] = buf
+            buf.copy_(p.detach())
+        self.n_saves += 1
+        self.seconds += time.perf_counter() - t0
+
+    @torch.no_grad()
+    def restore(self, model) -> None:
+        t0 = time.perf_counter()
+        params = dict(model.named_parameters())
+        for name, buf in self._cpu.items():
+            params[name].copy_(buf)
+        self.seconds += time.perf_counter() - t0
+
+
+def _state_nbytes(model) -> int:
+    """Size of the full ``state_dict`` (what a ``deepcopy`` checkpoint would hold)."""
+    return sum(t.numel() * t.element_size() for t in model.state_dict().values())
+
+
+# ---- CPU inference backends ----
+INFERENCE_BACKENDS = ("torch", "int8", "onnx")
+
+
+class _OnnxClassifier:
+    """Sequence classifier exported to ONNX and run with onnxruntime.
+
+    Export happens at the first batch so the graph gets exactly the input
+    names the loader produces; batch and sequence axes stay dynamic, so
+    dynamically padded batches run unchanged.
+    """
 
-    return {k: torch.cat(vs, dim=0) for k, vs in enc_parts.items()}
+    def __init__(self, model):
+        try:
+            import onnxruntime as ort
+        except ModuleNotFoundError as exc:
+            raise ModuleNotFoundError(
+                "onnxruntime is required for inference_backend='onnx'. "
+                "Install it with: python3 -m pip install onnxruntime"
+            ) from exc
+        self._ort = ort
+        self._model = copy.deepcopy(model).to("cpu").eval()
+        self._session = None
+        self._names: List[str] = []
+
+    def _export(self, batch: Dict[str, torch.Tensor]) -> None:
+        self._names = list(batch.keys())
+        model, names = self._model, self._names
+
+        class _Logits(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.model = model
+
+            def forward(self, *inputs):
+                return self.model(**dict(zip(names, inputs))).logits
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "model.onnx")
+            torch.onnx.export(
+                _Logits(),
+                tuple(batch[k] for k in names),
+                path,
+                input_names=names,
+                output_names=["logits"],
+                dynamic_axes={**{k: {0: "batch", 1: "seq"} for k in names}, "logits": {0: "batch"}},
+                opset_version=17,
+                dynamo=False,
+            )
+            opts = self._ort.SessionOptions()
+            # Stay inside the process's thread budget (see src.core.ml.resources).
+            opts.intra_op_num_threads = torch.get_num_threads()
+            self._session = self._ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self._model = None
+
+    def __call__(self, **batch: torch.Tensor) -> torch.Tensor:
+        if self._session is None:
+            self._export(batch)
+        feeds = {k: batch[k].numpy() for k in self._names}
+        return torch.from_numpy(self._session.run(["logits"], feeds)[0])
+
+
+def _inference_model(model, backend: str, device: str):
+    """Return ``(callable returning logits, device for inputs)`` for ``backend``."""
+    if backend == "torch":
+        return (lambda **batch: model(**batch).logits), device
+    if backend == "int8":
+        # Quantizes a CPU copy; the training model keeps its fp32 weights.
+        quantized = torch.ao.quantization.quantize_dynamic(
+            copy.deepcopy(model).to("cpu").eval(), {torch.nn.Linear}, dtype=torch.qint8
+        )
+        return (lambda **batch: quantized(**batch).logits), "cpu"
+    if backend == "onnx":
+        return _OnnxClassifier(model), "cpu"
+    raise ValueError(f"inference_backend must be one of: {', '.join(INFERENCE_BACKENDS)}")
 
 
 @torch.no_grad()
@@ -123,28 +351,56 @@ def _predict(
     dataloader: DataLoader,
     device: str,
     *,
+    backend: str = "torch",
     desc: str = "predict",
     verbose: bool = True
 ) -> np.ndarray:
-    """Run batched inference and return predicted class ids as a NumPy array."""
+    """Run batched inference and return predicted class ids in dataset order.
+
+    ``backend`` selects plain torch, an int8 dynamically quantized copy or an
+    ONNX Runtime session (see ``INFERENCE_BACKENDS``); the latter two run on
+    the CPU regardless of ``device``.
+    """
 
     model.eval()
+    logits_fn, device = _inference_model(model, backend, device)
     preds: List[np.ndarray] = []
+    order: List[np.ndarray] = []
     it = dataloader if not verbose else tqdm(dataloader, desc=desc, leave=False)
     for batch in it:
+        # Length-bucketed loaders visit rows out of order; "idx" restores it.
+        order.append(batch.pop("idx").numpy())
         batch = {k: v.to(device) for k, v in batch.items()}
         batch.pop("labels", None)
-        outputs = model(**batch)
-        pred = torch.argmax(outputs.logits, dim=-1)
+        pred = torch.argmax(logits_fn(**batch), dim=-1)
         preds.append(pred.cpu().numpy())
-    return np.concatenate(preds, axis=0) if preds else np.array([], dtype=np.int64)
+    if not preds:
+        return np.array([], dtype=np.int64)
+    out = np.empty(sum(len(p) for p in preds), dtype=np.int64)
+    out[np.concatenate(order)] = np.concatenate(preds)
+    return out
+
+
+def _distinct_loader(
+    cache: TokenIdCache,
+    rows: np.ndarray,
+    cfg: TransformerConfig,
+) -> Tuple[DataLoader, np.ndarray]:
+    """Return a prediction loader over the distinct rows and the broadcast index.
+
+    ``_predict(...)[inverse]`` yields one prediction per entry of ``rows``
+    while every distinct text goes through the network only once.
+    """
+    first, inverse = unique_inverse(rows.tolist())
+    ds = TextDataset(_encode_rows(cache, rows[first]), torch.zeros(len(first), dtype=torch.long))
+    return _make_loader(ds, cfg, shuffle=False, padding_side=cache.padding_side), inverse
 
 
 def _evaluate_on_split(
     *,
     model,
-    tokenizer,
-    X_text: List[str],
+    cache: TokenIdCache,
+    rows: np.ndarray,
     y_ids: np.ndarray,
     cfg: TransformerConfig,
     id2label: Dict[int, str],
@@ -158,18 +414,10 @@ def _evaluate_on_split(
     computation so the evaluation stays aligned with the global label space.
     """
 
-    enc = _encode_texts(tokenizer, X_text, cfg.max_length, desc=f"{desc_prefix} tokenize", verbose=verbose)
-    ds = TextDataset(enc, torch.tensor(y_ids))
-
-    loader = DataLoader(
-        ds,
-        batch_size=cfg.batch_size,
-        shuffle=False,
-        num_workers=2,
-        pin_memory=cfg.device.startswith("cuda"),
-    )
-
-    y_pred = _predict(model, loader, cfg.device, desc=f"{desc_prefix} predict", verbose=verbose)
+    loader, inverse = _distinct_loader(cache, rows, cfg)
+    y_pred = _predict(
+        model, loader, cfg.device, backend=cfg.inference_backend, desc=f"{desc_prefix} predict", verbose=verbose
+    )[inverse]
 
     y_true_str = np.array([id2label[i] for i in y_ids], dtype=object)
     y_pred_str = np.array([id2label[i] for i in y_pred], dtype=object)
@@ -194,7 +442,6 @@ def run_one(
     _set_seed(cfg.seed)
 
     # ---- Prepare labels and fixed split views ----
-    X = np.array([ex.text for ex in examples], dtype=object)
     y_str = np.array([ex.label for ex in examples], dtype=object)
 
     labels_sorted = sorted(set(y_str.tolist()))
@@ -202,52 +449,52 @@ def run_one(
     id2label = {i: lab for lab, i in label2id.items()}
     y = np.array([label2id[v] for v in y_str], dtype=np.int64)
 
-    X_train, y_train = X[split.train_idx].tolist(), y[split.train_idx]
-    X_val, y_val = X[split.val_idx].tolist(), y[split.val_idx]
-    X_test, y_test = X[split.test_idx].tolist(), y[split.test_idx]
+    y_train = y[split.train_idx]
+    y_val = y[split.val_idx]
+    y_test = y[split.test_idx]
 
     if verbose:
         print(
             f"\n[BERT] model={cfg.model_name} | "
-            f"train={len(X_train)} val={len(X_val)} test={len(X_test)} | "
+            f"train={len(y_train)} val={len(y_val)} test={len(y_test)} | "
             f"epochs={cfg.epochs} bs={cfg.batch_size} max_len={cfg.max_length} lr={cfg.lr:g}"
         )
         print(f"[BERT] device={cfg.device}")
 
-    tokenizer = AutoTokenizer.from_pretrained(cfg.model_name)
+    # Token ids come from the shared cache: the corpus is tokenized once per
+    # tokenizer/max_length, and each split only indexes into it.
+    cache = get_token_cache(cfg.model_name, cfg.max_length)
+    rows = cache.rows_for([ex.text for ex in examples], verbose=verbose)
 
     # ---- Build datasets and loaders ----
-    # Test tokenization stays separate so search does not leak work onto test data.
-    train_enc = _encode_texts(tokenizer, X_train, cfg.max_length, desc="[BERT] tokenize train", verbose=verbose)
-    val_enc = _encode_texts(tokenizer, X_val, cfg.max_length, desc="[BERT] tokenize val", verbose=verbose)
-
-    train_ds = TextDataset(train_enc, torch.tensor(y_train))
-    val_ds = TextDataset(val_enc, torch.tensor(y_val))
-
-    pin = cfg.device.startswith("cuda")
+    # Validation predicts each distinct text once (broadcast through
+    # ``val_inv``); training keeps every row unless ``dedup_train`` is set.
+    train_rows = rows[split.train_idx]
+    if cfg.dedup_train:
+        first, counts = unique_pairs(train_rows.tolist(), y_train.tolist())
+        train_ds = TextDataset(
+            _encode_rows(cache, train_rows[first]), torch.tensor(y_train[first]), torch.from_numpy(counts)
+        )
+    else:
+        train_ds = TextDataset(_encode_rows(cache, train_rows), torch.tensor(y_train))
 
-    train_loader = DataLoader(
-        train_ds,
-        batch_size=cfg.batch_size,
-        shuffle=True,
-        num_workers=2,
-        pin_memory=pin,
-    )
+    train_loader = _make_loader(train_ds, cfg, shuffle=True, padding_side=cache.padding_side)
+    val_loader, val_inv = _distinct_loader(cache, rows[split.val_idx], cfg)
 
-    val_loader = DataLoader(
-        val_ds,
-        batch_size=cfg.batch_size,
-        shuffle=False,
-        num_workers=2,
-        pin_memory=pin,
-    )
+    if verbose:
+        print(
+            f"[BERT] distinct rows: train={len(train_ds)}/{len(train_rows)} "
+            f"val={len(val_loader.dataset)}/{len(val_inv)}"
+        )
 
+    t_load = time.perf_counter()
     model = AutoModelForSequenceClassification.from_pretrained(
         cfg.model_name,
         num_labels=len(labels_sorted),
         id2label=id2label,
         label2id=label2id,
     ).to(cfg.device)
+    load_seconds = time.perf_counter() - t_load
 
     # Optional encoder freezing can make broad searches cheaper, but is disabled here.
     '''
@@ -279,7 +526,9 @@ def run_one(
     # class_weights = np.minimum(class_weights, 10.0)
 
     class_weights_t = torch.tensor(class_weights, dtype=torch.float32, device=cfg.device)
-    loss_fn = torch.nn.CrossEntropyLoss(weight=class_weights_t)
+    # With collapsed duplicates each row's loss is scaled by its count; the
+    # normalization matches the weighted mean over the original rows.
+    loss_fn = torch.nn.CrossEntropyLoss(weight=class_weights_t, reduction="none" if cfg.dedup_train else "mean")
 
     # ---- Training with periodic validation checks ----
     use_es = bool(cfg.early_stopping)
@@ -289,7 +538,7 @@ def run_one(
     y_val_true_str = np.array([id2label[i] for i in y_val], dtype=object)
 
     best_score = -float("inf")
-    best_state: Optional[Dict[str, torch.Tensor]] = None
+    snapshot = _ParamSnapshot()
     bad = 0
 
     global_step = 0
@@ -300,13 +549,17 @@ def run_one(
         seen = 0
 
         for batch in epoch_bar:
+            batch.pop("idx")
             batch = {k: v.to(cfg.device) for k, v in batch.items()}
 
             # Loss is computed explicitly so the weighted criterion is always used.
             labels = batch.pop("labels")
+            weight = batch.pop("weight", None)
             outputs = model(**batch)
             logits = outputs.logits
             loss = loss_fn(logits, labels)
+            if weight is not None:
+                loss = (loss * weight).sum() / (weight * class_weights_t[labels]).sum()
 
             loss.backward()
 
@@ -334,14 +587,17 @@ def run_one(
 
         # Validation is intentionally periodic to reduce search cost on longer runs.
         if use_es and (epoch % max(1, cfg.eval_every) == 0):
-            y_val_pred = _predict(model, val_loader, cfg.device, desc=f"[BERT] val @ epoch {epoch}", verbose=False)
+            y_val_pred = _predict(
+                model, val_loader, cfg.device,
+                backend="torch", desc=f"[BERT] val @ epoch {epoch}", verbose=False,
+            )[val_inv]
             y_val_pred_str = np.array([id2label[i] for i in y_val_pred], dtype=object)
             val_res_epoch = evaluate_classifier(y_val_true_str, y_val_pred_str, labels=labels_sorted)
             val_score = float(getattr(val_res_epoch, cfg.early_stop_metric))
 
             if val_score > (best_score + float(cfg.min_delta)):
                 best_score = val_score
-                best_state = copy.deepcopy(model.state_dict())
+                snapshot.save(model)
                 bad = 0
                 if verbose:
                     print(f"[BERT] early-stop: new best {cfg.early_stop_metric}={best_score:.4f} at epoch {epoch}")
@@ -355,11 +611,13 @@ def run_one(
                     break
 
     # Restore the best validation checkpoint before the final reported metrics.
-    if use_es and best_state is not None:
-        model.load_state_dict(best_state)
+    if use_es and snapshot.n_saves:
+        snapshot.restore(model)
 
     # ---- Final evaluation and optional artifacts ----
-    y_val_pred = _predict(model, val_loader, cfg.device, desc="[BERT] predict val", verbose=verbose)
+    y_val_pred = _predict(
+        model, val_loader, cfg.device, backend=cfg.inference_backend, desc="[BERT] predict val", verbose=verbose
+    )[val_inv]
     y_val_pred_str = np.array([id2label[i] for i in y_val_pred], dtype=object)
     val_res = evaluate_classifier(y_val_true_str, y_val_pred_str, labels=labels_sorted)
 
@@ -369,8 +627,8 @@ def run_one(
     if compute_test:
         test_res = _evaluate_on_split(
             model=model,
-            tokenizer=tokenizer,
-            X_text=X_test,
+            cache=cache,
+            rows=rows[split.test_idx],
             y_ids=y_test,
             cfg=cfg,
             id2label=id2label,
@@ -380,9 +638,220 @@ def run_one(
         )
         out["test"] = test_res
 
-    # Returning the trained state lets search reuse the winning model directly.
+    # Returning the trained model lets search evaluate the winner on test
+    # without reloading it from the hub cache.
     if return_state:
-        out["state_dict"] = copy.deepcopy(model.state_dict())
+        out["model"] = model
+        out["meta"] = {
+            "labels_sorted": labels_sorted,
+            "label2id": label2id,
+            "id2label": id2label,
+            "checkpoint": {
+                "snapshots": snapshot.n_saves,
+                "snapshot_bytes": snapshot.nbytes,
+                "snapshot_seconds": snapshot.seconds,
+                "state_bytes": _state_nbytes(model),
+                "load_seconds": load_seconds,
+            },
+        }
+
+    return out
+
+
+# ---- Frozen-encoder heads ----
+@dataclass(frozen=True)
+class FrozenEncoderConfig:
+    """Classification head trained on cached embeddings of a frozen encoder.
+
+    The encoder runs once per (model, max_length, text) and its pooled outputs
+    are cached (see ``src.core.ml.embedding_cache``); candidates that differ only
+    in head settings then train in seconds on those features.
+    """
+
+    model_name: str = "roberta-base"
+    max_length: int = 128
+    pooling: str = "mean"  # One of: mean, cls.
+    batch_size: int = 64  # Encoder batch size when filling the cache.
+    head: str = "logreg"  # One of: logreg, mlp.
+
+    # ---- logreg ----
+    C: float = 1.0
+
+    # ---- mlp ----
+    hidden_size: int = 256
+    dropout: float = 0.1
+    lr: float = 1e-3
+    epochs: int = 30
+    head_batch_size: int = 256
+    weight_decay: float = 0.01
+
+    seed: int = 42
+    device: str = "cuda" if torch.cuda.is_available() else "cpu"
+    length_bucketing: bool = True
+
+
+_ENCODERS: Dict[Tuple[str, str], Any] = {}
+
+
+def _load_encoder(model_name: str, device: str):
+    """Load (once per process) the bare encoder used for embeddings."""
+    key = (model_name, device)
+    model = _ENCODERS.get(key)
+    if model is None:
+        model = AutoModel.from_pretrained(model_name).to(device).eval()
+        _ENCODERS[key] = model
+    return model
+
+
+@torch.no_grad()
+def _embed_rows(
+    cfg: FrozenEncoderConfig,
+    cache: TokenIdCache,
+    rows: np.ndarray,
+    *,
+    verbose: bool,
+) -> np.ndarray:
+    """Return pooled encoder embeddings for token-cache rows, encoding only uncached ones."""
+    if cfg.pooling not in {"mean", "cls"}:
+        raise ValueError("FrozenEncoderConfig.pooling must be one of: mean, cls")
+
+    emb = get_embedding_cache(cache, f"{cfg.model_name}_{cfg.pooling}")
+    todo = emb.missing(rows)
+    if len(todo):
+        model = _load_encoder(cfg.model_name, cfg.device)
+        ds = TextDataset(_encode_rows(cache, todo), torch.zeros(len(todo), dtype=torch.long))
+        loader = _make_loader(ds, cfg, shuffle=False, padding_side=cache.padding_side)
+
+        order: List[np.ndarray] = []
+        vecs: List[np.ndarray] = []
+        it = tqdm(loader, desc=f"[BERT] embed {len(todo)} texts", leave=False, disable=not verbose)
+        for batch in it:
+            order.append(batch.pop("idx").numpy())
+            batch.pop("labels")
+            batch = {k: v.to(cfg.device) for k, v in batch.items()}
+            hidden = model(**batch).last_hidden_state
+            if cfg.pooling == "cls":
+                pooled = hidden[:, 0]
+            else:
+                mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1.0)
+            vecs.append(pooled.float().cpu().numpy())
+        emb.put(todo[np.concatenate(order)], np.concatenate(vecs))
+
+    return emb.get(rows)
+
+
+class _MLPHead:
+    """One-hidden-layer classifier on standardized embeddings (weighted CE loss)."""
+
+    def __init__(self, cfg: FrozenEncoderConfig, num_classes: int):
+        self.cfg = cfg
+        self.num_classes = num_classes
+        self.net: Optional[torch.nn.Module] = None
+        self.mean: Optional[np.ndarray] = None
+        self.std: Optional[np.ndarray] = None
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> "_MLPHead":
+        cfg = self.cfg
+        torch.manual_seed(cfg.seed)
+        self.mean = X.mean(axis=0)
+        self.std = X.std(axis=0) + 1e-6
+        Xt = torch.from_numpy((X - self.mean) / self.std).float().to(cfg.device)
+        yt = torch.from_numpy(y).long().to(cfg.device)
+
+        self.net = torch.nn.Sequential(
+            torch.nn.Linear(X.shape[1], cfg.hidden_size),
+            torch.nn.ReLU(),
+            torch.nn.Dropout(cfg.dropout),
+            torch.nn.Linear(cfg.hidden_size, self.num_classes),
+        ).to(cfg.device)
+
+        # Same inverse-frequency weighting as full fine-tuning.
+        counts = np.clip(np.bincount(y, minlength=self.num_classes).astype(np.float32), 1.0, None)
+        weights = torch.tensor(counts.sum() / counts, dtype=torch.float32, device=cfg.device)
+        loss_fn = torch.nn.CrossEntropyLoss(weight=weights)
+        optimizer = torch.optim.AdamW(self.net.parameters(), lr=cfg.lr, weight_decay=cfg.weight_decay)
+
+        gen = torch.Generator().manual_seed(cfg.seed)
+        self.net.train()
+        for _ in range(cfg.epochs):
+            perm = torch.randperm(len(yt), generator=gen).to(cfg.device)
+            for i in range(0, len(perm), cfg.head_batch_size):
+                b = perm[i:i + cfg.head_batch_size]
+                loss = loss_fn(self.net(Xt[b]), yt[b])
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+        return self
+
+    @torch.no_grad()
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        assert self.net is not None
+        self.net.eval()
+        Xt = torch.from_numpy((X - self.mean) / self.std).float().to(self.cfg.device)
+        return torch.argmax(self.net(Xt), dim=-1).cpu().numpy()
+
+
+def _fit_head(cfg: FrozenEncoderConfig, X: np.ndarray, y: np.ndarray, num_classes: int):
+    """Fit the configured head and return an object with ``predict``."""
+    if cfg.head == "logreg":
+        head = make_pipeline(
+            StandardScaler(),
+            LogisticRegression(C=cfg.C, class_weight="balanced", max_iter=2000, random_state=cfg.seed),
+        )
+        return head.fit(X, y)
+    if cfg.head == "mlp":
+        return _MLPHead(cfg, num_classes).fit(X, y)
+    raise ValueError("FrozenEncoderConfig.head must be one of: logreg, mlp")
+
+
+def run_frozen(
+    examples: List[Example],
+    split: Split,
+    cfg: FrozenEncoderConfig,
+    *,
+    verbose: bool = True,
+    compute_test: bool = False,
+    return_state: bool = False,
+) -> Dict[str, Any]:
+    """Train one head on frozen-encoder embeddings and evaluate it on validation.
+
+    Mirrors ``run_one``: test metrics are optional, and ``return_state`` returns
+    the fitted head (under ``"head"``) for a single test evaluation in search.
+    """
+    y_str = np.array([ex.label for ex in examples], dtype=object)
+    labels_sorted = sorted(set(y_str.tolist()))
+    label2id = {lab: i for i, lab in enumerate(labels_sorted)}
+    id2label = {i: lab for lab, i in label2id.items()}
+    y = np.array([label2id[v] for v in y_str], dtype=np.int64)
+
+    cache = get_token_cache(cfg.model_name, cfg.max_length)
+    rows = cache.rows_for([ex.text for ex in examples], verbose=verbose)
+
+    # Only train and val rows are embedded here; test rows are encoded when
+    # (and if) the test split is evaluated.
+    X_train = _embed_rows(cfg, cache, rows[split.train_idx], verbose=verbose)
+    X_val = _embed_rows(cfg, cache, rows[split.val_idx], verbose=verbose)
+
+    if verbose:
+        print(f"\n[BERT-frozen] {cfg.model_name} pooling={cfg.pooling} head={cfg.head} | dim={X_train.shape[1]}")
+
+    head = _fit_head(cfg, X_train, y[split.train_idx], len(labels_sorted))
+
+    def _evaluate(X: np.ndarray, y_ids: np.ndarray) -> EvalResult:
+        y_pred = head.predict(X)
+        y_true_str = np.array([id2label[i] for i in y_ids], dtype=object)
+        y_pred_str = np.array([id2label[int(i)] for i in y_pred], dtype=object)
+        return evaluate_classifier(y_true_str, y_pred_str, labels=labels_sorted)
+
+    out: Dict[str, Any] = {"val": _evaluate(X_val, y[split.val_idx])}
+
+    if compute_test:
+        X_test = _embed_rows(cfg, cache, rows[split.test_idx], verbose=verbose)
+        out["test"] = _evaluate(X_test, y[split.test_idx])
+
+    if return_state:
+        out["head"] = head
         out["meta"] = {
             "labels_sorted": labels_sorted,
             "label2id": label2id,
@@ -395,9 +864,12 @@ def run_one(
 # ---- Hyperparameter search ----
 @dataclass(frozen=True)
 class Candidate:
-    """Container for one transformer configuration considered during search."""
+    """Container for one transformer configuration considered during search.
 
-    cfg: TransformerConfig
+    ``cfg`` is either a fine-tuning configuration or a frozen-encoder head.
+    """
+
+    cfg: Union[TransformerConfig, FrozenEncoderConfig]
 
 
 def search(
@@ -408,12 +880,14 @@ def search(
     metric: str = "f1_macro",
     evaluate_test_for_all: bool = False,  # kept for API compatibility; ignored in Option A flow
     verbose: bool = True,
+    benchmark: bool = False,
 ) -> Tuple[Candidate, EvalResult, EvalResult, List[Tuple[Candidate, EvalResult]]]:
     """Select the best candidate on validation and test it exactly once.
 
     The search loop never evaluates test metrics for intermediate candidates.
-    Instead, it keeps the winning model state and reuses it for a single final
-    test evaluation, matching the intended null-vs-true evaluation discipline.
+    Instead, it keeps the winning model in memory and reuses it for a single
+    final test evaluation, matching the intended null-vs-true evaluation
+    discipline. ``benchmark`` prints checkpoint memory and time per call.
     """
 
     if metric not in {"f1_macro", "f1_weighted", "accuracy"}:
@@ -429,14 +903,14 @@ def search(
     # Keep the winning weights so the selected model can be tested without retraining.
     best: Optional[Candidate] = None
     best_val: Optional[EvalResult] = None
-    best_state: Optional[Dict[str, torch.Tensor]] = None
+    best_state: Optional[Any] = None
     best_meta: Optional[Dict[str, Any]] = None
 
     all_val: List[Tuple[Candidate, EvalResult]] = []
 
     pbar = tqdm(candidates, desc="[BERT] candidates", disable=not verbose)
 
-    for cand in pbar:
+    for cand_i, cand in enumerate(pbar):
         pbar.set_postfix(
             model=cand.cfg.model_name.split("/")[-1],
             ep=cand.cfg.epochs,
@@ -446,7 +920,8 @@ def search(
         )
 
         # Candidate ranking is validation-only by design.
-        out = run_one(
+        frozen = isinstance(cand.cfg, FrozenEncoderConfig)
+        out = (run_frozen if frozen else run_one)(
             examples,
             split,
             cand.cfg,
@@ -458,13 +933,25 @@ def search(
         val_res: EvalResult = out["val"]
         all_val.append((cand, val_res))
 
+        if benchmark and not frozen:
+            ck = out["meta"]["checkpoint"]
+            print(
+                f"  [BENCH] checkpoint({cand.cfg.model_name}): snapshots={ck['snapshots']} "
+                f"cpu={ck['snapshot_bytes'] / 2**20:.1f}MB in {ck['snapshot_seconds']:.3f}s | "
+                f"deepcopy would hold {ck['state_bytes'] / 2**20:.1f}MB on {cand.cfg.device} per snapshot"
+            )
+
         if best_val is None or score(val_res) > score(best_val):
             best = cand
             best_val = val_res
-            best_state = out["state_dict"]
+            best_state = out["head"] if frozen else out["model"]
             best_meta = out["meta"]
             if verbose:
                 print(f"[BERT] new best {metric}={score(best_val):.4f}")
+            # The leader waits on the CPU while later candidates use the device.
+            if not frozen and cand_i + 1 < len(candidates) and cand.cfg.device != "cpu":
+                best_state.to("cpu")
+        out = None  # Drop a non-winning model before the next candidate trains.
 
     assert best is not None and best_val is not None and best_state is not None and best_meta is not None
 
@@ -479,28 +966,34 @@ def search(
     label2id: Dict[str, int] = best_meta["label2id"]
 
     # Build the held-out test split using the saved label mapping.
-    X = np.array([ex.text for ex in examples], dtype=object)
     y_str = np.array([ex.label for ex in examples], dtype=object)
     y_ids = np.array([label2id[v] for v in y_str], dtype=np.int64)
-
-    X_test = X[split.test_idx].tolist()
     y_test = y_ids[split.test_idx]
 
-    tokenizer = AutoTokenizer.from_pretrained(best.cfg.model_name)
-
-    model = AutoModelForSequenceClassification.from_pretrained(
-        best.cfg.model_name,
-        num_labels=len(labels_sorted),
-        id2label=id2label,
-        label2id=label2id,
-    ).to(best.cfg.device)
-
-    model.load_state_dict(best_state)
+    test_examples = [examples[i] for i in split.test_idx]
+    cache = get_token_cache(best.cfg.model_name, best.cfg.max_length)
+    test_rows = cache.rows_for([ex.text for ex in test_examples])
+
+    if isinstance(best.cfg, FrozenEncoderConfig):
+        # The selected head predicts on test embeddings; nothing is refitted.
+        X_test = _embed_rows(best.cfg, cache, test_rows, verbose=verbose)
+        y_pred = best_state.predict(X_test)
+        best_test = evaluate_classifier(
+            np.array([id2label[i] for i in y_test], dtype=object),
+            np.array([id2label[int(i)] for i in y_pred], dtype=object),
+            labels=labels_sorted,
+        )
+        if verbose:
+            print("\n[BERT] Search complete.\n")
+        return best, best_val, best_test, all_val
 
+    # The winning model is still in memory with its best weights restored.
+    t0 = time.perf_counter()
+    model = best_state.to(best.cfg.device)
     best_test = _evaluate_on_split(
         model=model,
-        tokenizer=tokenizer,
-        X_text=X_test,
+        cache=cache,
+        rows=test_rows,
         y_ids=y_test,
         cfg=best.cfg,
         id2label=id2label,
@@ -509,6 +1002,13 @@ def search(
         verbose=verbose,
     )
 
+    if benchmark:
+        ck = best_meta["checkpoint"]
+        print(
+            f"  [BENCH] test handoff: eval={time.perf_counter() - t0:.3f}s on the in-memory winner | "
+            f"avoided from_pretrained (~{ck['load_seconds']:.2f}s) and a {ck['state_bytes'] / 2**20:.1f}MB state copy"
+        )
+
     if verbose:
         print("\n[BERT] Search complete.\n")
 
@@ -7,9 +7,11 @@ character vocabulary and sequence length from the training split only.
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Iterable, Tuple, Any
+from typing import Dict, List, Optional, Iterable, Iterator, Tuple, Any, Sequence, Sized
 
 import copy
+import queue
+import threading
 import numpy as np
 import torch
 import torch.nn as nn
@@ -20,21 +22,131 @@ from tqdm.auto import tqdm
 from src.core.ml.data import Example
 from src.core.ml.splits import Split
 from src.core.ml.eval import EvalResult, evaluate_classifier
+from src.core.ml.dedup import unique_inverse, unique_pairs
 
 
 # ---- Dataset ----
 class EncodedLogDataset(Dataset):
-    """Minimal dataset wrapper for padded character sequences and label ids."""
+    """Minimal dataset wrapper for padded character sequences and label ids.
 
-    def __init__(self, X: np.ndarray, y_ids: np.ndarray):
+    ``weights`` holds per-row multiplicities when duplicate rows were collapsed
+    (all ones otherwise).
+    """
+
+    def __init__(self, X: np.ndarray, y_ids: np.ndarray, weights: Optional[np.ndarray] = None):
         self.X = torch.tensor(X, dtype=torch.long)
         self.y = torch.tensor(y_ids, dtype=torch.long)
+        self.w = torch.ones(len(self.y)) if weights is None else torch.tensor(weights, dtype=torch.float32)
 
     def __len__(self) -> int:
         return len(self.X)
 
     def __getitem__(self, i: int):
-        return self.X[i], self.y[i]
+        return self.X[i], self.y[i], self.w[i]
+
+    def batch(self, idx: Any) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Return rows ``idx`` (a slice or index tensor) of all tensors at once."""
+        return self.X[idx], self.y[idx], self.w[idx]
+
+
+class _BlockBatchLoader:
+    """Batches cut straight out of the dataset tensors, built one step ahead.
+
+    Drop-in for ``DataLoader(ds, batch_size, shuffle=..., generator=...)``. Per
+    epoch it consumes the generator exactly as ``DataLoader`` with a
+    ``RandomSampler`` does (one base-seed draw, then ``randperm``), so the batch
+    sequence is identical; but each batch is one gather per tensor over a
+    contiguous block of the permutation (a view when not shuffling) instead of
+    per-sample ``__getitem__`` calls and collation. With ``prefetch > 0`` a
+    background thread prepares the next batches (pinned when ``pin_memory``)
+    while the current one trains.
+    """
+
+    def __init__(
+        self,
+        dataset: EncodedLogDataset,
+        batch_size: int,
+        *,
+        shuffle: bool,
+        generator: Optional[torch.Generator] = None,
+        prefetch: int = 2,
+        pin_memory: bool = False,
+    ):
+        self.dataset = dataset
+        self.batch_size = int(batch_size)
+        self.shuffle = shuffle
+        self.generator = generator
+        self.prefetch = int(prefetch)
+        self.pin_memory = pin_memory
+
+    def __len__(self) -> int:
+        return -(-len(self.dataset) // self.batch_size)
+
+    def _order(self) -> Optional[torch.Tensor]:
+        # Same draws as DataLoader.__iter__ (worker base seed) followed by a
+        # full pass of RandomSampler.__iter__, which ends with a second, empty
+        # slice of ``randperm``.
+        torch.empty((), dtype=torch.int64).random_(generator=self.generator)
+        if not self.shuffle:
+            return None
+        g = self.generator
+        if g is None:
+            g = torch.Generator()
+            g.manual_seed(int(torch.empty((), dtype=torch.int64).random_().item()))
+        order = torch.randperm(len(self.dataset), generator=g)
+        torch.randperm(len(self.dataset), generator=g)
+        return order
+
+    def _batches(self, order: Optional[torch.Tensor]) -> Iterator[Tuple[torch.Tensor, ...]]:
+        for start in range(0, len(self.dataset), self.batch_size):
+            stop = start + self.batch_size
+            batch = self.dataset.batch(slice(start, stop) if order is None else order[start:stop])
+            if self.pin_memory:
+                batch = tuple(t.pin_memory() for t in batch)
+            yield batch
+
+    def __iter__(self) -> Iterator[Tuple[torch.Tensor, ...]]:
+        order = self._order()
+        if self.prefetch <= 0:
+            yield from self._batches(order)
+            return
+
+        q: "queue.Queue[Any]" = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        done = object()
+
+        def put(item: Any) -> bool:
+            # Poll so an abandoned iterator (early break) releases the thread.
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce() -> None:
+            try:
+                for batch in self._batches(order):
+                    if not put(batch):
+                        return
+                put(done)
+            except BaseException as e:  # surfaced in the consuming thread
+                put(e)
+
+        worker = threading.Thread(target=produce, name="cnn-batch-prefetch", daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = q.get()
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            worker.join()
 
 
 # ---- Model ----
@@ -105,6 +217,8 @@ class CNNConfig:
 
     # dataloader
     batch_size: int = 32
+    batch_loader: str = "blocks"  # one of: blocks (sliced, prefetched), dataloader
+    prefetch_batches: int = 2     # batches prepared ahead by the blocks loader
 
     # model
     embed_dim: int = 64
@@ -122,6 +236,9 @@ class CNNConfig:
     # class imbalance
     use_class_weights: bool = True
 
+    # duplicates: train on distinct (text, label) pairs weighted by their count
+    dedup_train: bool = False
+
     # early stopping
     early_stopping: bool = True
     early_stop_metric: str = "f1_macro"  # one of: f1_macro, f1_weighted, accuracy
@@ -163,11 +280,12 @@ def _encode(text: str, char2idx: Dict[str, int]) -> List[int]:
     return [char2idx.get(ch, 1) for ch in text]
 
 
-def _choose_max_len(encoded_train: List[List[int]], *, percentile: float, cap: int) -> int:
+def _choose_max_len(encoded_train: Sequence[Sized], *, percentile: float, cap: int) -> int:
     """Choose a training-derived sequence length for padding and truncation.
 
     The percentile-based heuristic keeps most examples intact while limiting
-    memory use; the result is capped and never smaller than one.
+    memory use; the result is capped and never smaller than one. Raw texts can
+    be passed directly, since each character encodes to exactly one id.
     """
 
     lengths = np.array([len(x) for x in encoded_train], dtype=np.int64)
@@ -185,19 +303,59 @@ def _pad(seq: List[int], max_len: int) -> List[int]:
     return seq + [0] * (max_len - len(seq))
 
 
-def _encode_pad_many(texts: List[str], char2idx: Dict[str, int], max_len: int) -> np.ndarray:
-    """Encode a collection of texts and return a padded integer array."""
+def _encode_pad_many_py(texts: List[str], char2idx: Dict[str, int], max_len: int) -> np.ndarray:
+    """Reference encoder built from ``_encode`` and ``_pad`` (kept for exact-match checks)."""
 
     enc = [_encode(t, char2idx) for t in texts]
     padded = [_pad(s, max_len) for s in enc]
     return np.array(padded, dtype=np.int64)
 
 
+def _char_lookup(char2idx: Dict[str, int]) -> np.ndarray:
+    """Return a code point -> id table; code points outside the vocabulary map to 1."""
+
+    size = max((ord(ch) for ch in char2idx), default=0) + 1
+    table = np.ones(size, dtype=np.int32)
+    for ch, i in char2idx.items():
+        table[ord(ch)] = i
+    return table
+
+
+def _encode_pad_many(texts: List[str], char2idx: Dict[str, int], max_len: int) -> np.ndarray:
+    """Encode a collection of texts and return a padded integer array.
+
+    All truncated texts are joined and decoded as UTF-32 code points in one
+    pass, mapped through a lookup table built from the vocabulary, and
+    scattered into a preallocated zero-padded int32 matrix. The result equals
+    ``_encode_pad_many_py`` element for element.
+    """
+
+    out = np.zeros((len(texts), max_len), dtype=np.int32)
+    if not texts:
+        return out
+
+    clipped = [t[:max_len] for t in texts]
+    lengths = np.fromiter((len(t) for t in clipped), dtype=np.int64, count=len(clipped))
+    # One UTF-32 unit per Python character; surrogatepass keeps lone
+    # surrogates (e.g. from surrogateescape decoding) as their own code point.
+    codes = np.frombuffer("".join(clipped).encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+
+    table = _char_lookup(char2idx)
+    ids = np.ones(len(codes), dtype=np.int32)
+    known = codes < len(table)
+    ids[known] = table[codes[known]]
+
+    # Boolean assignment fills the masked cells in row-major order, which is
+    # exactly the order of the concatenated code points.
+    out[np.arange(max_len) < lengths[:, None]] = ids
+    return out
+
+
 # ---- Training and prediction ----
 @torch.no_grad()
 def _predict(
     model: nn.Module,
-    loader: DataLoader,
+    loader: Iterable,
     device: str,
     *,
     desc: str = "predict",
@@ -207,7 +365,7 @@ def _predict(
 
     model.eval()
     preds = []
-    for xb, _yb in tqdm(loader, desc=desc, leave=False, disable=not show_progress):
+    for xb, *_ in tqdm(loader, desc=desc, leave=False, disable=not show_progress):
         xb = xb.to(device)
         logits = model(xb)
         pred = torch.argmax(logits, dim=-1)
@@ -215,21 +373,69 @@ def _predict(
     return np.concatenate(preds, axis=0) if preds else np.array([], dtype=np.int64)
 
 
-def run_one(
-    examples: List[Example],
-    split: Split,
+def _data_key(cfg: CNNConfig) -> Tuple[Any, ...]:
+    """Settings that determine the encoded data and the mini-batch sequence.
+
+    Candidates that agree on these can be trained in lockstep on shared batches
+    (see ``run_group``).
+    """
+    return (
+        cfg.max_len_cap,
+        cfg.len_percentile,
+        cfg.batch_size,
+        cfg.batch_loader,
+        cfg.prefetch_batches,
+        cfg.dedup_train,
+        cfg.seed,
+        cfg.device,
+    )
+
+
+def _make_loader(
+    ds: EncodedLogDataset,
     cfg: CNNConfig,
     *,
-    verbose: bool = True,
-    compute_test: bool = True,
-) -> Dict[str, EvalResult]:
-    """Train one CNN configuration on a fixed split and evaluate it.
+    shuffle: bool,
+    generator: torch.Generator,
+) -> Iterable:
+    """Build the batch iterator selected by ``cfg.batch_loader``.
 
-    Vocabulary construction and sequence-length selection use only training
-    data to avoid leakage. Returns validation metrics and, optionally, test
-    metrics for the same trained model.
+    Both choices yield the same batches for the same generator state.
     """
-    _set_seed(cfg.seed)
+    if cfg.batch_loader == "dataloader":
+        return DataLoader(ds, batch_size=cfg.batch_size, shuffle=shuffle, generator=generator)
+    if cfg.batch_loader == "blocks":
+        return _BlockBatchLoader(
+            ds,
+            cfg.batch_size,
+            shuffle=shuffle,
+            generator=generator,
+            prefetch=cfg.prefetch_batches,
+            pin_memory=str(cfg.device).startswith("cuda"),
+        )
+    raise ValueError("CNNConfig.batch_loader must be one of: blocks, dataloader")
+
+
+@dataclass
+class _PreparedData:
+    """Encoded split views shared by all candidates with the same ``_data_key``."""
+
+    labels_sorted: List[str]
+    id2label: Dict[int, str]
+    vocab_size: int
+    max_len: int
+    y_train: np.ndarray
+    y_val: np.ndarray
+    y_test: np.ndarray
+    train_ds: EncodedLogDataset
+    val_ds: EncodedLogDataset
+    test_ds: EncodedLogDataset
+    va_inv: np.ndarray
+    te_inv: np.ndarray
+
+
+def _prepare(examples: List[Example], split: Split, cfg: CNNConfig, *, verbose: bool) -> _PreparedData:
+    """Encode the split with train-only vocabulary and length statistics."""
 
     # ---- Prepare labels and split-specific views ----
     X_all = np.array([ex.text for ex in examples], dtype=object)
@@ -259,145 +465,341 @@ def run_one(
     char2idx = _build_char_vocab(X_train)
     vocab_size = len(char2idx) + 2
 
-    encoded_train = [_encode(t, char2idx) for t in X_train]
-    max_len = _choose_max_len(encoded_train, percentile=cfg.len_percentile, cap=cfg.max_len_cap)
+    max_len = _choose_max_len(X_train, percentile=cfg.len_percentile, cap=cfg.max_len_cap)
 
     if verbose:
         print(f"[CNN] vocab_size={vocab_size} | max_len={max_len} (p{cfg.len_percentile}, cap={cfg.max_len_cap})")
 
-    Xtr = _encode_pad_many(X_train, char2idx, max_len)
-    Xva = _encode_pad_many(X_val, char2idx, max_len)
-    Xte = _encode_pad_many(X_test, char2idx, max_len)
+    # ---- Collapse duplicate texts ----
+    # Evaluation predicts each distinct text once and broadcasts the result
+    # through ``*_inv``; training keeps every row unless ``dedup_train`` asks
+    # for distinct (text, label) pairs weighted by their count.
+    if cfg.dedup_train:
+        tr_first, tr_weights = unique_pairs(X_train, y_train.tolist())
+    else:
+        tr_first, tr_weights = np.arange(len(X_train)), None
+    va_first, va_inv = unique_inverse(X_val)
+    te_first, te_inv = unique_inverse(X_test)
 
-    train_ds = EncodedLogDataset(Xtr, y_train)
-    val_ds = EncodedLogDataset(Xva, y_val)
-    test_ds = EncodedLogDataset(Xte, y_test)
+    Xtr = _encode_pad_many([X_train[i] for i in tr_first], char2idx, max_len)
+    Xva = _encode_pad_many([X_val[i] for i in va_first], char2idx, max_len)
+    Xte = _encode_pad_many([X_test[i] for i in te_first], char2idx, max_len)
 
-    train_loader = DataLoader(train_ds, batch_size=cfg.batch_size, shuffle=True)
-    val_loader = DataLoader(val_ds, batch_size=cfg.batch_size, shuffle=False)
-    test_loader = DataLoader(test_ds, batch_size=cfg.batch_size, shuffle=False)
+    if verbose:
+        print(
+            f"[CNN] distinct rows: train={len(tr_first)}/{len(X_train)} "
+            f"val={len(va_first)}/{len(X_val)} test={len(te_first)}/{len(X_test)}"
+        )
 
-    # ---- Build model and optimization setup ----
-    model = MultiKernelCharCNN(
+    return _PreparedData(
+        labels_sorted=labels_sorted,
+        id2label=id2label,
         vocab_size=vocab_size,
-        num_classes=len(labels_sorted),
-        embed_dim=cfg.embed_dim,
-        num_filters=cfg.num_filters,
-        fc_dim=cfg.fc_dim,
-        dropout=cfg.dropout,
-        kernel_sizes=cfg.kernel_sizes,
-    ).to(cfg.device)
-
-    optimizer = torch.optim.AdamW(model.parameters(), lr=cfg.lr, weight_decay=cfg.weight_decay)
-
-    # Inverse-frequency weighting helps when label counts are imbalanced.
-    if cfg.use_class_weights:
-        counts = np.bincount(y_train, minlength=len(labels_sorted)).astype(np.float32)
-        counts = np.maximum(counts, 1.0)
-        inv = counts.sum() / counts
-        class_weights = torch.tensor(inv, dtype=torch.float32, device=cfg.device)
-        criterion = nn.CrossEntropyLoss(weight=class_weights)
-    else:
-        criterion = nn.CrossEntropyLoss()
-
-    # Metrics are computed in label-string space because the shared evaluation
-    # helper expects the original class names.
-    y_val_true_str = np.array([id2label[i] for i in y_val], dtype=object)
-
-    # ---- Early stopping state ----
-    use_es = bool(cfg.early_stopping)
-    if use_es and cfg.early_stop_metric not in {"f1_macro", "f1_weighted", "accuracy"}:
-        raise ValueError("CNNConfig.early_stop_metric must be one of: f1_macro, f1_weighted, accuracy")
+        max_len=max_len,
+        y_train=y_train,
+        y_val=y_val,
+        y_test=y_test,
+        train_ds=EncodedLogDataset(Xtr, y_train[tr_first], tr_weights),
+        val_ds=EncodedLogDataset(Xva, np.zeros(len(va_first), dtype=np.int64)),
+        test_ds=EncodedLogDataset(Xte, np.zeros(len(te_first), dtype=np.int64)),
+        va_inv=va_inv,
+        te_inv=te_inv,
+    )
+
+
+class _RngStream:
+    """Private torch RNG stream for one model trained in lockstep with others.
+
+    Entering the stream swaps its state into the global generators (CPU and,
+    when present, CUDA); leaving it saves the advanced state and restores the
+    outer one. Weight initialization and dropout of each candidate therefore
+    draw exactly the numbers they would draw in a sequential run seeded with
+    ``seed``.
+    """
 
-    best_score = -float("inf")
-    best_state: Optional[Dict[str, torch.Tensor]] = None
-    bad = 0
+    def __init__(self, seed: int):
+        self.seed = seed
+        self._state: Optional[Tuple[torch.Tensor, Any]] = None
+        self._outer: Optional[Tuple[torch.Tensor, Any]] = None
+
+    @staticmethod
+    def _get() -> Tuple[torch.Tensor, Any]:
+        cuda = torch.cuda.get_rng_state_all() if torch.cuda.is_available() else None
+        return torch.get_rng_state(), cuda
+
+    @staticmethod
+    def _set(state: Tuple[torch.Tensor, Any]) -> None:
+        cpu, cuda = state
+        torch.set_rng_state(cpu)
+        if cuda is not None:
+            torch.cuda.set_rng_state_all(cuda)
+
+    def __enter__(self) -> "_RngStream":
+        self._outer = self._get()
+        if self._state is None:
+            torch.manual_seed(self.seed)
+        else:
+            self._set(self._state)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._state = self._get()
+        assert self._outer is not None
+        self._set(self._outer)
+
+
+class _CandidateTrainer:
+    """Model, optimizer and early-stopping state of one candidate."""
+
+    def __init__(self, cfg: CNNConfig, data: _PreparedData, *, tag: str = "[CNN]"):
+        self.cfg = cfg
+        self.data = data
+        self.tag = tag
+        self.rng = _RngStream(cfg.seed)
+
+        # ---- Build model and optimization setup ----
+        with self.rng:
+            self.model = MultiKernelCharCNN(
+                vocab_size=data.vocab_size,
+                num_classes=len(data.labels_sorted),
+                embed_dim=cfg.embed_dim,
+                num_filters=cfg.num_filters,
+                fc_dim=cfg.fc_dim,
+                dropout=cfg.dropout,
+                kernel_sizes=cfg.kernel_sizes,
+            ).to(cfg.device)
+
+        self.optimizer = torch.optim.AdamW(self.model.parameters(), lr=cfg.lr, weight_decay=cfg.weight_decay)
+
+        # Inverse-frequency weighting helps when label counts are imbalanced.
+        if cfg.use_class_weights:
+            counts = np.bincount(data.y_train, minlength=len(data.labels_sorted)).astype(np.float32)
+            counts = np.maximum(counts, 1.0)
+            inv = counts.sum() / counts
+            self.class_weights: Optional[torch.Tensor] = torch.tensor(inv, dtype=torch.float32, device=cfg.device)
+        else:
+            self.class_weights = None
+        # With collapsed duplicates each row's loss is scaled by its count; the
+        # normalization matches the weighted mean over the original rows.
+        self.criterion = nn.CrossEntropyLoss(
+            weight=self.class_weights, reduction="none" if cfg.dedup_train else "mean"
+        )
 
-    # ---- Model training ----
-    for epoch in range(1, cfg.epochs + 1):
-        model.train()
-        epoch_bar = tqdm(train_loader, desc=f"[CNN] epoch {epoch}/{cfg.epochs}", leave=False, disable=not verbose)
-        running = 0.0
-        seen = 0
-
-        for xb, yb in epoch_bar:
-            xb = xb.to(cfg.device)
-            yb = yb.to(cfg.device)
-
-            optimizer.zero_grad()
-            logits = model(xb)
-            loss = criterion(logits, yb)
+        # Metrics are computed in label-string space because the shared evaluation
+        # helper expects the original class names.
+        self.y_val_true_str = np.array([data.id2label[i] for i in data.y_val], dtype=object)
+
+        # ---- Early stopping state ----
+        self.use_es = bool(cfg.early_stopping)
+        if self.use_es and cfg.early_stop_metric not in {"f1_macro", "f1_weighted", "accuracy"}:
+            raise ValueError("CNNConfig.early_stop_metric must be one of: f1_macro, f1_weighted, accuracy")
+
+        self.best_score = -float("inf")
+        self.best_state: Optional[Dict[str, torch.Tensor]] = None
+        self.bad = 0
+        # A config with no epochs is evaluated untrained, as before.
+        self.done = cfg.epochs <= 0
+
+        self.running = 0.0
+        self.seen = 0
+
+    def start_epoch(self) -> None:
+        self.model.train()
+        self.running = 0.0
+        self.seen = 0
+
+    def step(self, xb: torch.Tensor, yb: torch.Tensor, wb: torch.Tensor) -> None:
+        """One optimizer step on a batch that is already on the device."""
+        cfg = self.cfg
+        with self.rng:
+            self.optimizer.zero_grad()
+            logits = self.model(xb)
+            loss = self.criterion(logits, yb)
+            if cfg.dedup_train:
+                denom = wb * (self.class_weights[yb] if self.class_weights is not None else 1.0)
+                loss = (loss * wb).sum() / denom.sum()
             loss.backward()
 
             if cfg.grad_clip_norm and cfg.grad_clip_norm > 0:
-                torch.nn.utils.clip_grad_norm_(model.parameters(), cfg.grad_clip_norm)
+                torch.nn.utils.clip_grad_norm_(self.model.parameters(), cfg.grad_clip_norm)
 
-            optimizer.step()
+            self.optimizer.step()
 
-            bs = int(xb.size(0))
-            running += float(loss.item()) * bs
-            seen += bs
-            if verbose:
-                epoch_bar.set_postfix(loss=f"{(running / max(1, seen)):.4f}")
+        bs = int(xb.size(0))
+        self.running += float(loss.item()) * bs
+        self.seen += bs
+
+    @property
+    def avg_loss(self) -> float:
+        return self.running / max(1, self.seen)
 
+    def end_epoch(self, epoch: int, val_loader: Iterable, *, verbose: bool) -> None:
+        """Run the periodic validation check and update early stopping."""
+        cfg = self.cfg
         if verbose:
-            print(f"[CNN] epoch {epoch}/{cfg.epochs} done | avg_loss={(running / max(1, seen)):.4f}")
+            print(f"{self.tag} epoch {epoch}/{cfg.epochs} done | avg_loss={self.avg_loss:.4f}")
+
+        if epoch >= cfg.epochs:
+            self.done = True
 
         # Validation is checked only at the configured cadence to keep training
         # cost predictable during larger searches.
-        if use_es and (epoch % max(1, cfg.eval_every) == 0):
-            y_val_pred_ids = _predict(
-                model, val_loader, cfg.device, desc=f"[CNN] val @ epoch {epoch}", show_progress=False
-            )
-            y_val_pred_str = np.array([id2label[i] for i in y_val_pred_ids], dtype=object)
-            val_res = evaluate_classifier(y_val_true_str, y_val_pred_str, labels=labels_sorted)
-            val_score = float(getattr(val_res, cfg.early_stop_metric))
-
-            improved = val_score > (best_score + float(cfg.min_delta))
-            if improved:
-                best_score = val_score
-                best_state = copy.deepcopy(model.state_dict())
-                bad = 0
-                if verbose:
-                    print(f"[CNN] early-stop: new best {cfg.early_stop_metric}={best_score:.4f} at epoch {epoch}")
-            else:
-                bad += 1
+        if not (self.use_es and (epoch % max(1, cfg.eval_every) == 0)):
+            return
+
+        y_val_pred_ids = _predict(
+            self.model, val_loader, cfg.device, desc=f"{self.tag} val @ epoch {epoch}", show_progress=False
+        )[self.data.va_inv]
+        y_val_pred_str = np.array([self.data.id2label[i] for i in y_val_pred_ids], dtype=object)
+        val_res = evaluate_classifier(self.y_val_true_str, y_val_pred_str, labels=self.data.labels_sorted)
+        val_score = float(getattr(val_res, cfg.early_stop_metric))
+
+        improved = val_score > (self.best_score + float(cfg.min_delta))
+        if improved:
+            self.best_score = val_score
+            self.best_state = copy.deepcopy(self.model.state_dict())
+            self.bad = 0
+            if verbose:
+                print(f"{self.tag} early-stop: new best {cfg.early_stop_metric}={self.best_score:.4f} at epoch {epoch}")
+        else:
+            self.bad += 1
+            if verbose:
+                print(f"{self.tag} early-stop: no improvement ({self.bad}/{cfg.patience})")
+
+            if self.bad >= int(cfg.patience):
                 if verbose:
-                    print(f"[CNN] early-stop: no improvement ({bad}/{cfg.patience})")
+                    print(f"{self.tag} early-stop: stopping at epoch {epoch} (best={self.best_score:.4f})")
+                self.done = True
 
-                if bad >= int(cfg.patience):
-                    if verbose:
-                        print(f"[CNN] early-stop: stopping at epoch {epoch} (best={best_score:.4f})")
-                    break
+    def finish(
+        self,
+        val_loader: Iterable,
+        test_loader: Iterable,
+        *,
+        compute_test: bool,
+        verbose: bool,
+    ) -> Dict[str, EvalResult]:
+        """Restore the best checkpoint and evaluate on validation (and test)."""
+        cfg, data = self.cfg, self.data
+
+        # Restore the best validation checkpoint rather than the last epoch.
+        if self.use_es and self.best_state is not None:
+            self.model.load_state_dict(self.best_state)
+
+        # ---- Final evaluation ----
+        y_val_pred = _predict(
+            self.model, val_loader, cfg.device, desc=f"{self.tag} predict val", show_progress=verbose
+        )[data.va_inv]
+
+        y_val_pred_str = np.array([data.id2label[i] for i in y_val_pred], dtype=object)
+
+        out = {
+            "val": evaluate_classifier(self.y_val_true_str, y_val_pred_str, labels=data.labels_sorted),
+        }
+
+        # Test evaluation is optional so hyperparameter search can avoid repeated
+        # access to the held-out split.
+        if compute_test:
+            y_test_pred = _predict(
+                self.model, test_loader, cfg.device, desc=f"{self.tag} predict test", show_progress=verbose
+            )[data.te_inv]
+
+            y_test_true_str = np.array([data.id2label[i] for i in data.y_test], dtype=object)
+            y_test_pred_str = np.array([data.id2label[i] for i in y_test_pred], dtype=object)
+
+            out["test"] = evaluate_classifier(
+                y_test_true_str,
+                y_test_pred_str,
+                labels=data.labels_sorted,
+            )
 
-    # Restore the best validation checkpoint rather than the last epoch.
-    if use_es and best_state is not None:
-        model.load_state_dict(best_state)
+        return out
 
-    # ---- Final evaluation ----
-    y_val_pred = _predict(model, val_loader, cfg.device, desc="[CNN] predict val", show_progress=verbose)
 
-    y_val_pred_str = np.array([id2label[i] for i in y_val_pred], dtype=object)
+def run_group(
+    examples: List[Example],
+    split: Split,
+    cfgs: List[CNNConfig],
+    *,
+    verbose: bool = True,
+    compute_test: bool = True,
+) -> List[Dict[str, EvalResult]]:
+    """Train several CNN configurations in lockstep on shared mini-batches.
+
+    All configurations must share ``_data_key``. The split is encoded once,
+    each mini-batch is loaded and moved to the device once and then stepped
+    through every candidate that is still training. Optimizers, early stopping
+    and RNG streams stay per candidate, so each result equals ``run_one`` for
+    that configuration.
+    """
+    if not cfgs:
+        return []
+    keys = {_data_key(c) for c in cfgs}
+    if len(keys) != 1:
+        raise ValueError("run_group: candidates must share encoding, batching, dedup, seed and device")
+
+    cfg0 = cfgs[0]
+    _set_seed(cfg0.seed)
+    data = _prepare(examples, split, cfg0, verbose=verbose)
+
+    # The batch order depends only on the seed, never on how many numbers the
+    # models drew, so it is the same for every candidate in the group.
+    train_loader = _make_loader(data.train_ds, cfg0, shuffle=True, generator=torch.Generator().manual_seed(cfg0.seed))
+    # Evaluation loaders get their own generator so iterating them does not
+    # advance the global RNG (and with it the models' dropout streams).
+    val_loader = _make_loader(data.val_ds, cfg0, shuffle=False, generator=torch.Generator())
+    test_loader = _make_loader(data.test_ds, cfg0, shuffle=False, generator=torch.Generator())
+
+    tags = ["[CNN]"] if len(cfgs) == 1 else [f"[CNN {i + 1}/{len(cfgs)}]" for i in range(len(cfgs))]
+    trainers = [_CandidateTrainer(c, data, tag=t) for c, t in zip(cfgs, tags)]
 
-    out = {
-        "val": evaluate_classifier(y_val_true_str, y_val_pred_str, labels=labels_sorted),
-    }
+    # ---- Model training ----
+    epoch = 0
+    while True:
+        active = [t for t in trainers if not t.done]
+        if not active:
+            break
+        epoch += 1
+        for t in active:
+            t.start_epoch()
+
+        desc = f"[CNN] epoch {epoch}" + (f" ({len(active)} models)" if len(trainers) > 1 else f"/{cfg0.epochs}")
+        # tqdm.auto calls iter() on a plain iterable when constructed; handing
+        # it an iterator keeps one DataLoader iterator (and one generator draw)
+        # per epoch, so both batch loaders see the same shuffle sequence.
+        epoch_bar = tqdm(iter(train_loader), total=len(train_loader), desc=desc, leave=False, disable=not verbose)
+        for xb, yb, wb in epoch_bar:
+            # One host->device transfer per batch, shared by all candidates
+            # (asynchronous when the blocks loader pinned the batch).
+            xb = xb.to(cfg0.device, non_blocking=True)
+            yb = yb.to(cfg0.device, non_blocking=True)
+            wb = wb.to(cfg0.device, non_blocking=True)
+            for t in active:
+                t.step(xb, yb, wb)
+            if verbose:
+                epoch_bar.set_postfix(loss=" ".join(f"{t.avg_loss:.4f}" for t in active))
 
-    # Test evaluation is optional so hyperparameter search can avoid repeated
-    # access to the held-out split.
-    if compute_test:
-        y_test_pred = _predict(model, test_loader, cfg.device, desc="[CNN] predict test", show_progress=verbose)
+        for t in active:
+            t.end_epoch(epoch, val_loader, verbose=verbose)
 
-        y_test_true_str = np.array([id2label[i] for i in y_test], dtype=object)
-        y_test_pred_str = np.array([id2label[i] for i in y_test_pred], dtype=object)
+    return [t.finish(val_loader, test_loader, compute_test=compute_test, verbose=verbose) for t in trainers]
 
-        out["test"] = evaluate_classifier(
-            y_test_true_str,
-            y_test_pred_str,
-            labels=labels_sorted,
-        )
 
-    return out
+def run_one(
+    examples: List[Example],
+    split: Split,
+    cfg: CNNConfig,
+    *,
+    verbose: bool = True,
+    compute_test: bool = True,
+) -> Dict[str, EvalResult]:
+    """Train one CNN configuration on a fixed split and evaluate it.
+
+    Vocabulary construction and sequence-length selection use only training
+    data to avoid leakage. Returns validation metrics and, optionally, test
+    metrics for the same trained model.
+    """
+    return run_group(examples, split, [cfg], verbose=verbose, compute_test=compute_test)[0]
 
 
 # ---- Hyperparameter search ----
@@ -415,6 +817,7 @@ def search(
     *,
     metric: str = "f1_macro",
     evaluate_test_for_all: bool = False,
+    group_candidates: bool = False,
     verbose: bool = True,
 ) -> Tuple[Candidate, EvalResult, EvalResult, List[Tuple[Candidate, EvalResult]]]:
     """Select the best CNN configuration from a candidate set.
@@ -422,6 +825,10 @@ def search(
     Model selection is based on validation performance only. The test split is
     evaluated once for the selected configuration unless explicitly requested
     for every candidate.
+
+    With ``group_candidates``, candidates that share ``_data_key`` are trained
+    together by ``run_group`` (one encoding and one batch stream per group).
+    Results are identical to training them one by one.
     """
 
     if metric not in {"f1_macro", "f1_weighted", "accuracy"}:
@@ -439,25 +846,42 @@ def search(
     best_test: Optional[EvalResult] = None
     all_val: List[Tuple[Candidate, EvalResult]] = []
 
-    pbar = tqdm(candidates, desc="[CNN] candidates", disable=not verbose)
+    groups: Dict[Tuple[Any, ...], List[int]] = {}
+    for i, cand in enumerate(candidates):
+        key = _data_key(cand.cfg) if group_candidates else (i,)
+        groups.setdefault(key, []).append(i)
+    outs: List[Optional[Dict[str, EvalResult]]] = [None] * len(candidates)
+
+    pbar = tqdm(total=len(candidates), desc="[CNN] candidates", disable=not verbose)
 
-    for cand in pbar:
+    for group in groups.values():
+        cand = candidates[group[0]]
         pbar.set_postfix(
             epochs=cand.cfg.epochs,
             bs=cand.cfg.batch_size,
             emb=cand.cfg.embed_dim,
             filt=cand.cfg.num_filters,
             lr=f"{cand.cfg.lr:g}",
+            models=len(group),
         )
 
-        out = run_one(
+        group_outs = run_group(
             examples,
             split,
-            cand.cfg,
+            [candidates[i].cfg for i in group],
             verbose=verbose,
             # Avoid using the held-out test split during model selection.
-            compute_test=False,
+            compute_test=evaluate_test_for_all,
         )
+        for i, out in zip(group, group_outs):
+            outs[i] = out
+        pbar.update(len(group))
+    pbar.close()
+
+    # Selection walks the candidates in their original order, so ties resolve
+    # the same way with and without grouping.
+    for cand, out in zip(candidates, outs):
+        assert out is not None
         val_res = out["val"]
         all_val.append((cand, val_res))
 
@@ -24,6 +24,13 @@ from sklearn.dummy import DummyClassifier
 from src.core.ml.data import Example
 from src.core.ml.splits import Split
 from src.core.ml.eval import EvalResult, evaluate_classifier
+from src.core.ml.inter_time_features import summary_features
+from src.core.ml.resources import library_n_jobs
+
+# "raw": the gaps of a window as positional columns, padded to the longest
+# TRAIN window; "summary": fixed-size statistics of the gaps
+# (see src.core.ml.inter_time_features).
+FEATURE_SETS = ("raw", "summary")
 
 
 def _parse_window(text: str) -> np.ndarray:
@@ -111,7 +118,7 @@ def build_model(model_name: str, params: Optional[Dict[str, Any]] = None, *, ran
         return GaussianNB(**{**params})
 
     if model_name == "rf":
-        base = {"random_state": random_state, "n_jobs": -1}
+        base = {"random_state": random_state, "n_jobs": library_n_jobs()}
         return RandomForestClassifier(**{**base, **params})
 
     raise ValueError(f"Unknown model_name={model_name!r}")
@@ -124,6 +131,7 @@ class Candidate:
     model_name: str
     model_params: Dict[str, Any]
     use_scaler: bool = True
+    feature_set: str = "raw"
 
 def search(
     examples: List[Example],
@@ -134,12 +142,15 @@ def search(
     random_state: int = 42,
     evaluate_test_for_all: bool = False,
     verbose: bool = True,
+    inter_time_unit: str = "seconds",
 ) -> Tuple[Candidate, EvalResult, EvalResult, List[Tuple[Candidate, EvalResult]]]:
     """Evaluate candidate models and select the best one by validation score.
 
     The search fixes feature dimensionality from the training split, compares
     candidates on validation metrics, and returns the selected candidate together
     with validation/test results and the full validation leaderboard.
+    ``inter_time_unit`` is the unit the windows were loaded with; the summary
+    features need it to take log10 of the gaps.
     """
 
     if metric not in {"f1_macro", "f1_weighted", "accuracy", "balanced_accuracy"}:
@@ -149,6 +160,9 @@ def search(
         return float(getattr(res, metric))
 
     candidates = list(candidates)
+    unknown = sorted({c.feature_set for c in candidates} - set(FEATURE_SETS))
+    if unknown:
+        raise ValueError(f"Unknown feature_set {unknown}; expected one of {FEATURE_SETS}")
 
     # Keep label order explicit so metric computation is stable across runs.
     y = np.array([ex.label for ex in examples], dtype=object)
@@ -161,9 +175,19 @@ def search(
     L = max(len(r) for r in train_rows)
 
     # ---- Build split-specific matrices ----
-    X_train = _build_matrix(examples, split.train_idx, expected_len=L)
-    X_val   = _build_matrix(examples, split.val_idx, expected_len=L)
-    X_test  = _build_matrix(examples, split.test_idx, expected_len=L)
+    # One (train, val, test) triple per feature set the candidates use.
+    matrices: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+    for feature_set in sorted({c.feature_set for c in candidates}):
+        if feature_set == "raw":
+            matrices["raw"] = tuple(
+                _build_matrix(examples, idx, expected_len=L)
+                for idx in (split.train_idx, split.val_idx, split.test_idx)
+            )
+        else:
+            matrices["summary"] = tuple(
+                summary_features([examples[int(i)].text for i in idx], unit=inter_time_unit)
+                for idx in (split.train_idx, split.val_idx, split.test_idx)
+            )
 
     y_train, y_val, y_test = y[split.train_idx], y[split.val_idx], y[split.test_idx]
 
@@ -173,6 +197,7 @@ def search(
     all_val: List[Tuple[Candidate, EvalResult]] = []
 
     for cand in candidates:
+        X_train, X_val, X_test = matrices[cand.feature_set]
         steps = []
         if cand.use_scaler:
             steps.append(("scaler", StandardScaler()))
@@ -200,7 +225,7 @@ def search(
             best_test = test_res if evaluate_test_for_all else None
 
         if verbose:
-            msg = f"[INTER] {cand.model_name} {cand.model_params} | val {metric}={score(val_res):.4f}"
+            msg = f"[INTER] {cand.feature_set} {cand.model_name} {cand.model_params} | val {metric}={score(val_res):.4f}"
             if evaluate_test_for_all and test_res is not None:
                 msg += f" | test {metric}={score(test_res):.4f}"
             print(msg)
@@ -209,6 +234,7 @@ def search(
 
     # Default path: touch the test split only once, after validation has selected the model.
     if best_test is None:
+        X_train, _, X_test = matrices[best.feature_set]
         steps = []
         if best.use_scaler:
             steps.append(("scaler", StandardScaler()))
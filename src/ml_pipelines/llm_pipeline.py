@@ -7,21 +7,25 @@ only when retrieval evidence is weak or incomplete.
 
 from __future__ import annotations
 
+import asyncio
+import glob
+import hashlib
 import os
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
 
+# Read by transformers / sentence-transformers when they are first imported
+# (TRANSFORMERS_VERBOSITY=error is what logging.set_verbosity_error() sets).
 os.environ["HF_HUB_DISABLE_PROGRESS_BARS"] = "1"
 os.environ["TRANSFORMERS_VERBOSITY"] = "error"
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Iterable, Tuple, Any, Set
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Iterable, Sequence, Tuple, Any, Set
 
 import json
 
-from transformers.utils import logging
-logging.set_verbosity_error()
-import time
-
 import numpy as np
 from tqdm.auto import tqdm
 
@@ -29,9 +33,15 @@ from src.core.ml.data import Example
 from src.core.ml.env import load_project_env
 from src.core.ml.splits import Split
 from src.core.ml.eval import EvalResult, evaluate_classifier
+from src.core.ml.llm_response_cache import LLM_CACHE_MODES, get_llm_cache, response_key
+from src.core.ml.rate_limit import AsyncTokenBucket
+from src.core.ml.text_embedding_store import TextEmbeddingStore, get_embedding_store
 
-from sentence_transformers import SentenceTransformer
-from openai import OpenAI
+# sentence_transformers (torch, transformers) and openai are imported where a
+# model is loaded or a request is sent, so importing this module stays cheap.
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from sentence_transformers import SentenceTransformer
 
 load_project_env()
 
@@ -110,15 +120,33 @@ def _bundle_texts(
 
 
 # ---- Similarity helpers ----
-def _dot_sims(query: np.ndarray, mat: np.ndarray) -> np.ndarray:
-    """Return similarity scores between one query vector and many candidates.
+# Queries per similarity block in batched retrieval; bounds the block of
+# scores to _TOPK_BLOCK x n_class_bundles floats.
+_TOPK_BLOCK = 1024
+
+
+def _topk_rows(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the ``k`` largest scores of each row and their columns, best first.
 
-    Both inputs are assumed to be L2-normalized, so the dot product is the
-    cosine similarity used for retrieval and fast-path scoring.
+    Equal scores (duplicate bundles are common) resolve to the lower column,
+    so results do not depend on how ``argpartition`` happens to break ties.
     """
-    q = query.astype(np.float32, copy=False)
-    m = mat.astype(np.float32, copy=False)
-    return (m @ q).astype(np.float32)
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part = np.take_along_axis(scores, idx, axis=1)
+
+    # Rows where the k-th score is shared with columns left out of the
+    # partition: take everything above it plus the lowest tied columns.
+    kth = part.min(axis=1, keepdims=True)
+    tied = np.flatnonzero((scores == kth).sum(axis=1) > (part == kth).sum(axis=1))
+    for r in tied:
+        above = np.flatnonzero(scores[r] > kth[r, 0])
+        at = np.flatnonzero(scores[r] == kth[r, 0])[: k - len(above)]
+        idx[r] = np.concatenate([above, at])
+    if len(tied):
+        part = np.take_along_axis(scores, idx, axis=1)
+
+    order = np.lexsort((idx, -part), axis=-1)
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(idx, order, axis=1)
 
 
 def _l2_normalize_rows(x: np.ndarray) -> np.ndarray:
@@ -128,12 +156,6 @@ def _l2_normalize_rows(x: np.ndarray) -> np.ndarray:
     return x / norms
 
 
-def _l2_normalize_vec(x: np.ndarray) -> np.ndarray:
-    """L2-normalize a single embedding vector."""
-    x = x.astype(np.float32, copy=False)
-    return x / (np.linalg.norm(x) + 1e-12)
-
-
 # ---- In-memory retrieval index ----
 class _InMemoryPerClassIndex:
     """Store per-class embeddings and bundle texts for nearest-neighbor lookup.
@@ -188,39 +210,56 @@ class _InMemoryPerClassIndex:
             index.add(emb)
             self._faiss_index[label] = index
 
+    def topk_batch(self, label: str, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Retrieve the top-k bundles of one class label for every query row.
+
+        Returns ``(sims, idx)`` of shape ``[n_queries, k_eff]``, best first.
+        ``idx`` is -1 where the backend returned fewer than ``k_eff`` hits;
+        texts are looked up with ``hits``.
+        """
+        n = int(queries.shape[0])
+        emb = self._emb.get(label)
+        if k <= 0 or emb is None or emb.shape[0] == 0 or n == 0:
+            return np.zeros((n, 0), dtype=np.float32), np.zeros((n, 0), dtype=np.int64)
+
+        Q = _l2_normalize_rows(queries)
+        k_eff = min(int(k), emb.shape[0])
+
+        if self._backend == "faiss" and _FAISS_OK and label in self._faiss_index:
+            # One search call for the whole batch.
+            D, I = self._faiss_index[label].search(np.ascontiguousarray(Q), k_eff)
+            return D.astype(np.float32, copy=False), I.astype(np.int64, copy=False)
+
+        # NumPy provides an exact fallback when FAISS is disabled or unavailable:
+        # one GEMM per block of queries, then a row-wise partial sort.
+        sims = np.empty((n, k_eff), dtype=np.float32)
+        idx = np.empty((n, k_eff), dtype=np.int64)
+        for start in range(0, n, _TOPK_BLOCK):
+            block = Q[start:start + _TOPK_BLOCK] @ emb.T
+            sims[start:start + _TOPK_BLOCK], idx[start:start + _TOPK_BLOCK] = _topk_rows(block, k_eff)
+        return sims, idx
+
+    def hits(self, label: str, sims: np.ndarray, idx: np.ndarray) -> List[Tuple[float, str]]:
+        """Turn one row of ``topk_batch`` output into ``(similarity, bundle text)`` pairs."""
+        txt = self._txt.get(label, [])
+        return [(float(s), txt[int(i)]) for s, i in zip(sims, idx) if i >= 0]
+
     def topk(self, label: str, query_emb: np.ndarray, k: int) -> List[Tuple[float, str]]:
         """Return the top-k retrieved bundles for one class label.
 
         Results are scored by cosine similarity and include both the score and
         the original bundle text used later for prompting.
         """
-        if k <= 0:
-            return []
-        if label not in self._emb or self._emb[label].shape[0] == 0:
-            return []
+        sims, idx = self.topk_batch(label, query_emb.reshape(1, -1), k)
+        return self.hits(label, sims[0], idx[0])
 
-        q = _l2_normalize_vec(query_emb.astype(np.float32, copy=False))
-
-        if self._backend == "faiss" and _FAISS_OK and label in self._faiss_index:
-            index = self._faiss_index[label]
-            k_eff = min(k, self._emb[label].shape[0])
-            # FAISS expects a batch dimension even for a single query.
-            D, I = index.search(q.reshape(1, -1), k_eff)
-            sims = D[0]
-            idxs = I[0]
-            out: List[Tuple[float, str]] = []
-            for sim, i in zip(sims, idxs):
-                if i < 0:
-                    continue
-                out.append((float(sim), self._txt[label][int(i)]))
-            return out
-
-        # NumPy provides an exact fallback when FAISS is disabled or unavailable.
-        sims = _dot_sims(q, self._emb[label])
-        k_eff = min(k, sims.shape[0])
-        idx = np.argpartition(-sims, k_eff - 1)[:k_eff]
-        idx = idx[np.argsort(-sims[idx])]
-        return [(float(sims[i]), self._txt[label][int(i)]) for i in idx]
+    def add_shards(self, label: str, shards: Sequence[Tuple[np.ndarray, List[str]]]) -> None:
+        """Register the concatenation of several ``(embeddings, texts)`` shards for a label."""
+        parts = [(emb, txt) for emb, txt in shards if len(txt) > 0]
+        if not parts:
+            self.add(label, np.zeros((0, 1), dtype=np.float32), [])
+            return
+        self.add(label, np.concatenate([emb for emb, _ in parts]), [t for _, txt in parts for t in txt])
 
 
 # ---- Config ----
@@ -245,11 +284,20 @@ class RAGLLMConfig:
     local_embedding_model: str = "BAAI/bge-base-en-v1.5"
     local_embedding_batch_size: int = 32
     local_embedding_device: str = "cuda"  # "cuda" or "cpu"
+    local_embedding_backend: str = "torch"  # "torch", "torch_int8", "onnx" or "onnx_int8" (all but torch: CPU only)
     local_normalize_embeddings: bool = True
 
+    # Persistent embedding store: only texts never embedded before are encoded
+    local_embedding_cache: bool = True
+    local_embedding_cache_dtype: str = "float32"  # "float32" or "float16" (half the disk, ~1e-3 error)
+
     # Prediction embedding batching
     predict_embedding_batch_size: int = 64  # NEW: batch size for embedding VAL/TEST
 
+    # Bundle and embed TRAIN lines per actor group; the shards are reused by
+    # every split that trains on the group (bundles never span two groups)
+    train_group_shards: bool = False
+
     # OpenAI chat classification (fallback)
     chat_model: str = "gpt-4.1-mini"
     temperature: float = 0.0
@@ -258,6 +306,17 @@ class RAGLLMConfig:
     max_retries: int = 2
     retry_backoff_s: float = 1.5
 
+    # Concurrent fallback dispatch; the limits are client-side and should match
+    # the account's API tier
+    llm_base_url: Optional[str] = None       # OpenAI-compatible endpoint (None: SDK default / OPENAI_BASE_URL)
+    llm_concurrency: int = 8                 # requests in flight
+    llm_requests_per_minute: float = 500.0
+    llm_tokens_per_minute: float = 200_000.0
+
+    # On-disk response cache: "off", "read", "write", "readwrite" or
+    # "replay_only" (cached responses only, never the network)
+    llm_cache_mode: str = "off"
+
     # Hybrid gating to reduce LLM calls
     use_llm_fallback: bool = True
     llm_uncertainty_margin: float = 0.08  # call LLM if |score| < margin
@@ -333,8 +392,32 @@ def _parse_label(raw: str, *, valid_labels: Set[str]) -> str:
     return str(lab)
 
 
-def _chat_classify(
-    client: OpenAI,
+def _is_quota_error(e: BaseException) -> bool:
+    """Return True if the account has no quota left (retrying cannot help)."""
+    return "insufficient_quota" in str(e)
+
+
+def _is_rate_limit_error(e: BaseException) -> bool:
+    """Return True for HTTP 429 responses."""
+    return getattr(e, "status_code", None) == 429 or "429" in str(e)
+
+
+def _retry_after_s(e: BaseException) -> float:
+    """Return the server's ``Retry-After`` hint in seconds (0 if absent)."""
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("retry-after", 0.0)))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _estimate_tokens(system_msg: str, user_msg: str, max_tokens: int) -> int:
+    """Rough token cost of one request for the tokens-per-minute limiter (~4 chars per token)."""
+    return (len(system_msg) + len(user_msg)) // 4 + int(max_tokens)
+
+
+async def _chat_classify(
+    client: AsyncOpenAI,
     *,
     model: str,
     temperature: float,
@@ -345,16 +428,27 @@ def _chat_classify(
     system_msg: str,
     user_msg: str,
     valid_labels: Set[str],
-) -> str:
+    request_bucket: Optional[AsyncTokenBucket] = None,
+    token_bucket: Optional[AsyncTokenBucket] = None,
+) -> Tuple[str, str]:
     """Classify one bundle with the chat model using bounded retries.
 
-    Retries are reserved for transient API failures; invalid outputs still
-    surface as exceptions after parsing and validation.
+    Every attempt first takes one request and the estimated tokens from the
+    rate-limit buckets. 429 responses are retried after a jittered exponential
+    backoff (or the server's ``Retry-After``), other transient failures after a
+    linear one; quota exhaustion is raised at once. Invalid outputs still
+    surface as exceptions after parsing and validation. Returns the label and
+    the raw response it was parsed from.
     """
+    n_tokens = _estimate_tokens(system_msg, user_msg, max_tokens)
     last_err: Optional[Exception] = None
     for attempt in range(max_retries + 1):
+        if request_bucket is not None:
+            await request_bucket.acquire(1)
+        if token_bucket is not None:
+            await token_bucket.acquire(n_tokens)
         try:
-            resp = client.chat.completions.create(
+            resp = await client.chat.completions.create(
                 model=model,
                 temperature=temperature,
                 max_tokens=max_tokens,
@@ -365,56 +459,268 @@ def _chat_classify(
                 timeout=timeout_s,
             )
             content = resp.choices[0].message.content
-            return _parse_label(content, valid_labels=valid_labels)
+            return _parse_label(content, valid_labels=valid_labels), content
         except Exception as e:
             last_err = e
-            if attempt < max_retries:
-                time.sleep(retry_backoff_s * (attempt + 1))
-                continue
-            raise last_err
+            if _is_quota_error(e) or attempt >= max_retries:
+                raise
+            if _is_rate_limit_error(e):
+                # Jitter spreads out the retries of concurrent requests that
+                # were throttled together.
+                delay = retry_backoff_s * (2 ** attempt) * random.uniform(0.5, 1.5)
+                await asyncio.sleep(max(delay, _retry_after_s(e)))
+            else:
+                await asyncio.sleep(retry_backoff_s * (attempt + 1))
+    assert last_err is not None
+    raise last_err
+
 
+async def _chat_classify_many(
+    jobs: List[Tuple[str, str]],
+    *,
+    cfg: RAGLLMConfig,
+    valid_labels: Set[str],
+    desc: str = "[LLM] LLM fallback",
+    verbose: bool = True,
+) -> Tuple[List[Optional[str]], int, int]:
+    """Classify ``(system_msg, user_msg)`` jobs concurrently within the configured limits.
+
+    Depending on ``cfg.llm_cache_mode``, jobs are first looked up in the
+    response cache and new responses are stored there. At most
+    ``cfg.llm_concurrency`` of the remaining requests are in flight, paced by
+    request and token buckets. When the quota is exhausted, or a 429 persists
+    through all retries, no further jobs are sent. Returns one label per job
+    (``None`` where the job got no answer), the number of jobs that were sent
+    and the number served from the cache.
+    """
+    results: List[Optional[str]] = [None] * len(jobs)
+    if not jobs:
+        return results, 0, 0
+
+    mode = cfg.llm_cache_mode
+    if mode not in LLM_CACHE_MODES:
+        raise ValueError(f"llm_cache_mode must be one of {LLM_CACHE_MODES}, got {mode!r}")
+    cache = get_llm_cache() if mode != "off" else None
+    keys = [
+        response_key(cfg.chat_model, cfg.temperature, cfg.max_output_tokens, system_msg, user_msg)
+        for system_msg, user_msg in jobs
+    ]
+
+    # ---- Cached responses ----
+    pending = list(range(len(jobs)))
+    if cache is not None and mode in ("read", "readwrite", "replay_only"):
+        pending = []
+        for i, key in enumerate(keys):
+            cached = cache.get(key)
+            if cached is None:
+                pending.append(i)
+            else:
+                results[i] = _parse_label(cached, valid_labels=valid_labels)
+    n_cached = len(jobs) - len(pending)
+    if mode == "replay_only" or not pending:
+        return results, 0, n_cached
+    store = cache if mode in ("write", "readwrite") else None
+
+    from openai import AsyncOpenAI
+
+    request_bucket = AsyncTokenBucket(cfg.llm_requests_per_minute)
+    token_bucket = AsyncTokenBucket(cfg.llm_tokens_per_minute)
+    slots = asyncio.Semaphore(max(1, int(cfg.llm_concurrency)))
+    exhausted = asyncio.Event()
+    sent = 0
+
+    # The SDK's own retries are disabled so 429 handling and pacing stay here.
+    async with AsyncOpenAI(
+        api_key=os.environ.get("OPENAI_API_KEY"),
+        base_url=cfg.llm_base_url,
+        max_retries=0,
+        timeout=cfg.timeout_s,
+    ) as client:
+
+        async def one(i: int) -> None:
+            nonlocal sent
+            async with slots:
+                if exhausted.is_set():
+                    return
+                sent += 1
+                system_msg, user_msg = jobs[i]
+                try:
+                    results[i], content = await _chat_classify(
+                        client,
+                        model=cfg.chat_model,
+                        temperature=cfg.temperature,
+                        max_tokens=cfg.max_output_tokens,
+                        timeout_s=cfg.timeout_s,
+                        max_retries=cfg.max_retries,
+                        retry_backoff_s=cfg.retry_backoff_s,
+                        system_msg=system_msg,
+                        user_msg=user_msg,
+                        valid_labels=valid_labels,
+                        request_bucket=request_bucket,
+                        token_bucket=token_bucket,
+                    )
+                    if store is not None:
+                        store.put(keys[i], cfg.chat_model, content)
+                except Exception as e:
+                    if _is_quota_error(e) or _is_rate_limit_error(e):
+                        exhausted.set()
+                        return
+                    raise
 
-def _aggregate_sims(sims: np.ndarray, *, agg: str) -> float:
-    """Aggregate retrieved similarities into a single class score."""
-    if sims.size == 0:
-        return float("nan")
-    if agg == "mean":
-        return float(np.mean(sims))
-    if agg == "median":
-        return float(np.median(sims))
-    raise ValueError(f"Unknown score_agg='{agg}', expected 'mean' or 'median'.")
+        tasks = [asyncio.ensure_future(one(i)) for i in pending]
+        pbar = tqdm(total=len(pending), desc=desc, leave=False, disable=not verbose)
+        try:
+            for fut in asyncio.as_completed(tasks):
+                await fut
+                pbar.update(1)
+        finally:
+            pbar.close()
+            # On an unexpected error, stop the remaining requests before the
+            # client closes.
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    return results, sent, n_cached
+
+
+def _run_coroutine(coro: Awaitable[Any]) -> Any:
+    """Run ``coro`` to completion from synchronous code."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # Called from inside a running event loop (e.g. a notebook): use a private
+    # loop on a worker thread.
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+def _aggregate_sims(sims: np.ndarray, idx: np.ndarray, *, agg: str) -> np.ndarray:
+    """Aggregate each row of retrieved similarities into one class score.
+
+    Slots without a hit (``idx < 0``) are ignored; rows without any hit score
+    NaN.
+    """
+    if agg not in {"mean", "median"}:
+        raise ValueError(f"Unknown score_agg='{agg}', expected 'mean' or 'median'.")
+    out = np.full(sims.shape[0], np.nan, dtype=np.float64)
+    valid = idx >= 0
+    full = valid.all(axis=1) & (sims.shape[1] > 0)
+    if full.any():
+        rows = sims[full]
+        out[full] = np.mean(rows, axis=1) if agg == "mean" else np.median(rows, axis=1)
+    # Rows with missing hits (FAISS only) are reduced one by one.
+    for i in np.flatnonzero(~full & valid.any(axis=1)):
+        row = sims[i][valid[i]]
+        out[i] = np.mean(row) if agg == "mean" else np.median(row)
+    return out
 
 
 # ---- Local embedding helpers ----
+_EMBEDDERS: Dict[Tuple[str, str, str], SentenceTransformer] = {}
+
+EMBEDDING_BACKENDS = ("torch", "torch_int8", "onnx", "onnx_int8")
+
+# ONNX exports of the embedding models (one directory per model), created on
+# first use.
+_ONNX_DIR = os.environ.get("DATAANALYSIS_ONNX_EMBEDDERS", os.path.join(".cache", "onnx_embedders"))
+
+# Instruction set targeted by the int8 ONNX export; avx2 runs on every x86-64
+# node we use ("avx512_vnni" is faster where available, "arm64" for ARM).
+_ONNX_QUANTIZATION = os.environ.get("DATAANALYSIS_ONNX_QUANTIZATION", "avx2")
+
+
+def _embedding_id(cfg: RAGLLMConfig) -> str:
+    """Name the vectors produced under ``cfg``; quantized backends get their own store."""
+    if cfg.local_embedding_backend == "torch":
+        return cfg.local_embedding_model
+    return f"{cfg.local_embedding_model}@{cfg.local_embedding_backend}"
+
+
+def _build_local_embedder(model_name: str, device: str, backend: str) -> SentenceTransformer:
+    """Create the sentence-transformer for one embedding backend.
+
+    ``torch_int8`` stores the weights of every linear layer as int8 and
+    quantizes activations per batch (PyTorch dynamic quantization). ``onnx``
+    runs the model exported to ONNX in ONNX Runtime, ``onnx_int8`` the
+    dynamically quantized export. Exports are written below ``_ONNX_DIR`` once.
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"local_embedding_backend must be one of {EMBEDDING_BACKENDS}, got {backend!r}")
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name, device=device)
+    if device != "cpu":
+        raise ValueError(f"local_embedding_backend={backend!r} runs on CPU only; set local_embedding_device='cpu'")
+
+    if backend == "torch_int8":
+        import torch
+
+        model = SentenceTransformer(model_name, device="cpu")
+        torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        return model
+
+    export_dir = os.path.join(_ONNX_DIR, re.sub(r"[^A-Za-z0-9._-]+", "_", model_name))
+    onnx_file = "onnx/model.onnx"
+    try:
+        if not os.path.exists(os.path.join(export_dir, onnx_file)):
+            SentenceTransformer(model_name, device="cpu", backend="onnx").save_pretrained(export_dir)
+        if backend == "onnx_int8":
+            # The export is named model_qint8_<target>.onnx or, for targets
+            # with unsigned activations, model_quint8_<target>.onnx.
+            pattern = os.path.join(export_dir, "onnx", f"model_q*int8_{_ONNX_QUANTIZATION}.onnx")
+            if not glob.glob(pattern):
+                from sentence_transformers import export_dynamic_quantized_onnx_model
+
+                export_dynamic_quantized_onnx_model(
+                    SentenceTransformer(export_dir, device="cpu", backend="onnx"), _ONNX_QUANTIZATION, export_dir
+                )
+            onnx_file = "onnx/" + os.path.basename(sorted(glob.glob(pattern))[0])
+        return SentenceTransformer(export_dir, device="cpu", backend="onnx", model_kwargs={"file_name": onnx_file})
+    except ImportError as exc:
+        raise ModuleNotFoundError(
+            "The ONNX embedding backends need sentence-transformers>=3.2 with ONNX Runtime. "
+            "Install them with: python3 -m pip install 'sentence-transformers[onnx]'"
+        ) from exc
+
+
 def _load_local_embedder(cfg: RAGLLMConfig) -> SentenceTransformer:
-    """Load the local sentence-transformer used for retrieval embeddings."""
-    return SentenceTransformer(cfg.local_embedding_model, device=cfg.local_embedding_device)
+    """Load (once per process) the local sentence-transformer used for retrieval embeddings."""
+    key = (cfg.local_embedding_model, cfg.local_embedding_device, cfg.local_embedding_backend)
+    embedder = _EMBEDDERS.get(key)
+    if embedder is None:
+        embedder = _build_local_embedder(*key)
+        _EMBEDDERS[key] = embedder
+    return embedder
 
 
-def _embed_texts_local(
+def _encode_local(
     embedder: SentenceTransformer,
     texts: List[str],
     *,
     batch_size: int,
     normalize: bool,
-    desc: str = "embed",
-    verbose: bool = True,
+    desc: str,
+    verbose: bool,
+    sort_by_length: bool = True,
 ) -> np.ndarray:
-    """Embed texts in batches and return a float32 matrix.
+    """Run the sentence-transformer over ``texts`` in batches.
 
-    Normalization is applied consistently so retrieval and fast-path scoring
-    can use cosine similarity via dot products.
+    Texts are encoded longest first, so every batch is padded to about the
+    length of its own texts; rows are returned in input order.
     """
-    if not texts:
-        return np.zeros((0, 1), dtype=np.float32)
-
     bs = max(1, int(batch_size))
     out_chunks: List[np.ndarray] = []
 
+    order = np.argsort([-len(t) for t in texts], kind="stable") if sort_by_length else np.arange(len(texts))
+    texts_sorted = [texts[i] for i in order]
+
     rng = range(0, len(texts), bs)
     it = rng if not verbose else tqdm(rng, desc=desc, leave=False)
     for i in it:
-        chunk = texts[i:i + bs]
+        chunk = texts_sorted[i:i + bs]
         emb = embedder.encode(
             chunk,
             batch_size=len(chunk),
@@ -424,7 +730,40 @@ def _embed_texts_local(
         )
         out_chunks.append(emb.astype(np.float32, copy=False))
 
-    out = np.vstack(out_chunks) if out_chunks else np.zeros((0, 1), dtype=np.float32)
+    if not out_chunks:
+        return np.zeros((0, 1), dtype=np.float32)
+    out = np.vstack(out_chunks)
+    restored = np.empty_like(out)
+    restored[order] = out
+    return restored
+
+
+def _embed_texts_local(
+    get_embedder: Callable[[], SentenceTransformer],
+    texts: List[str],
+    *,
+    batch_size: int,
+    normalize: bool,
+    desc: str = "embed",
+    verbose: bool = True,
+    store: Optional[TextEmbeddingStore] = None,
+) -> np.ndarray:
+    """Embed texts in batches and return a float32 matrix.
+
+    With a ``store``, only texts it has never seen are encoded and the embedder
+    is loaded only if there is such a text. Normalization is applied
+    consistently so retrieval and fast-path scoring can use cosine similarity
+    via dot products.
+    """
+    if not texts:
+        return np.zeros((0, 1), dtype=np.float32)
+
+    def encode(todo: List[str]) -> np.ndarray:
+        return _encode_local(
+            get_embedder(), todo, batch_size=batch_size, normalize=normalize, desc=desc, verbose=verbose
+        )
+
+    out = store.embed(texts, encode) if store is not None else encode(texts)
 
     # Keep normalization explicit because downstream retrieval assumes it.
     if normalize:
@@ -432,6 +771,93 @@ def _embed_texts_local(
     return out
 
 
+# ---- Per-group TRAIN shards ----
+@dataclass
+class _BundleShard:
+    """TRAIN bundles of one (label, actor group) and their embeddings."""
+    bundles: List[str]
+    emb: np.ndarray
+
+
+# A shard depends only on the group's lines, the bundling settings and the
+# embedding model, so it is keyed by those and shared across splits.
+_SHARDS: Dict[Tuple[Any, ...], _BundleShard] = {}
+
+
+def _shard_key(cfg: RAGLLMConfig, label: str, group: Any, lines: List[str]) -> Tuple[Any, ...]:
+    """Return the ``_SHARDS`` key of one group's lines under ``cfg``."""
+    h = hashlib.sha1()
+    for t in lines:
+        h.update(t.encode("utf-8"))
+        h.update(b"\0")
+    return (
+        _embedding_id(cfg),
+        cfg.local_normalize_embeddings,
+        cfg.local_embedding_cache_dtype if cfg.local_embedding_cache else None,
+        cfg.bundle_size,
+        cfg.bundle_strategy,
+        cfg.sliding_stride,
+        cfg.drop_last_incomplete,
+        label,
+        str(group),
+        len(lines),
+        h.digest(),
+    )
+
+
+def _train_shards(
+    lines_by_shard: Dict[Tuple[str, Any], List[str]],
+    cfg: RAGLLMConfig,
+    get_embedder: Callable[[], SentenceTransformer],
+    *,
+    store: Optional[TextEmbeddingStore],
+    verbose: bool,
+) -> Dict[Tuple[str, Any], _BundleShard]:
+    """Return the shard of every ``(label, group)``, bundling and embedding only new ones.
+
+    The bundles of all new shards are embedded in one call and split afterwards.
+    """
+    out: Dict[Tuple[str, Any], _BundleShard] = {}
+    new: Dict[Tuple[str, Any], Tuple[Tuple[Any, ...], List[str]]] = {}
+    for lg, lines in lines_by_shard.items():
+        key = _shard_key(cfg, lg[0], lg[1], lines)
+        shard = _SHARDS.get(key)
+        if shard is not None:
+            out[lg] = shard
+            continue
+        bundles = _bundle_texts(
+            lines,
+            bundle_size=cfg.bundle_size,
+            stride=cfg.sliding_stride,
+            strategy=cfg.bundle_strategy,
+            drop_last=cfg.drop_last_incomplete,
+        )
+        new[lg] = (key, bundles)
+
+    if verbose:
+        print(f"[LLM] TRAIN group shards: {len(out)} reused, {len(new)} new")
+
+    if new:
+        emb = _embed_texts_local(
+            get_embedder,
+            [b for _, bundles in new.values() for b in bundles],
+            batch_size=cfg.local_embedding_batch_size,
+            normalize=cfg.local_normalize_embeddings,
+            desc="[LLM] embed TRAIN shards",
+            verbose=verbose,
+            store=store,
+        )
+        start = 0
+        for lg, (key, bundles) in new.items():
+            shard = _BundleShard(bundles=bundles, emb=emb[start:start + len(bundles)])
+            start += len(bundles)
+            _SHARDS[key] = shard
+            out[lg] = shard
+
+    # Keep the caller's (first appearance) order.
+    return {lg: out[lg] for lg in lines_by_shard}
+
+
 # ---- Single-run evaluation ----
 def run_one(
     examples: List[Example],
@@ -453,15 +879,26 @@ def run_one(
         print(f"[LLM] evaluate_test: {evaluate_test}")
         print("=" * 80)
 
-    llm_client: Optional[OpenAI] = None
-    if cfg.use_llm_fallback:
-        llm_client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+    # The embedder is loaded on first use, which a warm embedding store may
+    # avoid altogether.
+    def embedder() -> SentenceTransformer:
+        return _load_local_embedder(cfg)
+
+    store: Optional[TextEmbeddingStore] = None
+    if cfg.local_embedding_cache:
+        store = get_embedding_store(
+            _embedding_id(cfg), cfg.local_normalize_embeddings, cfg.local_embedding_cache_dtype
+        )
+    store_hits0, store_misses0 = (store.hits, store.misses) if store is not None else (0, 0)
 
     if verbose:
-        print("\n[LLM] Loading local embedding model...")
-    embedder = _load_local_embedder(cfg)
-    if verbose:
-        print(f"[LLM] Local embedder: {cfg.local_embedding_model} on {cfg.local_embedding_device}")
+        print(
+            f"[LLM] Local embedder: {cfg.local_embedding_model} on {cfg.local_embedding_device} "
+            f"({cfg.local_embedding_backend})"
+        )
+        print(f"[LLM] Embedding store: {store.path if store is not None else 'off'}")
+        if cfg.use_llm_fallback:
+            print(f"[LLM] Response cache: {cfg.llm_cache_mode}")
         print(f"[LLM] Retrieval backend: {cfg.retrieval_backend} (faiss_available={_FAISS_OK})")
 
     X_all = np.array([ex.text for ex in examples], dtype=object)
@@ -493,43 +930,62 @@ def run_one(
         print(f"[LLM] VAL  : {len(X_val)}")
         print(f"[LLM] TEST : {len(X_test)}")
 
-    # ---- Build class-specific training bundles ----
-    train_lines_by_class: Dict[str, List[str]] = {label_a: [], label_b: []}
-    for txt, lab in zip(X_train, y_train):
-        train_lines_by_class[lab].append(str(txt))
+    # ---- Build and index class-specific training bundles ----
+    index = _InMemoryPerClassIndex(backend=cfg.retrieval_backend, faiss_hnsw_m=cfg.faiss_hnsw_m)
+
+    if cfg.train_group_shards:
+        # Each class index is the concatenation of its groups' shards, in
+        # order of first appearance among the TRAIN rows.
+        lines_by_shard: Dict[Tuple[str, Any], List[str]] = {}
+        for i, txt, lab in zip(split.train_idx.tolist(), X_train, y_train):
+            lines_by_shard.setdefault((lab, examples[i].group), []).append(str(txt))
 
-    train_bundles_by_class: Dict[str, List[str]] = {}
-    for lab in (label_a, label_b):
-        bs = _bundle_texts(
-            train_lines_by_class[lab],
-            bundle_size=cfg.bundle_size,
-            stride=cfg.sliding_stride,
-            strategy=cfg.bundle_strategy,
-            drop_last=cfg.drop_last_incomplete,
-        )
-        train_bundles_by_class[lab] = bs
         if verbose:
-            print(f"[LLM] {lab}: {len(bs)} TRAIN bundles")
+            print("\n[LLM] Embedding TRAIN bundles per group shard (local, free)...")
+        shards = _train_shards(lines_by_shard, cfg, embedder, store=store, verbose=verbose)
 
-    # ---- Embed and index training bundles ----
-    if verbose:
-        print("\n[LLM] Embedding TRAIN bundles (local, free)...")
+        for lab in (label_a, label_b):
+            parts = [(s.emb, s.bundles) for (l, _), s in shards.items() if l == lab]
+            index.add_shards(lab, parts)
+            if verbose:
+                n_bundles = sum(len(txt) for _, txt in parts)
+                print(f"[LLM] {lab}: {n_bundles} TRAIN bundles from {len(parts)} group shards")
+    else:
+        train_lines_by_class: Dict[str, List[str]] = {label_a: [], label_b: []}
+        for txt, lab in zip(X_train, y_train):
+            train_lines_by_class[lab].append(str(txt))
 
-    index = _InMemoryPerClassIndex(backend=cfg.retrieval_backend, faiss_hnsw_m=cfg.faiss_hnsw_m)
+        train_bundles_by_class: Dict[str, List[str]] = {}
+        for lab in (label_a, label_b):
+            bs = _bundle_texts(
+                train_lines_by_class[lab],
+                bundle_size=cfg.bundle_size,
+                stride=cfg.sliding_stride,
+                strategy=cfg.bundle_strategy,
+                drop_last=cfg.drop_last_incomplete,
+            )
+            train_bundles_by_class[lab] = bs
+            if verbose:
+                print(f"[LLM] {lab}: {len(bs)} TRAIN bundles")
 
-    for lab in (label_a, label_b):
+        # ---- Embed and index training bundles ----
         if verbose:
-            print(f"[LLM]   Embedding {lab}: {len(train_bundles_by_class[lab])} bundles")
+            print("\n[LLM] Embedding TRAIN bundles (local, free)...")
 
-        emb = _embed_texts_local(
-            embedder,
-            train_bundles_by_class[lab],
-            batch_size=cfg.local_embedding_batch_size,
-            normalize=cfg.local_normalize_embeddings,
-            desc=f"[LLM] embed TRAIN {lab}",
-            verbose=verbose,
-        )
-        index.add(lab, emb, train_bundles_by_class[lab])
+        for lab in (label_a, label_b):
+            if verbose:
+                print(f"[LLM]   Embedding {lab}: {len(train_bundles_by_class[lab])} bundles")
+
+            emb = _embed_texts_local(
+                embedder,
+                train_bundles_by_class[lab],
+                batch_size=cfg.local_embedding_batch_size,
+                normalize=cfg.local_normalize_embeddings,
+                desc=f"[LLM] embed TRAIN {lab}",
+                verbose=verbose,
+                store=store,
+            )
+            index.add(lab, emb, train_bundles_by_class[lab])
 
     # ---- Predict bundles with retrieval fast-path and optional LLM fallback ----
     def predict_bundles(name: str, bundles: List[str]) -> List[str]:
@@ -563,107 +1019,69 @@ def run_one(
             normalize=cfg.local_normalize_embeddings,
             desc=f"[LLM] embed QUERIES {name}",
             verbose=verbose,
+            store=store,
         )
 
-        llm_calls = 0
-        fast_calls = 0
-
-        it = range(len(bundles_norm))
-        it = it if not verbose else tqdm(it, desc=f"[LLM] predict {name}", leave=False)
-
-        for i in it:
-            b_norm = bundles_norm[i]
-            q_emb = q_embs[i]  # already normalized if cfg.local_normalize_embeddings
-
-            r_a = index.topk(label_a, q_emb, cfg.per_class_k)
-            r_b = index.topk(label_b, q_emb, cfg.per_class_k)
-
-            sims_a = np.array([sim for sim, _ in r_a], dtype=np.float32)
-            sims_b = np.array([sim for sim, _ in r_b], dtype=np.float32)
-
-            # If one class has no retrieved support, the similarity comparison
-            # is not meaningful and the LLM is forced when available.
-            force_llm = (sims_a.size == 0 or sims_b.size == 0)
+        # ---- Retrieval and fast-path decisions for all bundles at once ----
+        sims_a, idx_a = index.topk_batch(label_a, q_embs, cfg.per_class_k)
+        sims_b, idx_b = index.topk_batch(label_b, q_embs, cfg.per_class_k)
+
+        a_agg = _aggregate_sims(sims_a, idx_a, agg=cfg.score_agg)
+        b_agg = _aggregate_sims(sims_b, idx_b, agg=cfg.score_agg)
+
+        # If one class has no retrieved support, the similarity comparison
+        # is not meaningful and the LLM is forced when available.
+        force_llm = np.isnan(a_agg) | np.isnan(b_agg)
+        scores = np.where(force_llm, 0.0, a_agg - b_agg)
+
+        # The fast path is used only when retrieval yields a sufficiently
+        # decisive margin between the two class-specific scores.
+        preds = [label_a if s >= 0 else label_b for s in scores.tolist()]
+        need_llm = force_llm | (np.abs(scores) < cfg.llm_uncertainty_margin)
+        llm_rows = np.flatnonzero(need_llm) if llm_available else np.zeros(0, dtype=np.int64)
+
+        # ---- LLM fallback for the uncertain rows, dispatched concurrently ----
+        jobs = [
+            _build_messages(
+                bundles_norm[i],
+                label_a=label_a,
+                label_b=label_b,
+                retrieved_a=index.hits(label_a, sims_a[i], idx_a[i]),
+                retrieved_b=index.hits(label_b, sims_b[i], idx_b[i]),
+                max_chars_per_retrieved=cfg.max_chars_per_retrieved,
+            )
+            for i in llm_rows.tolist()
+        ]
+        answers, llm_sent, llm_cached = _run_coroutine(
+            _chat_classify_many(
+                jobs, cfg=cfg, valid_labels=valid_labels, desc=f"[LLM] LLM fallback {name}", verbose=verbose
+            )
+        )
 
-            if force_llm:
-                score = 0.0
+        # Once the API becomes unavailable, the run degrades gracefully to
+        # embedding-only decisions rather than failing mid-evaluation: rows
+        # without an answer keep the retrieval decision computed above.
+        llm_answered = 0
+        for i, answer in zip(llm_rows.tolist(), answers):
+            if answer is not None:
+                preds[i] = answer
+                llm_answered += 1
+        if llm_answered < len(jobs) and verbose:
+            if cfg.llm_cache_mode == "replay_only":
+                print(f"[LLM] replay_only: {len(jobs) - llm_answered} bundles not in the response cache → embedding-only")
             else:
-                a_agg = _aggregate_sims(sims_a, agg=cfg.score_agg)
-                b_agg = _aggregate_sims(sims_b, agg=cfg.score_agg)
-                score = float(a_agg - b_agg)
-
-            # The fast path is used only when retrieval yields a sufficiently
-            # decisive margin between the two class-specific scores.
-            use_llm = llm_available and (force_llm or abs(score) < cfg.llm_uncertainty_margin)
-
-            if use_llm:
-                if llm_client is None:
-                    raise RuntimeError("use_llm_fallback=True but OpenAI client is not available.")
-                llm_calls += 1
-
-                sys, user = _build_messages(
-                    b_norm,
-                    label_a=label_a,
-                    label_b=label_b,
-                    retrieved_a=r_a,
-                    retrieved_b=r_b,
-                    max_chars_per_retrieved=cfg.max_chars_per_retrieved,
-                )
+                print("[LLM] ⚠ OpenAI unavailable → embedding-only for rest of this run")
 
-                try:
-                    pred = _chat_classify(
-                        llm_client,
-                        model=cfg.chat_model,
-                        temperature=cfg.temperature,
-                        max_tokens=cfg.max_output_tokens,
-                        timeout_s=cfg.timeout_s,
-                        max_retries=cfg.max_retries,
-                        retry_backoff_s=cfg.retry_backoff_s,
-                        system_msg=sys,
-                        user_msg=user,
-                        valid_labels=valid_labels,
-                    )
-                    preds.append(pred)
-
-                except Exception as e:
-                    msg = str(e)
-
-                    # Once the API becomes unavailable, the run degrades
-                    # gracefully to embedding-only decisions rather than failing
-                    # mid-evaluation and mixing partial outputs.
-                    if ("insufficient_quota" in msg) or ("Error code: 429" in msg) or ("429" in msg):
-                        llm_available = False
-
-                        if verbose:
-                            print("[LLM] ⚠ OpenAI unavailable → embedding-only for rest of this run")
-
-                        # This item is resolved with the same retrieval score
-                        # used by the normal fast path.
-                        fast_calls += 1
-                        pred = label_a if score >= 0 else label_b
-                        preds.append(pred)
-
-                    else:
-                        raise
-
-            else:
-                fast_calls += 1
-                pred = label_a if score >= 0 else label_b
-                preds.append(pred)
-
-            if verbose and hasattr(it, "set_postfix"):
-                total = llm_calls + fast_calls
-                it.set_postfix(
-                    fast=fast_calls,
-                    llm=llm_calls,
-                    llm_rate=f"{(llm_calls / max(1, total)):.0%}",
-                    backend=index.backend,
-                )
+        llm_calls = llm_sent + llm_cached
+        fast_calls = len(bundles_norm) - llm_answered
 
         if verbose:
             total = llm_calls + fast_calls
             if total > 0:
-                print(f"[LLM] [{name}] Summary: fast={fast_calls}, llm={llm_calls}, llm_rate={llm_calls/total:.1%}")
+                print(
+                    f"[LLM] [{name}] Summary: fast={fast_calls}, llm={llm_calls} (cached={llm_cached}), "
+                    f"llm_rate={llm_calls/total:.1%}"
+                )
 
         return preds
 
@@ -732,6 +1150,13 @@ def run_one(
 
         out["test"] = evaluate_classifier(y_test_true, y_test_pred, labels=labels_sorted)
 
+    if verbose and store is not None:
+        hits, misses = store.hits - store_hits0, store.misses - store_misses0
+        print(
+            f"[LLM] Embedding store summary: hits={hits}, misses={misses}, "
+            f"hit_rate={hits / max(1, hits + misses):.1%}, stored={len(store)}"
+        )
+
     return out
 
 
@@ -0,0 +1,142 @@
+"""Check the import time of the CLI entry points against a budget.
+
+The null-distribution shell loops start a runner once per permutation, so
+every second a runner spends importing is paid hundreds of times. Heavy
+dependencies (torch, transformers, sentence_transformers, openai, matplotlib)
+are therefore imported inside the functions that need them; this script
+guards that.
+
+Each entry point is imported in a fresh interpreter under
+``python -X importtime``. The check fails (exit code 1) when
+
+1. the fastest of ``--repeats`` imports takes longer than the entry point's
+   budget (times ``--budget_scale`` for slower machines), or
+2. a module the entry point must not load at startup shows up among the
+   imported modules; this part does not depend on the machine.
+
+    python -m src.runners.import_time_check
+    python -m src.runners.import_time_check --budget_scale 2 --only tfidf_360_nested
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+# Third-party packages that cost seconds to import and are only needed by
+# specific code paths.
+HEAVY = ("torch", "transformers", "sentence_transformers", "openai", "matplotlib", "onnxruntime", "optimum")
+
+
+@dataclass(frozen=True)
+class EntryPoint:
+    module: str
+    budget_s: float
+    forbidden: Tuple[str, ...] = HEAVY
+
+
+# ---- Entry points ----
+ENTRY_POINTS: List[EntryPoint] = [
+    EntryPoint("src.runners.ml.tfidf_360_nested", 3.0),
+    EntryPoint("src.runners.ml.inter_times_360_nested", 3.0),
+    EntryPoint("src.runners.ml.llm_360_nested", 3.5),
+    # The neural runners need torch at startup, but nothing else heavy.
+    EntryPoint("src.runners.ml.cnn_360_nested", 6.0, ("transformers", "sentence_transformers", "openai", "matplotlib")),
+    EntryPoint("src.runners.ml.bert_360_nested", 8.0, ("sentence_transformers", "openai", "matplotlib")),
+    EntryPoint("src.runners.stats.one_gram_runner", 3.0),
+    EntryPoint("src.runners.stats.complexity_metrics_runner", 3.0),
+    EntryPoint("src.runners.worker", 1.0),
+    EntryPoint("src.runners.queue_coordinator", 1.0),
+]
+
+
+def parse_args():
+    """Parse the budget scaling and the entry-point selection."""
+    p = argparse.ArgumentParser()
+    p.add_argument("--repeats", type=int, default=3, help="Imports per entry point; the fastest one counts.")
+    p.add_argument("--budget_scale", type=float, default=1.0, help="Multiply every time budget (slow or loaded machines).")
+    p.add_argument("--only", nargs="+", default=None, help="Check only entry points whose module ends with one of these names.")
+    p.add_argument("--top", type=int, default=5, help="Slowest top-level imports to list per entry point.")
+    return p.parse_args()
+
+
+def import_profile(module: str) -> Tuple[float, Dict[str, int], Dict[str, int]]:
+    """Import ``module`` in a fresh interpreter.
+
+    Returns the total import time in seconds and the cumulative microseconds
+    of every imported module and of every top-level third-party package.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    # Lines look like "import time:  self [us] | cumulative | imported package",
+    # with the package name indented two spaces per nesting level.
+    cumulative: Dict[str, int] = {}
+    direct: Dict[str, int] = {}
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        name = name.strip()
+        cumulative[name] = int(cum)
+        if depth == 0:
+            total_us += int(cum)
+        elif not name.startswith(("src.", "_")) and "." not in name:
+            direct[name] = max(direct.get(name, 0), int(cum))
+    return total_us / 1e6, cumulative, direct
+
+
+def check(ep: EntryPoint, *, repeats: int, budget_scale: float, top: int) -> bool:
+    """Profile one entry point, print its report and return whether it passes."""
+    runs = [import_profile(ep.module) for _ in range(max(1, repeats))]
+    seconds, cumulative, direct = min(runs, key=lambda r: r[0])
+    budget = ep.budget_s * budget_scale
+    loaded = sorted(name for name in cumulative if name in ep.forbidden)
+
+    ok = seconds <= budget and not loaded
+    slowest = sorted(direct.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    print(
+        f"[{'OK' if ok else 'FAIL'}] {ep.module}: {seconds:.2f}s (budget {budget:.2f}s)  "
+        + "  ".join(f"{name}={us / 1e6:.2f}s" for name, us in slowest)
+    )
+    if seconds > budget:
+        print(f"       over budget by {seconds - budget:.2f}s")
+    if loaded:
+        print(f"       imports at startup: {', '.join(loaded)}")
+    return ok
+
+
+def main():
+    """Check every selected entry point; exit with 1 if any fails."""
+    args = parse_args()
+    entry_points = ENTRY_POINTS
+    if args.only:
+        entry_points = [ep for ep in ENTRY_POINTS if ep.module.endswith(tuple(args.only))]
+        if not entry_points:
+            raise SystemExit(f"No entry point matches {args.only}")
+
+    failed = [
+        ep.module
+        for ep in entry_points
+        if not check(ep, repeats=args.repeats, budget_scale=args.budget_scale, top=args.top)
+    ]
+    if failed:
+        print(f"\n{len(failed)} of {len(entry_points)} entry points failed: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"\nAll {len(entry_points)} entry points within budget.")
+
+
+if __name__ == "__main__":
+    main()
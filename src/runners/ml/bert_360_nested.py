@@ -22,8 +22,13 @@ from src.core.shared.loader import load_examples, LoadConfig
 from src.core.ml.splits import make_splits
 from src.core.ml.val_test_combs import make_val_test_splits
 from src.core.ml.benchmark import bench
+from src.core.ml.resources import configure_threads
+from src.core.ml.checkpoint import RowJournal
+from src.core.ml.dedup import dedup_stats
+from src.core.ml.token_cache import configure_token_cache
+from src.core.shared.results_store import record_run
 
-from src.ml_pipelines.bert_pipeline import Candidate, TransformerConfig, search
+from src.ml_pipelines.bert_pipeline import INFERENCE_BACKENDS, Candidate, FrozenEncoderConfig, TransformerConfig, search
 
 
 def parse_args():
@@ -44,6 +49,53 @@ def parse_args():
     p.add_argument("--metric", type=str, default="f1_macro", choices=["f1_macro", "f1_weighted", "accuracy", "balanced_accuracy"])
     p.add_argument("--limit_outer", type=int, default=0, help="If >0, only run first N outer splits (debug)")
     p.add_argument("--benchmark", action="store_true", help="Print timing for critical sections (load_examples, search).")    
+    p.add_argument(
+        "--no_resume",
+        action="store_true",
+        help="Ignore an existing <out_csv>.journal.jsonl and recompute all outer splits.",
+    )
+    p.add_argument(
+        "--cpu_budget",
+        type=int,
+        default=None,
+        help="Cores to use in total (default: all available). Split evenly between worker processes "
+             "and their BLAS/OpenMP/torch thread pools.",
+    )
+    p.add_argument(
+        "--results_db",
+        type=str,
+        default=None,
+        help="Also store the finished run in this results database (see src.runners.results_db).",
+    )
+    p.add_argument(
+        "--mode",
+        type=str,
+        default="finetune",
+        choices=["finetune", "frozen"],
+        help="finetune: train the whole transformer per candidate. frozen: encode texts once with the "
+             "frozen encoder and search classification heads on the cached embeddings.",
+    )
+    p.add_argument(
+        "--inference_backend",
+        type=str,
+        default="torch",
+        choices=list(INFERENCE_BACKENDS),
+        help="Backend for the final validation/test prediction in finetune mode: torch, int8 (dynamic "
+             "quantization) or onnx (onnxruntime). Early-stopping checks use torch. "
+             "See src.runners.ml.bert_inference_bench.",
+    )
+    p.add_argument(
+        "--dedup_train",
+        action="store_true",
+        help="Finetune mode: train on distinct (text, label) pairs with the loss weighted by their "
+             "count. Prediction always runs once per distinct text.",
+    )
+    p.add_argument(
+        "--token_cache_dir",
+        type=str,
+        default=None,
+        help="Directory of the token-id cache (default: $DATAANALYSIS_TOKEN_CACHE or .cache/token_ids).",
+    )
     return p.parse_args()
 
 
@@ -121,14 +173,33 @@ def make_load_configs(dataset: str) -> List[NamedLoad]:
     return out
 
 
-def make_candidates() -> List[Candidate]:
+def make_candidates(
+    mode: str = "finetune",
+    inference_backend: str = "torch",
+    dedup_train: bool = False,
+) -> List[Candidate]:
     """Return the transformer candidates considered in the inner search.
 
-    The candidate set is deliberately small so that each outer split remains
+    The fine-tuning set is deliberately small so that each outer split remains
     computationally feasible while still probing a meaningful model variant.
+    In frozen mode the encoder cost is paid once per text, so the head grid can
+    be broader.
     """
     candidates: List[Candidate] = []
 
+    if mode == "frozen":
+        for model_name in ["distilroberta-base"]:
+            for C in [0.1, 1.0, 10.0]:
+                candidates.append(Candidate(cfg=FrozenEncoderConfig(
+                    model_name=model_name, max_length=128, pooling="mean", head="logreg", C=C, seed=42,
+                )))
+            for hidden in [256]:
+                candidates.append(Candidate(cfg=FrozenEncoderConfig(
+                    model_name=model_name, max_length=128, pooling="mean", head="mlp",
+                    hidden_size=hidden, lr=1e-3, epochs=30, seed=42,
+                )))
+        return candidates
+
     for model_name in ["distilroberta-base"]: #"roberta-base"]: # "bert-base-uncased" # "distilroberta-base"
         for lr in [2e-5]:
             for max_len in [128]:
@@ -145,6 +216,8 @@ def make_candidates() -> List[Candidate]:
                                 warmup_ratio=0.1,
                                 seed=42,
                                 patience=1,
+                                inference_backend=inference_backend,
+                                dedup_train=dedup_train,
                             )
                         )
                     )
@@ -179,6 +252,8 @@ def main():
     args = parse_args()
     metric = args.metric
     out_csv = _resolve_out_csv(args.out_csv)
+    configure_threads(1, cpu_budget=args.cpu_budget)
+    configure_token_cache(args.token_cache_dir)
 
     # ---- Set up search space and outer splits ----
     all_outer_splits = make_val_test_splits(args.dataset)
@@ -187,19 +262,38 @@ def main():
         outer_splits = outer_splits[: args.limit_outer]
 
     load_grid = make_load_configs(args.dataset)
-    cand_grid = make_candidates()
+    cand_grid = make_candidates(args.mode, args.inference_backend, args.dedup_train)
 
     print(f"Dataset     : {args.dataset}")
     print(f"Outer splits: {len(outer_splits)} (of {len(all_outer_splits)})")
     print(f"LoadConfigs : {len(load_grid)}")
-    print(f"Candidates  : {len(cand_grid)}")
+    print(f"Candidates  : {len(cand_grid)} ({args.mode})")
     print(f"Metric      : {metric}")
     print(f"Writing CSV : {out_csv}")
 
-    rows: List[Dict[str, object]] = []
+    # Completed outer splits are journaled next to the CSV; a rerun with the
+    # same configuration only computes the missing ones.
+    journal = RowJournal(
+        out_csv,
+        {
+            "runner": "bert_360_nested",
+            "dataset": args.dataset,
+            "metric": metric,
+            "outer_splits": all_outer_splits,
+            "load_grid": load_grid,
+            "candidates": cand_grid,
+        },
+        resume=not args.no_resume,
+    )
+    done = journal.completed()
+    if done:
+        print(f"Resuming    : {len(done)} outer splits already in {journal.path}")
 
     # ---- Outer evaluation loop ----
     for outer_i, (val_groups, test_groups) in enumerate(outer_splits, 1):
+        if outer_i in done:
+            continue
+
         print("\n" + "=" * 100)
         print(f"[OUTER {outer_i:03d}/{len(outer_splits)}] val={val_groups} test={test_groups}")
         print("=" * 100)
@@ -227,6 +321,7 @@ def main():
             if not examples:
                 print("  ⚠ No examples produced. Skipping.")
                 continue
+            print(f"  {dedup_stats([e.text for e in examples])}")
 
             y = np.array([e.label for e in examples], dtype=object)
             groups = np.array([e.group for e in examples], dtype=object)
@@ -265,6 +360,7 @@ def main():
                     metric=metric,
                     evaluate_test_for_all=False,
                     verbose=False,
+                    benchmark=args.benchmark,
                 )
 
             val_metric = _safe_float(getattr(best_val_res, metric, np.nan))
@@ -279,6 +375,7 @@ def main():
 
         if best_overall is None:
             print("⚠ No valid result for this outer split.")
+            journal.append(outer_i, None)
             continue
 
         val_metric, named, best_cand, best_val_res, best_test_res, (n_train, n_val, n_test) = best_overall
@@ -335,9 +432,10 @@ def main():
         print(f"    BERT cfg  : {best_cand.cfg}")
         print(f"    VAL  {metric}={row['selection_val_score']:.4f} | TEST {metric}={row['selection_test_score']:.4f}")
 
-        rows.append(row)
+        journal.append(outer_i, row)
 
     # ---- Write per-split results ----
+    rows = journal.rows()
     if not rows:
         print("\nNo rows collected; nothing to write.")
         return
@@ -348,6 +446,17 @@ def main():
         w.writeheader()
         w.writerows(rows)
 
+    if args.results_db:
+        record_run(
+            args.results_db,
+            rows,
+            kind="ml",
+            tool="bert",
+            dataset=args.dataset,
+            log_type="audit",
+            source=out_csv,
+        )
+
     # ---- Aggregate summary ----
     test_f1s = np.array([r["test_f1_macro"] for r in rows], dtype=float)
     test_bals = np.array([r["test_balanced_accuracy"] for r in rows], dtype=float)
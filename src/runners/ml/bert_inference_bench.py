@@ -0,0 +1,106 @@
+"""Benchmark CPU inference backends of the BERT pipeline against fp32 torch.
+
+Fine-tunes the runner's model for a few steps on rows of the corpus (so the
+classification head is not random), then predicts the same rows with every
+backend in ``INFERENCE_BACKENDS`` and reports throughput in windows per second
+and the share of predictions that agree with fp32 torch.
+
+    python -m src.runners.ml.bert_inference_bench --dataset WordPress --n_rows 2048
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import replace
+
+import numpy as np
+import torch
+from transformers import AutoModelForSequenceClassification
+
+from src.core.ml.resources import configure_threads
+from src.core.ml.token_cache import get_token_cache
+from src.core.shared.loader import load_examples
+from src.ml_pipelines.bert_pipeline import (
+    INFERENCE_BACKENDS,
+    TextDataset,
+    _encode_rows,
+    _make_loader,
+    _predict,
+)
+from src.runners.ml.bert_360_nested import make_candidates, make_load_configs
+
+
+def parse_args():
+    """Parse the benchmark size and model settings."""
+    p = argparse.ArgumentParser()
+    p.add_argument("--dataset", type=str, default="Nextcloud", choices=["Nextcloud", "WordPress", "Data", "Data_WP"])
+    p.add_argument("--model_name", type=str, default=None, help="Default: the model of the first runner candidate.")
+    p.add_argument("--n_rows", type=int, default=2048, help="Rows taken from the corpus.")
+    p.add_argument("--train_batches", type=int, default=30, help="Fine-tuning steps before measuring.")
+    p.add_argument("--repeats", type=int, default=2, help="Timed passes per backend (best is reported).")
+    p.add_argument("--cpu_budget", type=int, default=None)
+    return p.parse_args()
+
+
+def main():
+    """Predict identical rows with each backend and compare to fp32 torch."""
+    args = parse_args()
+    configure_threads(1, cpu_budget=args.cpu_budget)
+
+    cfg = make_candidates()[0].cfg
+    cfg = replace(cfg, device="cpu", model_name=args.model_name or cfg.model_name)
+
+    examples = load_examples(make_load_configs(args.dataset)[0].cfg)
+    take = np.random.default_rng(0).permutation(len(examples))[: args.n_rows]
+    examples = [examples[i] for i in take]
+    labels = sorted({ex.label for ex in examples})
+    y = torch.tensor([labels.index(ex.label) for ex in examples])
+
+    cache = get_token_cache(cfg.model_name, cfg.max_length)
+    ds = TextDataset(_encode_rows(cache, cache.rows_for([ex.text for ex in examples])), y)
+    print(f"model={cfg.model_name} rows={len(ds)} bs={cfg.batch_size} threads={torch.get_num_threads()}")
+
+    # ---- Short fine-tuning so predictions are not decided by a random head ----
+    model = AutoModelForSequenceClassification.from_pretrained(cfg.model_name, num_labels=len(labels))
+    optimizer = torch.optim.AdamW(model.parameters(), lr=cfg.lr)
+    model.train()
+    for i, batch in enumerate(_make_loader(ds, cfg, shuffle=True, padding_side=cache.padding_side)):
+        if i >= args.train_batches:
+            break
+        batch.pop("idx")
+        labels_t = batch.pop("labels")
+        loss = torch.nn.functional.cross_entropy(model(**batch).logits, labels_t)
+        loss.backward()
+        optimizer.step()
+        optimizer.zero_grad()
+
+    # ---- Throughput and agreement per backend ----
+    loader = _make_loader(ds, cfg, shuffle=False, padding_side=cache.padding_side)
+    reference = None
+    base_rate = None
+    for backend in INFERENCE_BACKENDS:
+        try:
+            # Each pass includes the backend setup (quantization or ONNX
+            # export), as every prediction call in the pipeline does.
+            walls = []
+            for _ in range(max(1, args.repeats)):
+                t0 = time.perf_counter()
+                pred = _predict(model, loader, "cpu", backend=backend, verbose=False)
+                walls.append(time.perf_counter() - t0)
+        except ModuleNotFoundError as e:
+            print(f"{backend:6s}: skipped ({e})")
+            continue
+
+        rate = len(ds) / min(walls)
+        if reference is None:
+            reference, base_rate = pred, rate
+        agree = float(np.mean(pred == reference))
+        print(
+            f"{backend:6s}: {rate:8.1f} windows/s  speedup={rate / base_rate:5.2f}x  "
+            f"agreement with fp32={agree:.2%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Compare fixed ``max_length`` padding with length-bucketed dynamic padding.
+
+Runs the same rows of the first outer split through the BERT pipeline's
+loaders twice, once with ``length_bucketing=False`` (every batch padded to
+``max_length``) and once with ``length_bucketing=True``, and reports the
+tokens the model processed and the wall time of training steps (forward and
+backward) and of prediction.
+
+    python -m src.runners.ml.bert_padding_bench --dataset WordPress --n_rows 2048
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import replace
+from typing import Dict, Tuple
+
+import numpy as np
+import torch
+from transformers import AutoModelForSequenceClassification
+
+from src.core.ml.resources import configure_threads
+from src.core.ml.token_cache import get_token_cache
+from src.core.shared.loader import load_examples
+from src.ml_pipelines.bert_pipeline import TextDataset, TransformerConfig, _encode_rows, _make_loader
+from src.runners.ml.bert_360_nested import make_candidates, make_load_configs
+
+
+def parse_args():
+    """Parse the benchmark size and model settings."""
+    p = argparse.ArgumentParser()
+    p.add_argument("--dataset", type=str, default="Nextcloud", choices=["Nextcloud", "WordPress", "Data", "Data_WP"])
+    p.add_argument("--model_name", type=str, default=None, help="Default: the model of the first runner candidate.")
+    p.add_argument("--n_rows", type=int, default=2048, help="Rows taken from the corpus.")
+    p.add_argument("--max_batches", type=int, default=20, help="Training steps timed per mode.")
+    p.add_argument("--cpu_budget", type=int, default=None)
+    return p.parse_args()
+
+
+def _timed_pass(model, loader, *, train: bool, max_batches: int) -> Tuple[float, int, int]:
+    # Returns wall time, tokens processed (batch x padded width) and real tokens.
+    tokens = real = 0
+    t0 = time.perf_counter()
+    for i, batch in enumerate(loader):
+        if i >= max_batches:
+            break
+        batch.pop("idx")
+        labels = batch.pop("labels")
+        tokens += int(batch["input_ids"].numel())
+        real += int(batch["attention_mask"].sum())
+        if train:
+            loss = torch.nn.functional.cross_entropy(model(**batch).logits, labels)
+            loss.backward()
+            model.zero_grad(set_to_none=True)
+        else:
+            with torch.no_grad():
+                model(**batch)
+    return time.perf_counter() - t0, tokens, real
+
+
+def main():
+    """Time both batching modes on identical rows and print the comparison."""
+    args = parse_args()
+    configure_threads(1, cpu_budget=args.cpu_budget)
+
+    base: TransformerConfig = make_candidates()[0].cfg
+    base = replace(base, device="cpu", model_name=args.model_name or base.model_name)
+
+    examples = load_examples(make_load_configs(args.dataset)[0].cfg)
+    rng = np.random.default_rng(0)
+    take = rng.permutation(len(examples))[: args.n_rows]
+    examples = [examples[i] for i in take]
+    labels = sorted({ex.label for ex in examples})
+    y = torch.tensor([labels.index(ex.label) for ex in examples])
+
+    cache = get_token_cache(base.model_name, base.max_length)
+    rows = cache.rows_for([ex.text for ex in examples])
+    ds = TextDataset(_encode_rows(cache, rows), y)
+    print(
+        f"model={base.model_name} rows={len(ds)} bs={base.batch_size} max_len={base.max_length} "
+        f"mean_len={float(np.mean(ds.lengths)):.1f}"
+    )
+
+    model = AutoModelForSequenceClassification.from_pretrained(base.model_name, num_labels=len(labels))
+
+    results: Dict[str, Dict[str, Tuple[float, int, int]]] = {}
+    for name, bucketing in (("fixed", False), ("bucketed", True)):
+        cfg = replace(base, length_bucketing=bucketing)
+        model.train()
+        train = _timed_pass(
+            model,
+            _make_loader(ds, cfg, shuffle=True, padding_side=cache.padding_side),
+            train=True,
+            max_batches=args.max_batches,
+        )
+        model.eval()
+        predict = _timed_pass(
+            model,
+            _make_loader(ds, cfg, shuffle=False, padding_side=cache.padding_side),
+            train=False,
+            max_batches=len(ds),
+        )
+        results[name] = {"train": train, "predict": predict}
+        for phase, (wall, tokens, real) in results[name].items():
+            print(
+                f"{name:9s} {phase:8s}: wall={wall:8.2f}s tokens={tokens:9d} "
+                f"padding={1.0 - real / max(1, tokens):6.1%}"
+            )
+
+    for phase in ("train", "predict"):
+        fixed, bucketed = results["fixed"][phase], results["bucketed"][phase]
+        print(
+            f"{phase:8s} speedup: {fixed[0] / max(bucketed[0], 1e-9):.2f}x "
+            f"(tokens {fixed[1] / max(1, bucketed[1]):.2f}x fewer)"
+        )
+
+
+if __name__ == "__main__":
+    main()
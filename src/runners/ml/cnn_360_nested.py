@@ -20,6 +20,10 @@ from src.core.shared.loader import load_examples, LoadConfig
 from src.core.ml.splits import make_splits
 from src.core.ml.val_test_combs import make_val_test_splits
 from src.core.ml.benchmark import bench
+from src.core.ml.resources import configure_threads
+from src.core.ml.checkpoint import RowJournal
+from src.core.ml.dedup import dedup_stats
+from src.core.shared.results_store import record_run
 
 from src.ml_pipelines.cnn_pipeline import Candidate, CNNConfig, search
 
@@ -54,6 +58,36 @@ def parse_args():
         action="store_true",
         help="Print timing for critical sections (load_examples, search).",
     )
+    p.add_argument(
+        "--no_resume",
+        action="store_true",
+        help="Ignore an existing <out_csv>.journal.jsonl and recompute all outer splits.",
+    )
+    p.add_argument(
+        "--cpu_budget",
+        type=int,
+        default=None,
+        help="Cores to use in total (default: all available). Split evenly between worker processes "
+             "and their BLAS/OpenMP/torch thread pools.",
+    )
+    p.add_argument(
+        "--results_db",
+        type=str,
+        default=None,
+        help="Also store the finished run in this results database (see src.runners.results_db).",
+    )
+    p.add_argument(
+        "--dedup_train",
+        action="store_true",
+        help="Train on distinct (text, label) pairs with the loss weighted by their count. "
+             "Prediction always runs once per distinct text.",
+    )
+    p.add_argument(
+        "--group_candidates",
+        action="store_true",
+        help="Train candidates that share encoding, batch size and seed in lockstep on shared batches. "
+             "Results are identical to training them one by one.",
+    )
     return p.parse_args()
 
 
@@ -135,7 +169,7 @@ def make_load_configs(dataset: str) -> List[NamedLoad]:
 # -------------------------
 # CNN hyperparameter grid
 # -------------------------
-def make_candidates() -> List[Candidate]:
+def make_candidates(dedup_train: bool = False) -> List[Candidate]:
     """Create the compact CNN search grid used by the inner loop.
 
     The space is deliberately conservative so nested evaluation remains
@@ -164,6 +198,7 @@ def make_candidates() -> List[Candidate]:
                             max_len_cap=512,
                             len_percentile=95.0,
                             seed=42,
+                            dedup_train=dedup_train,
                         )
                     )
                 )
@@ -202,6 +237,7 @@ def main():
     args = parse_args()
     metric = args.metric
     out_csv = _resolve_out_csv(args.out_csv)
+    configure_threads(1, cpu_budget=args.cpu_budget)
 
     all_outer_splits = make_val_test_splits(args.dataset)
     outer_splits = all_outer_splits
@@ -209,7 +245,7 @@ def main():
         outer_splits = outer_splits[: args.limit_outer]
 
     load_grid = make_load_configs(args.dataset)
-    cand_grid = make_candidates()
+    cand_grid = make_candidates(args.dedup_train)
 
     print(f"Dataset     : {args.dataset}")
     print(f"Outer splits: {len(outer_splits)} (of {len(all_outer_splits)})")
@@ -218,9 +254,28 @@ def main():
     print(f"Metric      : {metric}")
     print(f"Writing CSV : {out_csv}")
 
-    rows: List[Dict[str, object]] = []
+    # Completed outer splits are journaled next to the CSV; a rerun with the
+    # same configuration only computes the missing ones.
+    journal = RowJournal(
+        out_csv,
+        {
+            "runner": "cnn_360_nested",
+            "dataset": args.dataset,
+            "metric": metric,
+            "outer_splits": all_outer_splits,
+            "load_grid": load_grid,
+            "candidates": cand_grid,
+        },
+        resume=not args.no_resume,
+    )
+    done = journal.completed()
+    if done:
+        print(f"Resuming    : {len(done)} outer splits already in {journal.path}")
 
     for outer_i, (val_groups, test_groups) in enumerate(outer_splits, 1):
+        if outer_i in done:
+            continue
+
         print("\n" + "=" * 100)
         print(f"[OUTER {outer_i:03d}/{len(outer_splits)}] val={val_groups} test={test_groups}")
         print("=" * 100)
@@ -246,6 +301,7 @@ def main():
             if not examples:
                 print("  ⚠ No examples produced. Skipping.")
                 continue
+            print(f"  {dedup_stats([e.text for e in examples])}")
 
             y = np.array([e.label for e in examples], dtype=object)
             groups = np.array([e.group for e in examples], dtype=object)
@@ -282,6 +338,7 @@ def main():
                     cand_grid,
                     metric=metric,
                     evaluate_test_for_all=False,
+                    group_candidates=args.group_candidates,
                     verbose=False,
                 )
 
@@ -296,6 +353,7 @@ def main():
 
         if best_overall is None:
             print("⚠ No valid result for this outer split.")
+            journal.append(outer_i, None)
             continue
 
         val_metric, named, best_cand, best_val_res, best_test_res, (n_train, n_val, n_test) = best_overall
@@ -349,11 +407,12 @@ def main():
         print(f"    CNN cfg   : {best_cand.cfg}")
         print(f"    VAL  {metric}={row['selection_val_score']:.4f} | TEST {metric}={row['selection_test_score']:.4f}")
 
-        rows.append(row)
+        journal.append(outer_i, row)
 
     # -------------------------
     # Write results
     # -------------------------
+    rows = journal.rows()
     if not rows:
         print("\nNo rows collected; nothing to write.")
         return
@@ -364,6 +423,17 @@ def main():
         w.writeheader()
         w.writerows(rows)
 
+    if args.results_db:
+        record_run(
+            args.results_db,
+            rows,
+            kind="ml",
+            tool="cnn",
+            dataset=args.dataset,
+            log_type="audit",
+            source=out_csv,
+        )
+
     # -------------------------
     # Aggregate summary
     # -------------------------
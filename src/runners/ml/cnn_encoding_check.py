@@ -0,0 +1,91 @@
+"""Check the vectorized CNN character encoder against the reference encoder.
+
+For every CNN load configuration, builds the vocabulary and ``max_len`` from
+half of the texts (as ``run_one`` does for a training split), encodes all
+texts with ``_encode_pad_many`` and with the list-based reference
+``_encode_pad_many_py``, and asserts that both matrices are identical. A set of
+edge cases (empty strings, characters outside the vocabulary and the BMP, lone
+surrogates, texts longer than ``max_len``) is checked as well. Timings of both
+encoders are printed.
+
+    python -m src.runners.ml.cnn_encoding_check --dataset WordPress
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from src.core.shared.loader import load_examples
+from src.ml_pipelines.cnn_pipeline import (
+    CNNConfig,
+    _build_char_vocab,
+    _choose_max_len,
+    _encode_pad_many,
+    _encode_pad_many_py,
+)
+from src.runners.ml.cnn_360_nested import make_load_configs
+
+_EDGE_CASES = [
+    "",
+    "a",
+    "plain ascii line",
+    "ümlaut and ß",
+    "emoji \U0001F600 outside the BMP",
+    "lone surrogate \udcff from surrogateescape",
+    "tab\tand\nnewline",
+    "x" * 2000,
+]
+
+
+def parse_args():
+    """Parse the dataset selection."""
+    p = argparse.ArgumentParser()
+    p.add_argument("--dataset", type=str, default="Nextcloud", choices=["Nextcloud", "WordPress", "Data", "Data_WP"])
+    return p.parse_args()
+
+
+def _check(name: str, texts: List[str], cfg: CNNConfig) -> None:
+    train = texts[::2]
+    char2idx = _build_char_vocab(train)
+    max_len = _choose_max_len(train, percentile=cfg.len_percentile, cap=cfg.max_len_cap)
+
+    t0 = time.perf_counter()
+    ref = _encode_pad_many_py(texts, char2idx, max_len)
+    t_ref = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    vec = _encode_pad_many(texts, char2idx, max_len)
+    t_vec = time.perf_counter() - t0
+
+    if ref.shape != vec.shape or not np.array_equal(ref, vec):
+        bad = np.argwhere(ref != vec)[:5].tolist() if ref.shape == vec.shape else "shape"
+        raise AssertionError(f"{name}: vectorized encoding differs from reference at {bad}")
+    print(
+        f"{name:28s}: OK  n={len(texts)} max_len={max_len} vocab={len(char2idx)} | "
+        f"reference={t_ref:.3f}s vectorized={t_vec:.3f}s ({t_ref / max(t_vec, 1e-9):.1f}x)"
+    )
+
+
+def main():
+    """Run the exact-match check on edge cases and every CNN load configuration."""
+    args = parse_args()
+    cfg = CNNConfig()
+
+    _check("edge cases", _EDGE_CASES + _EDGE_CASES[::-1], cfg)
+    _check("edge cases (max_len=8)", _EDGE_CASES, CNNConfig(max_len_cap=8))
+
+    for named in make_load_configs(args.dataset):
+        try:
+            examples = load_examples(named.cfg)
+        except Exception as e:
+            print(f"{named.name:28s}: load failed ({e})")
+            continue
+        _check(named.name, [ex.text for ex in examples], cfg)
+
+
+if __name__ == "__main__":
+    main()
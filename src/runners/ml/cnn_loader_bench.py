@@ -0,0 +1,101 @@
+"""Benchmark the CNN batch loaders and check that they train identically.
+
+Encodes the first load configuration of the dataset like ``run_one`` does
+(random 60/20/20 split), then
+
+1. iterates one shuffled training epoch with ``torch.utils.data.DataLoader``
+   and with the blocks loader (with and without prefetching) and reports
+   samples per second of the input pipeline alone, and
+2. trains the same configuration once per loader and reports training samples
+   per second; validation and test confusion matrices must be identical.
+
+    python -m src.runners.ml.cnn_loader_bench --dataset WordPress --epochs 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import replace
+
+import numpy as np
+import torch
+
+from src.core.ml.resources import configure_threads
+from src.core.ml.splits import Split
+from src.core.shared.loader import load_examples
+from src.ml_pipelines.cnn_pipeline import CNNConfig, _make_loader, _prepare, run_one
+from src.runners.ml.cnn_360_nested import make_load_configs
+
+
+def parse_args():
+    """Parse the dataset selection and benchmark size."""
+    p = argparse.ArgumentParser()
+    p.add_argument("--dataset", type=str, default="Nextcloud", choices=["Nextcloud", "WordPress", "Data", "Data_WP"])
+    p.add_argument("--epochs", type=int, default=2, help="Training epochs per loader (early stopping off).")
+    p.add_argument("--batch_size", type=int, default=32)
+    p.add_argument("--repeats", type=int, default=3, help="Timed input-pipeline epochs per loader (best is reported).")
+    p.add_argument("--cpu_budget", type=int, default=None)
+    return p.parse_args()
+
+
+_LOADERS = [
+    ("dataloader", {"batch_loader": "dataloader"}),
+    ("blocks", {"batch_loader": "blocks", "prefetch_batches": 0}),
+    ("blocks+prefetch", {"batch_loader": "blocks", "prefetch_batches": 2}),
+]
+
+
+def main():
+    """Time the input pipeline and full training per loader; compare results."""
+    args = parse_args()
+    configure_threads(1, cpu_budget=args.cpu_budget)
+
+    examples = load_examples(make_load_configs(args.dataset)[0].cfg)
+    perm = np.random.default_rng(0).permutation(len(examples))
+    a, b = int(0.6 * len(perm)), int(0.8 * len(perm))
+    split = Split(train_idx=perm[:a], val_idx=perm[a:b], test_idx=perm[b:])
+
+    base = CNNConfig(
+        device="cpu", batch_size=args.batch_size, epochs=args.epochs, early_stopping=False
+    )
+    data = _prepare(examples, split, base, verbose=False)
+    n_train = len(data.train_ds)
+    print(f"rows={len(examples)} train batches of {base.batch_size}: {n_train} rows | threads={torch.get_num_threads()}")
+
+    # ---- Input pipeline only ----
+    for name, kw in _LOADERS:
+        cfg = replace(base, **kw)
+        loader = _make_loader(data.train_ds, cfg, shuffle=True, generator=torch.Generator().manual_seed(cfg.seed))
+        walls = []
+        for _ in range(max(1, args.repeats)):
+            t0 = time.perf_counter()
+            for xb, yb, wb in loader:
+                # Touch the batch as the training loop would.
+                xb.sum()
+            walls.append(time.perf_counter() - t0)
+        print(f"{name:16s} input : {n_train / min(walls):10.0f} samples/s")
+
+    # ---- Training (identical results required) ----
+    # One untimed epoch absorbs one-time costs (allocator, kernel selection).
+    run_one(examples, split, replace(base, epochs=1), verbose=False)
+    reference = None
+    for name, kw in _LOADERS:
+        cfg = replace(base, **kw)
+        t0 = time.perf_counter()
+        out = run_one(examples, split, cfg, verbose=False)
+        wall = time.perf_counter() - t0
+        res = (out["val"].confusion, out["test"].confusion)
+        if reference is None:
+            reference = res
+        same = all(np.array_equal(x, y) for x, y in zip(res, reference))
+        print(
+            f"{name:16s} train : {cfg.epochs * n_train / wall:10.0f} samples/s  "
+            f"val f1_macro={out['val'].f1_macro:.4f}  identical={same}"
+        )
+        if not same:
+            raise AssertionError(f"{name}: results differ from the DataLoader path")
+
+
+if __name__ == "__main__":
+    main()
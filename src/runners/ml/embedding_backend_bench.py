@@ -0,0 +1,111 @@
+"""Benchmark the local embedding backends of the RAG pipeline on CPU.
+
+Bundles the first load configuration of the dataset like ``run_one`` does,
+embeds the bundles once with the plain fp32 ``SentenceTransformer.encode`` as
+the reference, then with every backend (with and without length-sorted
+batching) and reports
+
+1. bundles per second and the speedup over the reference, and
+2. the cosine similarity of each bundle's vector to its reference vector
+   (mean and minimum) and how often the nearest reference neighbour of a
+   bundle is unchanged.
+
+    python -m src.runners.ml.embedding_backend_bench --dataset WordPress --n_bundles 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from src.core.ml.resources import configure_threads
+from src.core.shared.loader import load_examples
+from src.ml_pipelines.llm_pipeline import (
+    EMBEDDING_BACKENDS,
+    _build_local_embedder,
+    _bundle_texts,
+    _encode_local,
+)
+from src.runners.ml.llm_360_nested import make_load_configs
+
+
+def parse_args():
+    """Parse the dataset selection, model and benchmark size."""
+    p = argparse.ArgumentParser()
+    p.add_argument("--dataset", type=str, default="Nextcloud", choices=["Nextcloud", "WordPress", "Data", "Data_WP"])
+    p.add_argument("--model", type=str, default="BAAI/bge-base-en-v1.5")
+    p.add_argument("--bundle_size", type=int, default=10)
+    p.add_argument("--n_bundles", type=int, default=1000, help="Bundles to embed per backend.")
+    p.add_argument("--batch_size", type=int, default=32)
+    p.add_argument("--backends", nargs="+", default=list(EMBEDDING_BACKENDS), choices=list(EMBEDDING_BACKENDS))
+    p.add_argument("--cpu_budget", type=int, default=None)
+    return p.parse_args()
+
+
+def _nn_agreement(emb: np.ndarray, ref: np.ndarray) -> float:
+    """Fraction of rows whose nearest other row is the same under ``emb`` and ``ref``."""
+    def nearest(x: np.ndarray) -> np.ndarray:
+        sims = x @ x.T
+        np.fill_diagonal(sims, -np.inf)
+        return sims.argmax(axis=1)
+
+    return float(np.mean(nearest(emb) == nearest(ref)))
+
+
+def main():
+    """Embed the same bundles with every backend; compare speed and agreement."""
+    args = parse_args()
+    configure_threads(1, cpu_budget=args.cpu_budget)
+
+    examples = load_examples(make_load_configs(args.dataset)[0].cfg)
+    bundles = _bundle_texts(
+        [ex.text for ex in examples],
+        bundle_size=args.bundle_size,
+        stride=max(1, args.bundle_size // 2),
+        strategy="fixed",
+        drop_last=True,
+    )
+    # Spread the sample over the whole dataset rather than its first actors.
+    pick = np.linspace(0, len(bundles) - 1, num=min(args.n_bundles, len(bundles))).astype(int)
+    bundles = [bundles[i] for i in np.unique(pick)]
+    print(f"model={args.model} bundles={len(bundles)} mean_chars={np.mean([len(b) for b in bundles]):.0f}")
+
+    # ---- Reference: fp32 SentenceTransformer.encode ----
+    reference = _build_local_embedder(args.model, "cpu", "torch")
+    reference.encode(bundles[:args.batch_size], batch_size=args.batch_size)
+    t0 = time.perf_counter()
+    ref = reference.encode(
+        bundles, batch_size=args.batch_size, convert_to_numpy=True, normalize_embeddings=True
+    ).astype(np.float32)
+    ref_rate = len(bundles) / (time.perf_counter() - t0)
+    print(f"{'reference encode':24s}: {ref_rate:8.1f} bundles/s")
+
+    # ---- Backends ----
+    for backend in args.backends:
+        embedder = _build_local_embedder(args.model, "cpu", backend)
+        # One untimed batch absorbs one-time costs (session setup, allocator).
+        _encode_local(embedder, bundles[:args.batch_size], batch_size=args.batch_size, normalize=True, desc="", verbose=False)
+        for sort_by_length in (False, True):
+            t0 = time.perf_counter()
+            emb = _encode_local(
+                embedder,
+                bundles,
+                batch_size=args.batch_size,
+                normalize=True,
+                desc="",
+                verbose=False,
+                sort_by_length=sort_by_length,
+            )
+            rate = len(bundles) / (time.perf_counter() - t0)
+            cos = np.sum(emb * ref, axis=1)
+            name = f"{backend}{' +sorted' if sort_by_length else ''}"
+            print(
+                f"{name:24s}: {rate:8.1f} bundles/s  x{rate / ref_rate:5.2f}  "
+                f"cos mean={cos.mean():.5f} min={cos.min():.5f}  nn_agree={_nn_agreement(emb, ref):.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
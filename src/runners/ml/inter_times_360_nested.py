@@ -10,19 +10,25 @@ from __future__ import annotations
 import argparse
 import csv
 import json
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from dataclasses import dataclass
+from concurrent.futures import as_completed
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 
-from src.core.shared.loader import load_examples, LoadConfig
+from src.core.shared.loader import LoadConfig
 from src.core.ml.splits import make_splits
 from src.core.ml.val_test_combs import make_val_test_splits
 from src.core.ml.benchmark import bench
+from src.core.ml.resources import configure_threads
+from src.core.ml.checkpoint import RowJournal
+from src.core.shared.results_store import record_run
+from src.core.ml.corpus_cache import cached_examples, make_process_pool, preload
+from src.core.ml.pruning import LoadConfigRacer, pruning_log_path
+from src.core.ml.work_queue import WorkQueue
 
-from src.ml_pipelines.inter_times_pipeline import Candidate, search
+from src.ml_pipelines.inter_times_pipeline import FEATURE_SETS, Candidate, search
 
 def resolve_log_files(dataset: str, log_type: str) -> Tuple[str, ...]:
     """Map a dataset/log-type pair to the concrete log file(s) to load.
@@ -107,11 +113,66 @@ def parse_args():
         help="Number of outer splits to run in parallel. Use 1 to keep serial behavior.",
     )
     p.add_argument("--clip_max", type=float, default=3600.0, help="Clip inter-event diffs at this many seconds.")
+    p.add_argument(
+        "--feature_sets",
+        type=str,
+        nargs="+",
+        default=["raw"],
+        choices=list(FEATURE_SETS),
+        help="Window representations in the candidate grid: raw (padded positional gaps) and/or "
+             "summary (fixed-size gap statistics). Several are tuned like hyperparameters.",
+    )
     p.add_argument(
         "--benchmark",
         action="store_true",
         help="Print timing for critical sections (load_examples, search).",
     )
+    p.add_argument(
+        "--no_resume",
+        action="store_true",
+        help="Ignore an existing <out_csv>.journal.jsonl and recompute all outer splits.",
+    )
+    p.add_argument(
+        "--queue",
+        type=str,
+        default=None,
+        help="Enqueue the pending outer splits into this SQLite work queue instead of running them. "
+             "Run them with `python -m src.runners.worker --queue PATH`.",
+    )
+    p.add_argument(
+        "--prune_load_configs",
+        action="store_true",
+        help="Race load configs across outer splits (F-race on validation scores): each round runs a "
+             "Friedman test over the remaining configs and, if it rejects, stops evaluating configs that "
+             "Conover's post-hoc test (Holm-corrected) ranks below the best. Decisions are logged to "
+             "<out_csv>.pruning.jsonl.",
+    )
+    p.add_argument(
+        "--prune_warmup",
+        type=int,
+        default=5,
+        help="Outer splits evaluated with the full load grid before any config can be pruned.",
+    )
+    p.add_argument(
+        "--prune_alpha",
+        type=float,
+        default=0.05,
+        help="Bound on the chance of any wrong drop over the whole race; each round is tested at "
+             "alpha / (outer splits - warmup + 1).",
+    )
+    p.add_argument(
+        "--cpu_budget",
+        type=int,
+        default=None,
+        help="Cores to use in total (default: all available). Split evenly between worker processes "
+             "and their BLAS/OpenMP/torch thread pools.",
+    )
+    p.add_argument(
+        "--results_db",
+        type=str,
+        default=None,
+        help="Also store the finished run in this results database (see src.runners.results_db).",
+    )
     return p.parse_args()
 
 
@@ -194,12 +255,19 @@ def make_load_configs(*, clip_max: float, dataset: str, log_type: str) -> List[N
 
 
 # ---- Model candidate grid ----
-def make_model_candidates(model: str) -> List[Candidate]:
+def make_model_candidates(model: str, feature_sets: Sequence[str] = ("raw",)) -> List[Candidate]:
     """Return the hyperparameter grid for one fixed model family.
 
     Model identity is treated as part of the experimental design rather than a
-    tuned choice, so the search only spans parameters within the selected family.
+    tuned choice, so the search only spans parameters within the selected family
+    and, when several are given, the window feature sets.
     """
+    family = _family_candidates(model)
+    return [replace(cand, feature_set=fs) for fs in feature_sets for cand in family]
+
+
+def _family_candidates(model: str) -> List[Candidate]:
+    """Return the hyperparameters of one model family (raw feature set)."""
     candidates: List[Candidate] = []
 
     if model == "dummy_most_frequent":
@@ -297,21 +365,29 @@ def _run_one_outer_split(
     dataset: str,
     log_type: str,
     benchmark: bool,
+    feature_sets: Sequence[str] = ("raw",),
+    active_loads: Optional[Sequence[str]] = None,
+    record_load_scores: bool = False,
 ) -> Optional[Dict[str, object]]:
     """Evaluate one outer validation/test split under nested model selection.
 
     For the given group split, the function searches over preprocessing and
     model hyperparameters using validation data only, then records metrics for
     the selected configuration on both validation and held-out test data.
+    ``active_loads`` restricts the grid to the configs still in a pruning race;
+    ``record_load_scores`` adds every config's validation score to the row.
     """
     print("\n" + "=" * 100)
     print(f"[OUTER {outer_i:03d}/{total_outer}] val={val_groups} test={test_groups}")
     print("=" * 100)
 
     load_grid = make_load_configs(clip_max=clip_max, dataset=dataset, log_type=log_type)
-    cand_grid = make_model_candidates(model)
+    if active_loads is not None:
+        load_grid = [named for named in load_grid if named.name in active_loads]
+    cand_grid = make_model_candidates(model, feature_sets)
 
     best_overall = None
+    load_val_scores: Dict[str, float] = {}
 
     for li, named in enumerate(load_grid, 1):
         print(f"\n  --- LoadConfig [{li:02d}/{len(load_grid)}] {named.name} ---")
@@ -323,7 +399,7 @@ def _run_one_outer_split(
                 f"load_examples({named.name})",
                 meta_fn=lambda: {"n": len(examples)},
             ):
-                examples = load_examples(named.cfg)
+                examples = cached_examples(named.cfg)
         except Exception as e:
             print(f"  ⚠ load failed for {named.name}: {e}")
             continue
@@ -370,12 +446,14 @@ def _run_one_outer_split(
                 metric=metric,
                 evaluate_test_for_all=False,
                 verbose=False,
+                inter_time_unit=named.cfg.inter_time_unit,
             )
 
         val_metric = _safe_float(getattr(best_val_res, metric, np.nan))
         test_metric = _safe_float(getattr(best_test_res, metric, np.nan))
 
         print(f"  best VAL {metric}={val_metric:.4f} | TEST {metric}={test_metric:.4f} | {best_cand}")
+        load_val_scores[named.name] = val_metric
 
         # The outer winner is the configuration with the strongest validation
         # score; test performance is recorded but never used for selection.
@@ -401,6 +479,7 @@ def _run_one_outer_split(
         "selected_model": best_cand.model_name,
         "selected_model_params": repr(best_cand.model_params),
         "selected_use_scaler": int(bool(best_cand.use_scaler)),
+        "selected_feature_set": best_cand.feature_set,
         "val_accuracy": _safe_float(getattr(best_val_res, "accuracy", np.nan)),
         "val_balanced_accuracy": _safe_float(getattr(best_val_res, "balanced_accuracy", np.nan)),
         "val_f1_macro": _safe_float(getattr(best_val_res, "f1_macro", np.nan)),
@@ -427,6 +506,8 @@ def _run_one_outer_split(
         "test_cohen_kappa": _safe_float(getattr(best_test_res, "cohen_kappa", np.nan)),
         "test_per_class_metrics": json.dumps(getattr(best_test_res, "per_class_metrics", {}), sort_keys=True),
     }
+    if record_load_scores:
+        row["load_val_scores"] = json.dumps(load_val_scores, sort_keys=True)
 
     print("\n>>> SELECTED (by VAL only)")
     print(f"    LoadConfig: {named.name}")
@@ -437,6 +518,17 @@ def _run_one_outer_split(
     return row
 
 
+def run_queue_task(payload: Dict[str, object]) -> Optional[Dict[str, object]]:
+    """Run one queued outer split; entry point used by ``src.runners.worker``."""
+    return _run_one_outer_split(
+        int(payload["outer_i"]),
+        int(payload["total_outer"]),
+        tuple(payload["val_groups"]),
+        tuple(payload["test_groups"]),
+        **payload["kwargs"],
+    )
+
+
 # ---- Main entry point ----
 def main():
     """Run the full nested evaluation over all requested outer splits.
@@ -445,6 +537,9 @@ def main():
     per completed split, and prints a compact summary across test metrics.
     """
     args = parse_args()
+    if args.prune_load_configs and args.queue:
+        raise ValueError("--prune_load_configs needs a local run and cannot be combined with --queue")
+
     model = args.model
     metric = args.metric
     out_csv = _resolve_out_csv(args.out_csv)
@@ -460,7 +555,25 @@ def main():
         dataset=args.dataset,
         log_type=args.log_type,
     )
-    cand_grid = make_model_candidates(model)
+    cand_grid = make_model_candidates(model, args.feature_sets)
+
+    # Completed outer splits are journaled next to the CSV; a rerun with the
+    # same configuration only computes the missing ones.
+    journal_config = {
+        "runner": "inter_times_360_nested",
+        "dataset": args.dataset,
+        "log_type": args.log_type,
+        "model": model,
+        "metric": metric,
+        "clip_max": float(args.clip_max),
+        "outer_splits": all_outer_splits,
+        "load_grid": load_grid,
+        "candidates": cand_grid,
+    }
+    if args.prune_load_configs:
+        journal_config["pruning"] = {"warmup": args.prune_warmup, "alpha": args.prune_alpha}
+    journal = RowJournal(out_csv, journal_config, resume=not args.no_resume)
+    done = journal.completed()
 
     print(f"Dataset     : {args.dataset}")
     print(f"Log type    : {args.log_type}")
@@ -468,68 +581,163 @@ def main():
     print(f"Metric      : {metric}")
     print(f"Outer splits: {len(outer_splits)} (of {len(all_outer_splits)})")
     print(f"LoadConfigs : {len(load_grid)}")
-    print(f"Candidates  : {len(cand_grid)}")
+    print(f"Candidates  : {len(cand_grid)} (feature sets: {', '.join(args.feature_sets)})")
     print(f"Parallel jobs: {n_jobs}")
     print(f"Writing CSV : {out_csv}")
+    if done:
+        print(f"Resuming    : {len(done)} outer splits already in {journal.path}")
 
-    rows: List[Dict[str, object]] = []
     worker_args = [
         (outer_i, len(outer_splits), val_groups, test_groups)
         for outer_i, (val_groups, test_groups) in enumerate(outer_splits, 1)
+        if outer_i not in done
     ]
 
-    if n_jobs == 1:
-        for outer_i, total_outer, val_groups, test_groups in worker_args:
-            row = _run_one_outer_split(
-                outer_i,
-                total_outer,
-                val_groups,
-                test_groups,
-                model=model,
-                metric=metric,
-                clip_max=float(args.clip_max),
-                dataset=args.dataset,
-                log_type=args.log_type,
-                benchmark=args.benchmark,
-            )
-            if row is not None:
-                rows.append(row)
+    if args.queue:
+        queue = WorkQueue(args.queue)
+        added = queue.enqueue(
+            {
+                "runner": "inter_times_360_nested",
+                "dataset": args.dataset,
+                "log_type": args.log_type,
+                "model": model,
+                "outer_i": outer_i,
+                "out_csv": out_csv,
+                "payload": {
+                    "outer_i": outer_i,
+                    "total_outer": total_outer,
+                    "val_groups": val_groups,
+                    "test_groups": test_groups,
+                    "kwargs": {
+                        "model": model,
+                        "metric": metric,
+                        "clip_max": float(args.clip_max),
+                        "dataset": args.dataset,
+                        "log_type": args.log_type,
+                        "benchmark": args.benchmark,
+                        "feature_sets": list(args.feature_sets),
+                    },
+                },
+                "journal_config": journal_config,
+            }
+            for outer_i, total_outer, val_groups, test_groups in worker_args
+        )
+        queue.close()
+        print(f"Enqueued {added} new tasks ({len(worker_args) - added} already queued) -> {args.queue}")
+        return
+
+    # ---- Optional load-config racing ----
+    racer: Optional[LoadConfigRacer] = None
+    if args.prune_load_configs:
+        log_path = pruning_log_path(out_csv)
+        if args.no_resume and Path(log_path).exists():
+            Path(log_path).unlink()
+        racer = LoadConfigRacer(
+            [named.name for named in load_grid],
+            warmup=args.prune_warmup,
+            alpha=args.prune_alpha,
+            n_splits=len(outer_splits),
+            log_path=log_path,
+        )
+        done_rows = journal.rows()
+        for row in done_rows:
+            racer.observe(int(row["outer_i"]), json.loads(row["load_val_scores"]))
+        if done_rows:
+            racer.log(event="resume", outer_splits=[int(r["outer_i"]) for r in done_rows])
+            racer.update()
+
+    def _task_kwargs() -> Dict[str, object]:
+        kwargs: Dict[str, object] = dict(
+            model=model,
+            metric=metric,
+            clip_max=float(args.clip_max),
+            dataset=args.dataset,
+            log_type=args.log_type,
+            benchmark=args.benchmark,
+            feature_sets=list(args.feature_sets),
+        )
+        if racer is not None:
+            kwargs.update(active_loads=racer.active(), record_load_scores=True)
+        return kwargs
+
+    def _collect(outer_i: int, row: Optional[Dict[str, object]]) -> None:
+        journal.append(outer_i, row)
+        if racer is not None and row is not None:
+            racer.observe(outer_i, json.loads(str(row["load_val_scores"])))
+
+    # Racing decisions are taken between rounds of n_jobs splits, so they do
+    # not depend on the order in which workers finish.
+    if racer is not None:
+        rounds = [worker_args[i : i + n_jobs] for i in range(0, len(worker_args), n_jobs)]
     else:
-        with ProcessPoolExecutor(max_workers=n_jobs) as ex:
-            futures = [
-                ex.submit(
-                    _run_one_outer_split,
-                    outer_i,
-                    total_outer,
-                    val_groups,
-                    test_groups,
-                    model=model,
-                    metric=metric,
-                    clip_max=float(args.clip_max),
-                    dataset=args.dataset,
-                    log_type=args.log_type,
-                    benchmark=args.benchmark,
-                )
-                for outer_i, total_outer, val_groups, test_groups in worker_args
-            ]
-            for fut in as_completed(futures):
-                row = fut.result()
-                if row is not None:
-                    rows.append(row)
+        rounds = [worker_args]
+
+    # Split the core budget between pool workers and their library threads.
+    budget = configure_threads(n_jobs, cpu_budget=args.cpu_budget)
+
+    pool = None
+    if n_jobs > 1:
+        # Parse every load config once here; forked workers inherit the corpus.
+        n_cached = preload([named.cfg for named in load_grid], benchmark=args.benchmark)
+        print(f"Shared corpus: {n_cached} examples")
+        pool = make_process_pool(n_jobs, threads_per_worker=budget.threads_per_proc)
+
+    try:
+        for round_args in rounds:
+            if racer is not None:
+                racer.log_round([task[0] for task in round_args])
+
+            if pool is None:
+                for outer_i, total_outer, val_groups, test_groups in round_args:
+                    row = _run_one_outer_split(outer_i, total_outer, val_groups, test_groups, **_task_kwargs())
+                    _collect(outer_i, row)
+            else:
+                futures = {
+                    pool.submit(
+                        _run_one_outer_split,
+                        outer_i,
+                        total_outer,
+                        val_groups,
+                        test_groups,
+                        **_task_kwargs(),
+                    ): outer_i
+                    for outer_i, total_outer, val_groups, test_groups in round_args
+                }
+                for fut in as_completed(futures):
+                    _collect(futures[fut], fut.result())
+
+            if racer is not None:
+                dropped = racer.update()
+                if dropped:
+                    print(f"\n>>> PRUNED load configs {dropped}; remaining {racer.active()}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
 
     # ---- Write CSV ----
+    rows = journal.rows()
     if not rows:
         print("\nNo rows collected; nothing to write.")
         return
 
-    rows.sort(key=lambda r: int(r["outer_i"]))
-
     fieldnames = list(rows[0].keys())
     with open(out_csv, "w", newline="", encoding="utf-8") as f:
         w = csv.DictWriter(f, fieldnames=fieldnames)
         w.writeheader()
         w.writerows(rows)
 
+    if args.results_db:
+        record_run(
+            args.results_db,
+            rows,
+            kind="ml",
+            tool="inter_times",
+            dataset=args.dataset,
+            log_type=args.log_type,
+            model=model,
+            source=out_csv,
+        )
+
     # ---- Quick summary ----
     test_f1s = np.array([r["test_f1_macro"] for r in rows], dtype=float)
     test_bals = np.array([r["test_balanced_accuracy"] for r in rows], dtype=float)
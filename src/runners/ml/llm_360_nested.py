@@ -10,9 +10,9 @@ from __future__ import annotations
 import argparse
 import csv
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 
@@ -20,8 +20,13 @@ from src.core.shared.loader import load_examples, LoadConfig
 from src.core.ml.splits import make_splits
 from src.core.ml.val_test_combs import make_val_test_splits
 from src.core.ml.benchmark import bench
+from src.core.ml.resources import configure_threads
+from src.core.ml.text_embedding_store import configure_embedding_store, embedding_store_summary
+from src.core.ml.llm_response_cache import LLM_CACHE_MODES, configure_llm_cache, llm_cache_summary
+from src.core.ml.checkpoint import RowJournal
+from src.core.shared.results_store import record_run
 
-from src.ml_pipelines.llm_pipeline import Candidate, RAGLLMConfig, search
+from src.ml_pipelines.llm_pipeline import EMBEDDING_BACKENDS, Candidate, RAGLLMConfig, search
 
 
 # -------------------------
@@ -55,6 +60,78 @@ def parse_args():
         action="store_true",
         help="Print timing for critical sections (load_examples, search).",
     )
+    p.add_argument(
+        "--no_resume",
+        action="store_true",
+        help="Ignore an existing <out_csv>.journal.jsonl and recompute all outer splits.",
+    )
+    p.add_argument(
+        "--cpu_budget",
+        type=int,
+        default=None,
+        help="Cores to use in total (default: all available). Split evenly between worker processes "
+             "and their BLAS/OpenMP/torch thread pools.",
+    )
+    p.add_argument(
+        "--results_db",
+        type=str,
+        default=None,
+        help="Also store the finished run in this results database (see src.runners.results_db).",
+    )
+    p.add_argument(
+        "--embedding_store_dir",
+        type=str,
+        default=None,
+        help="Directory of the persistent bundle-embedding store "
+             "(default: $DATAANALYSIS_EMBEDDING_STORE or .cache/text_embeddings).",
+    )
+    p.add_argument(
+        "--llm_base_url",
+        type=str,
+        default=None,
+        help="OpenAI-compatible endpoint for the fallback (default: SDK default / $OPENAI_BASE_URL).",
+    )
+    p.add_argument("--llm_concurrency", type=int, default=8, help="Max LLM fallback requests in flight.")
+    p.add_argument("--llm_rpm", type=float, default=500.0, help="Client-side limit on LLM requests per minute.")
+    p.add_argument("--llm_tpm", type=float, default=200_000.0, help="Client-side limit on LLM tokens per minute.")
+    p.add_argument(
+        "--embedding_backend",
+        type=str,
+        default="torch",
+        choices=list(EMBEDDING_BACKENDS),
+        help="Backend of the local embedding model. torch_int8, onnx and onnx_int8 run on CPU "
+             "(see src.runners.ml.embedding_backend_bench).",
+    )
+    p.add_argument(
+        "--embedding_device",
+        type=str,
+        default="cuda",
+        choices=["cuda", "cpu"],
+        help="Device of the torch embedding backend (the other backends always use the CPU).",
+    )
+    p.add_argument(
+        "--train_group_shards",
+        type=int,
+        default=1,
+        choices=[0, 1],
+        help="1=bundle and embed TRAIN lines once per actor group and reuse the shards across outer "
+             "splits (bundles never span two groups), 0=bundle each split's TRAIN lines per class.",
+    )
+    p.add_argument(
+        "--llm_cache_mode",
+        type=str,
+        default="off",
+        choices=list(LLM_CACHE_MODES),
+        help="On-disk LLM response cache. replay_only serves cached responses only and never "
+             "contacts the API (uncached bundles keep the embedding-only decision).",
+    )
+    p.add_argument(
+        "--llm_cache_db",
+        type=str,
+        default=None,
+        help="SQLite database of the LLM response cache "
+             "(default: $DATAANALYSIS_LLM_CACHE or .cache/llm_responses.sqlite).",
+    )
     return p.parse_args()
 
 
@@ -148,11 +225,23 @@ def make_load_configs(dataset: str) -> List[NamedLoad]:
 # 2) LLM/RAG candidate grid
 # -------------------------
 
-def make_candidates(*, use_llm_fallback: bool) -> List[Candidate]:
+def make_candidates(
+    *,
+    use_llm_fallback: bool,
+    llm_base_url: Optional[str] = None,
+    llm_concurrency: int = 8,
+    llm_requests_per_minute: float = 500.0,
+    llm_tokens_per_minute: float = 200_000.0,
+    llm_cache_mode: str = "off",
+    train_group_shards: bool = True,
+    embedding_backend: str = "torch",
+    embedding_device: str = "cuda",
+) -> List[Candidate]:
     """Construct the restricted candidate grid for retrieval and fallback.
 
     The search space is deliberately small because each candidate is evaluated
-    repeatedly across outer splits and LLM fallback can add API cost.
+    repeatedly across outer splits and LLM fallback can add API cost. The
+    ``llm_*`` settings only affect how fallback requests are dispatched.
     """
     candidates: List[Candidate] = []
 
@@ -182,12 +271,18 @@ def make_candidates(*, use_llm_fallback: bool) -> List[Candidate]:
 
                                 # Local embeddings drive the primary retrieval step.
                                 local_embedding_model="BAAI/bge-base-en-v1.5",
+                                local_embedding_backend=embedding_backend,
+                                local_embedding_device=embedding_device if embedding_backend == "torch" else "cpu",
                                 local_embedding_batch_size=32,
                                 local_normalize_embeddings=True,
 
                                 # Batch query embeddings to keep inference cost stable.
                                 predict_embedding_batch_size=64,
 
+                                # Outer splits only regroup actors, so TRAIN
+                                # bundles are built once per actor group.
+                                train_group_shards=train_group_shards,
+
                                 # The margin defines when retrieval is considered
                                 # too uncertain and LLM fallback is allowed.
                                 use_llm_fallback=use_llm_fallback,
@@ -200,6 +295,14 @@ def make_candidates(*, use_llm_fallback: bool) -> List[Candidate]:
                                 temperature=0.0,
                                 max_output_tokens=30,
 
+                                # Dispatch only: endpoint, parallelism and the
+                                # client-side rate limits.
+                                llm_base_url=llm_base_url,
+                                llm_concurrency=llm_concurrency,
+                                llm_requests_per_minute=llm_requests_per_minute,
+                                llm_tokens_per_minute=llm_tokens_per_minute,
+                                llm_cache_mode=llm_cache_mode,
+
                                 seed=42,
                             )
                         )
@@ -207,6 +310,22 @@ def make_candidates(*, use_llm_fallback: bool) -> List[Candidate]:
     return candidates
 
 
+# Fields that only control how fallback requests are sent (endpoint, pacing,
+# response cache); they never change a prediction.
+_DISPATCH_FIELDS = ("llm_base_url", "llm_concurrency", "llm_requests_per_minute", "llm_tokens_per_minute", "llm_cache_mode")
+
+
+def _journal_candidates(candidates: List[Candidate]) -> List[Candidate]:
+    """Return ``candidates`` with dispatch-only fields reset to their defaults.
+
+    The journal hashes this grid, so a run interrupted by rate limits can be
+    resumed with different limits, endpoint or cache mode.
+    """
+    defaults = RAGLLMConfig()
+    reset = {name: getattr(defaults, name) for name in _DISPATCH_FIELDS}
+    return [replace(c, cfg=replace(c.cfg, **reset)) for c in candidates]
+
+
 # -------------------------
 # 3) Main
 # -------------------------
@@ -219,6 +338,9 @@ def main():
     args = parse_args()
     metric = args.metric
     out_csv = _resolve_out_csv(args.out_csv)
+    configure_threads(1, cpu_budget=args.cpu_budget)
+    configure_embedding_store(args.embedding_store_dir)
+    configure_llm_cache(args.llm_cache_db)
     use_llm_fallback = bool(args.use_llm_fallback)
 
     all_outer_splits = make_val_test_splits(args.dataset)
@@ -227,7 +349,17 @@ def main():
         outer_splits = outer_splits[: args.limit_outer]
 
     load_grid = make_load_configs(args.dataset)
-    cand_grid = make_candidates(use_llm_fallback=use_llm_fallback)
+    cand_grid = make_candidates(
+        use_llm_fallback=use_llm_fallback,
+        llm_base_url=args.llm_base_url,
+        llm_concurrency=args.llm_concurrency,
+        llm_requests_per_minute=args.llm_rpm,
+        llm_tokens_per_minute=args.llm_tpm,
+        llm_cache_mode=args.llm_cache_mode,
+        train_group_shards=bool(args.train_group_shards),
+        embedding_backend=args.embedding_backend,
+        embedding_device=args.embedding_device,
+    )
 
     print(f"Dataset     : {args.dataset}")
     print(f"Outer splits: {len(outer_splits)} (of {len(all_outer_splits)})")
@@ -235,12 +367,33 @@ def main():
     print(f"Candidates  : {len(cand_grid)}")
     print(f"Metric      : {metric}")
     print(f"use_llm_fallback: {use_llm_fallback}")
+    print(f"llm_cache_mode  : {args.llm_cache_mode}")
     print(f"Writing CSV : {out_csv}")
 
-    rows: List[Dict[str, object]] = []
+    # Completed outer splits are journaled next to the CSV; a rerun with the
+    # same configuration only computes the missing ones.
+    journal = RowJournal(
+        out_csv,
+        {
+            "runner": "llm_360_nested",
+            "dataset": args.dataset,
+            "metric": metric,
+            "use_llm_fallback": use_llm_fallback,
+            "outer_splits": all_outer_splits,
+            "load_grid": load_grid,
+            "candidates": _journal_candidates(cand_grid),
+        },
+        resume=not args.no_resume,
+    )
+    done = journal.completed()
+    if done:
+        print(f"Resuming    : {len(done)} outer splits already in {journal.path}")
 
     # ---- Outer evaluation loop ----
     for outer_i, (val_groups, test_groups) in enumerate(outer_splits, 1):
+        if outer_i in done:
+            continue
+
         print("\n" + "=" * 100)
         print(f"[OUTER {outer_i:03d}/{len(outer_splits)}] val={val_groups} test={test_groups}")
         print("=" * 100)
@@ -314,6 +467,9 @@ def main():
             test_metric = _safe_float(getattr(best_test_res, metric, np.nan))
 
             print(f"  best VAL {metric}={val_metric:.4f} | TEST {metric}={test_metric:.4f} | {best_cand.cfg}")
+            print(f"  [LLM] embedding store: {embedding_store_summary()}")
+            if use_llm_fallback and args.llm_cache_mode != "off":
+                print(f"  [LLM] response cache: {llm_cache_summary()}")
 
             # Selection is based only on validation performance to keep the test
             # set untouched until after model/configuration choice.
@@ -322,6 +478,7 @@ def main():
 
         if best_overall is None:
             print("⚠ No valid result for this outer split.")
+            journal.append(outer_i, None)
             continue
 
         val_metric, named, best_cand, best_val_res, best_test_res, (n_train, n_val, n_test) = best_overall
@@ -378,11 +535,12 @@ def main():
         print(f"    RAG cfg   : {best_cand.cfg}")
         print(f"    VAL  {metric}={row['selection_val_score']:.4f} | TEST {metric}={row['selection_test_score']:.4f}")
 
-        rows.append(row)
+        journal.append(outer_i, row)
 
     # -------------------------
     # Write CSV
     # -------------------------
+    rows = journal.rows()
     if not rows:
         print("\nNo rows collected; nothing to write.")
         return
@@ -393,6 +551,17 @@ def main():
         w.writeheader()
         w.writerows(rows)
 
+    if args.results_db:
+        record_run(
+            args.results_db,
+            rows,
+            kind="ml",
+            tool="llm",
+            dataset=args.dataset,
+            log_type="audit",
+            source=out_csv,
+        )
+
     # -------------------------
     # Quick summary
     # -------------------------
@@ -0,0 +1,207 @@
+"""Benchmark the LLM fallback and the agent graph against a local OpenAI stub.
+
+Starts ``OpenAIStubServer`` (see ``src.core.ml.openai_stub``) on localhost and
+
+1. classifies synthetic RAG fallback prompts with ``_chat_classify_many`` once
+   per ``--concurrency`` value and reports jobs per second, the concurrency the
+   server saw, 429 responses and the retry overhead (requests per job), and
+2. runs episodes of the Nextcloud agent graph (``agent.runners.LLM_Agent``)
+   whose model calls go to the stub; the stub answers with progress messages
+   and then a ``terminate`` tool call, so no shell tool is ever executed.
+
+No network access or API key is needed. ``--serve PORT`` only runs the stub,
+e.g. for ``agent/runners/browser_agent.py`` with ``OPENAI_BASE_URL`` set to the
+printed URL.
+
+    python -m src.runners.ml.llm_stub_bench --jobs 200 --concurrency 1 8 32
+    python -m src.runners.ml.llm_stub_bench --rate_limit_prob 0.1 --skip_agent
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.core.ml.openai_stub import LATENCY_DISTS, OpenAIStubServer, StubConfig
+
+
+def parse_args():
+    """Parse the stub behaviour and the benchmark size."""
+    p = argparse.ArgumentParser()
+    # Stub server
+    p.add_argument("--latency", type=str, default="lognormal", choices=list(LATENCY_DISTS))
+    p.add_argument("--latency_mean_s", type=float, default=0.2)
+    p.add_argument("--latency_spread", type=float, default=0.5, help="Uniform half-width (fraction of the mean) or lognormal sigma.")
+    p.add_argument("--rate_limit_prob", type=float, default=0.0, help="Share of requests answered with 429.")
+    p.add_argument("--rate_limit_rpm", type=float, default=None, help="Server-side requests-per-minute limit (429 above it).")
+    p.add_argument("--retry_after_s", type=float, default=1.0)
+    p.add_argument("--script", type=str, default=None, help="JSON file with a list of scripted answers.")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--serve", type=int, default=None, metavar="PORT", help="Only run the stub on PORT until Ctrl+C.")
+    # LLM fallback
+    p.add_argument("--jobs", type=int, default=200, help="Fallback prompts per concurrency setting.")
+    p.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    p.add_argument("--llm_rpm", type=float, default=60_000.0, help="Client-side request limit per minute.")
+    p.add_argument("--llm_tpm", type=float, default=1e8, help="Client-side token limit per minute.")
+    p.add_argument("--max_retries", type=int, default=4)
+    p.add_argument("--retry_backoff_s", type=float, default=0.2)
+    # Agent graph
+    p.add_argument("--skip_agent", action="store_true")
+    p.add_argument("--agent_episodes", type=int, default=4)
+    p.add_argument("--agent_turns", type=int, default=5, help="Assistant turns before the stub calls terminate.")
+    p.add_argument("--agent_workers", type=int, default=1, help="Episodes run in parallel threads.")
+    return p.parse_args()
+
+
+def _fallback_jobs(n: int, seed: int):
+    """Build ``n`` fallback prompts shaped like the pipeline's, over synthetic log bundles."""
+    from src.ml_pipelines.llm_pipeline import _build_messages
+
+    rng = np.random.default_rng(seed)
+    verbs = ["GET", "POST", "PROPFIND", "PUT", "DELETE"]
+    paths = ["/index.php/apps/files/", "/remote.php/dav/files/admin/", "/ocs/v2.php/cloud/user", "/status.php"]
+
+    def bundle() -> str:
+        return "\n".join(
+            f"{rng.choice(verbs)} {rng.choice(paths)}{rng.integers(1000)} {rng.choice([200, 207, 404, 500])}"
+            for _ in range(10)
+        )
+
+    def retrieved():
+        return [(float(rng.uniform(0.5, 0.9)), bundle()) for _ in range(5)]
+
+    return [
+        _build_messages(
+            bundle(),
+            label_a="human",
+            label_b="ai",
+            retrieved_a=retrieved(),
+            retrieved_b=retrieved(),
+            max_chars_per_retrieved=1000,
+        )
+        for _ in range(n)
+    ]
+
+
+def bench_fallback(stub: OpenAIStubServer, args) -> None:
+    """Classify the same prompts at every concurrency level."""
+    from src.ml_pipelines.llm_pipeline import RAGLLMConfig, _chat_classify_many, _run_coroutine
+
+    jobs = _fallback_jobs(args.jobs, args.seed)
+    print(f"\n---- LLM fallback: {len(jobs)} prompts ----")
+    for c in args.concurrency:
+        cfg = RAGLLMConfig(
+            llm_base_url=stub.base_url,
+            llm_concurrency=c,
+            llm_requests_per_minute=args.llm_rpm,
+            llm_tokens_per_minute=args.llm_tpm,
+            max_retries=args.max_retries,
+            retry_backoff_s=args.retry_backoff_s,
+            llm_cache_mode="off",
+        )
+        stub.reset_stats()
+        t0 = time.perf_counter()
+        answers, sent, _ = _run_coroutine(
+            _chat_classify_many(jobs, cfg=cfg, valid_labels={"human", "ai"}, verbose=False)
+        )
+        wall = time.perf_counter() - t0
+        s = stub.stats()
+        answered = sum(a is not None for a in answers)
+        print(
+            f"concurrency={c:4d}  {answered / wall:8.1f} jobs/s  wall={wall:7.2f}s  answered={answered}/{len(jobs)}  "
+            f"server_inflight_max={s['max_inflight']:3d}  429={s['rate_limited']:4d}  "
+            f"requests/job={s['requests'] / max(1, sent):.2f}  "
+            f"server p50={s['latency_p50_s'] * 1e3:.0f}ms p95={s['latency_p95_s'] * 1e3:.0f}ms"
+        )
+
+
+def bench_agent(stub: OpenAIStubServer, args) -> None:
+    """Run agent-graph episodes whose model calls all go to the stub."""
+    # The agent module builds its chat models at import time from the environment.
+    os.environ["OPENAI_BASE_URL"] = stub.base_url
+    agent = importlib.import_module("agent.runners.LLM_Agent")
+    from langchain_core.messages import HumanMessage
+
+    agent.AgentConfig.DELAY_ACTIVE = False
+    stub.cfg.tool_turns = args.agent_turns
+
+    def episode(_: int) -> int:
+        result = agent.app.invoke(
+            {
+                "messages": [HumanMessage(content=agent.AgentConfig.problem_prompt)],
+                "history_summary": None,
+                "summarized_upto": 0,
+                "decision_steps": 0,
+            },
+            config={"recursion_limit": agent.AgentConfig.RECURSION_LIMIT},
+        )
+        return int(result.get("decision_steps", 0))
+
+    print(f"\n---- Agent graph: {args.agent_episodes} episodes, {args.agent_turns} turns each ----")
+    stub.reset_stats()
+    t0 = time.perf_counter()
+    # The graph prints every step; keep the benchmark output readable.
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=max(1, args.agent_workers)) as pool:
+            steps = list(pool.map(episode, range(args.agent_episodes)))
+    wall = time.perf_counter() - t0
+    s = stub.stats()
+    workers = min(max(1, args.agent_workers), args.agent_episodes)
+    # Wall time of one model call seen by the graph, minus the server's own latency.
+    overhead = wall * workers / max(1, s["requests"]) - s["latency_mean_s"]
+    print(
+        f"episodes/s={args.agent_episodes / wall:.2f}  wall={wall:.2f}s  decision_steps={np.mean(steps):.1f}/episode  "
+        f"model_calls={s['requests']}  429={s['rate_limited']}  server_inflight_max={s['max_inflight']}  "
+        f"server p50={s['latency_p50_s'] * 1e3:.0f}ms  client overhead≈{overhead * 1e3:.1f}ms/call"
+    )
+
+
+def main():
+    """Start the stub and run the selected benchmarks against it."""
+    args = parse_args()
+    script = []
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            script = json.load(f)
+    cfg = StubConfig(
+        latency=args.latency,
+        latency_mean_s=args.latency_mean_s,
+        latency_spread=args.latency_spread,
+        rate_limit_prob=args.rate_limit_prob,
+        rate_limit_rpm=args.rate_limit_rpm,
+        retry_after_s=args.retry_after_s,
+        script=script,
+        finish_tool="terminate",
+        tool_turns=args.agent_turns,
+        seed=args.seed,
+    )
+    # The SDK clients require a key even though the stub ignores it.
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+    if args.serve is not None:
+        with OpenAIStubServer(cfg, port=args.serve) as stub:
+            print(f"OpenAI stub listening on {stub.base_url} (Ctrl+C to stop)")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                pass
+        return
+
+    with OpenAIStubServer(cfg) as stub:
+        print(f"OpenAI stub: {stub.base_url}  latency={cfg.latency} mean={cfg.latency_mean_s}s")
+        bench_fallback(stub, args)
+        if not args.skip_agent:
+            bench_agent(stub, args)
+
+
+if __name__ == "__main__":
+    main()
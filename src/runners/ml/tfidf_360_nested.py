@@ -10,18 +10,29 @@ from __future__ import annotations
 
 import csv
 import json
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from dataclasses import dataclass
+from concurrent.futures import as_completed
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 import argparse
 
-from src.core.shared.loader import load_examples, LoadConfig, get_num_actor_label_assignments
+from src.core.shared.loader import (
+    relabel_examples,
+    LoadConfig,
+    get_num_actor_label_assignments,
+)
+from src.core.ml.data import Example
 from src.core.ml.splits import make_splits
-from src.core.ml.val_test_combs import make_val_test_splits
+from src.core.ml.val_test_combs import make_val_test_splits, parse_assignment_indices
 from src.core.ml.benchmark import bench
+from src.core.ml.resources import configure_threads
+from src.core.ml.checkpoint import RowJournal
+from src.core.shared.results_store import record_run
+from src.core.ml.corpus_cache import cached_examples, make_process_pool, preload
+from src.core.ml.pruning import LoadConfigRacer, pruning_log_path
+from src.core.ml.work_queue import WorkQueue
 
 from src.ml_pipelines.tfidf_pipeline import Candidate, VectorizerConfig, search
 
@@ -116,9 +127,62 @@ def parse_args():
 
     parser.add_argument(
         "--assignment_idx",
+        type=str,
+        default=None,
+        help="Index of the enumerated actor-label assignment to use when randomize_actor_labels is enabled. "
+             "Also accepts 'all', an inclusive range such as '0-68', or a comma-separated list; "
+             "several indices are run in one process and written to one CSV per assignment.",
+    )
+
+    parser.add_argument(
+        "--no_resume",
+        action="store_true",
+        help="Ignore an existing <out_csv>.journal.jsonl and recompute all outer splits.",
+    )
+
+    parser.add_argument(
+        "--queue",
+        type=str,
+        default=None,
+        help="Enqueue the pending outer splits into this SQLite work queue instead of running them. "
+             "Run them with `python -m src.runners.worker --queue PATH`.",
+    )
+
+    parser.add_argument(
+        "--prune_load_configs",
+        action="store_true",
+        help="Race load configs across outer splits (F-race on validation scores): each round runs a "
+             "Friedman test over the remaining configs and, if it rejects, stops evaluating configs that "
+             "Conover's post-hoc test (Holm-corrected) ranks below the best. Decisions are logged to "
+             "<out_csv>.pruning.jsonl.",
+    )
+    parser.add_argument(
+        "--prune_warmup",
+        type=int,
+        default=5,
+        help="Outer splits evaluated with the full load grid before any config can be pruned.",
+    )
+    parser.add_argument(
+        "--prune_alpha",
+        type=float,
+        default=0.05,
+        help="Bound on the chance of any wrong drop over the whole race; each round is tested at "
+             "alpha / (outer splits - warmup + 1).",
+    )
+
+    parser.add_argument(
+        "--cpu_budget",
         type=int,
         default=None,
-        help="Index of the enumerated actor-label assignment to use when randomize_actor_labels is enabled.",
+        help="Cores to use in total (default: all available). Split evenly between worker processes "
+             "and their BLAS/OpenMP/torch thread pools.",
+    )
+
+    parser.add_argument(
+        "--results_db",
+        type=str,
+        default=None,
+        help="Also store each finished run in this results database (see src.runners.results_db).",
     )
 
     return parser.parse_args()
@@ -444,6 +508,42 @@ def _resolve_out_csv(path: str) -> str:
     return str(p)
 
 
+def _out_csv_for_assignment(out_csv: str, assignment_idx: Optional[int], *, batch: bool) -> str:
+    """Return the CSV path for one assignment of a (possibly batched) run.
+
+    An ``{assignment_idx}`` placeholder is filled when present. Otherwise
+    single runs keep ``out_csv`` unchanged and batched runs append the
+    ``_null_idx_<i>`` suffix used by the per-index shell loops.
+    """
+    if assignment_idx is None:
+        return out_csv
+    if "{assignment_idx}" in out_csv:
+        return out_csv.replace("{assignment_idx}", str(assignment_idx))
+    if not batch:
+        return out_csv
+    p = Path(out_csv)
+    return str(p.with_name(f"{p.stem}_null_idx_{assignment_idx}{p.suffix}"))
+
+
+def _corpus_key(cfg: LoadConfig, *, reuse_observed_load: bool) -> LoadConfig:
+    """Return the configuration whose parsed corpus serves ``cfg``.
+
+    Batched null runs relabel the corpus loaded under the observed labels
+    instead of re-parsing the logs per assignment.
+    """
+    if not reuse_observed_load:
+        return cfg
+    return replace(cfg, randomize_actor_labels=False, assignment_idx=None)
+
+
+def _load_examples_for(cfg: LoadConfig, *, reuse_observed_load: bool) -> List[Example]:
+    """Load examples for ``cfg`` through the process-wide corpus cache."""
+    examples = cached_examples(_corpus_key(cfg, reuse_observed_load=reuse_observed_load))
+    if not reuse_observed_load:
+        return examples
+    return relabel_examples(examples, cfg)
+
+
 def _run_one_outer_split(
     outer_i: int,
     total_outer: int,
@@ -457,15 +557,21 @@ def _run_one_outer_split(
     benchmark: bool,
     randomize_actor_labels: bool,
     assignment_idx: Optional[int],
+    reuse_observed_load: bool = False,
+    active_loads: Optional[Sequence[str]] = None,
+    record_load_scores: bool = False,
 ) -> Optional[Dict[str, object]]:
     """Run model selection and evaluation for one outer split.
 
     Each outer split searches over load configurations on the validation groups,
     then reports the corresponding test result for the best validation setting.
     Returns one CSV row, or ``None`` when no valid configuration survives.
+    ``active_loads`` restricts the grid to the configs still in a pruning race;
+    ``record_load_scores`` adds every config's validation score to the row.
     """
+    null_tag = f"[NULL {assignment_idx:03d}] " if reuse_observed_load and assignment_idx is not None else ""
     print("\n" + "=" * 100)
-    print(f"[OUTER {outer_i:03d}/{total_outer}] val={val_groups} test={test_groups}")
+    print(f"{null_tag}[OUTER {outer_i:03d}/{total_outer}] val={val_groups} test={test_groups}")
     print("=" * 100)
 
     load_grid = make_load_configs(
@@ -474,8 +580,11 @@ def _run_one_outer_split(
         randomize_actor_labels=randomize_actor_labels,
         assignment_idx=assignment_idx,
     )
+    if active_loads is not None:
+        load_grid = [named for named in load_grid if named.name in active_loads]
     cand_grid = [c for c in make_candidates() if c.model_name == model_name]
     best_overall = None  # (val_score, NamedLoad, best_candidate, best_val_res, best_test_res, counts)
+    load_val_scores: Dict[str, float] = {}
 
     for li, named in enumerate(load_grid, 1):
         print(f"\n  --- LoadConfig [{li:02d}/{len(load_grid)}] {named.name} ---")
@@ -487,7 +596,7 @@ def _run_one_outer_split(
                 f"load_examples({named.name})",
                 meta_fn=lambda: {"n": len(examples)},
             ):
-                examples = load_examples(named.cfg)
+                examples = _load_examples_for(named.cfg, reuse_observed_load=reuse_observed_load)
         except Exception as e:
             print(f"  ⚠ load failed for {named.name}: {e}")
             continue
@@ -543,6 +652,7 @@ def _run_one_outer_split(
         test_bal = _safe_float(getattr(best_test_res, "balanced_accuracy", np.nan))
 
         print(f"  best VAL f1_macro={val_f1:.4f} | TEST f1_macro={test_f1:.4f} | model={best_cand.model_name}")
+        load_val_scores[named.name] = val_f1
 
         if best_overall is None or val_f1 > best_overall[0]:
             best_overall = (
@@ -568,7 +678,7 @@ def _run_one_outer_split(
     print(f"    VAL  f1_macro={val_f1:.4f}  bal_acc={val_bal:.4f}")
     print(f"    TEST f1_macro={test_f1:.4f}  bal_acc={test_bal:.4f}")
 
-    return {
+    row = {
         "outer_i": outer_i,
         "val_human": val_groups[0],
         "val_ai": val_groups[1],
@@ -602,13 +712,58 @@ def _run_one_outer_split(
         "randomize_actor_labels": randomize_actor_labels,
         "assignment_idx": assignment_idx,
     }
+    if record_load_scores:
+        row["load_val_scores"] = json.dumps(load_val_scores, sort_keys=True)
+    return row
+
+
+def run_queue_task(payload: Dict[str, object]) -> Optional[Dict[str, object]]:
+    """Run one queued outer split; entry point used by ``src.runners.worker``."""
+    return _run_one_outer_split(
+        int(payload["outer_i"]),
+        int(payload["total_outer"]),
+        tuple(payload["val_groups"]),
+        tuple(payload["test_groups"]),
+        **payload["kwargs"],
+    )
+
+
+def _write_rows(rows: List[Dict[str, object]], out_csv: str) -> None:
+    """Write one run's rows to ``out_csv`` and print the aggregate summary."""
+    if not rows:
+        print(f"\nNo rows collected for {out_csv}; nothing to write.")
+        return
+
+    rows.sort(key=lambda r: int(r["outer_i"]))
+
+    Path(out_csv).parent.mkdir(parents=True, exist_ok=True)
+    fieldnames = list(rows[0].keys())
+    with open(out_csv, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=fieldnames)
+        w.writeheader()
+        w.writerows(rows)
+
+    # -------------------------
+    # Aggregate summary
+    # -------------------------
+    test_f1s = np.array([r["test_f1_macro"] for r in rows], dtype=float)
+    test_bals = np.array([r["test_balanced_accuracy"] for r in rows], dtype=float)
+
+    print("\n" + "#" * 100)
+    print("DONE. Summary over outer splits (selected-by-VAL per split):")
+    print(f"Rows written: {len(rows)} -> {out_csv}")
+    print(f"TEST f1_macro: mean={np.nanmean(test_f1s):.4f} median={np.nanmedian(test_f1s):.4f} std={np.nanstd(test_f1s):.4f}")
+    print(f"TEST bal_acc : mean={np.nanmean(test_bals):.4f} median={np.nanmedian(test_bals):.4f} std={np.nanstd(test_bals):.4f}")
+    print("#" * 100)
 
 
 def main():
     """Execute the full nested benchmark and write one row per outer split.
 
     The runner supports the standard evaluation setting and a null setting in
-    which actor labels are reassigned via a fixed enumerated permutation.
+    which actor labels are reassigned via a fixed enumerated permutation. When
+    several assignments are requested, all of them share one process pool and
+    one parse of the logs, and each assignment is written to its own CSV.
     """
     args = parse_args()
 
@@ -623,126 +778,283 @@ def main():
         raise ValueError(
             "--assignment_idx should only be used together with --randomize_actor_labels"
         )
-    
+
+    if args.prune_load_configs and args.queue:
+        raise ValueError("--prune_load_configs needs a local run and cannot be combined with --queue")
+
+    assignment_indices: List[Optional[int]] = [None]
     if args.randomize_actor_labels:
         n_assignments = get_num_actor_label_assignments(args.dataset)
-        if not (0 <= args.assignment_idx < n_assignments):
-            raise ValueError(
-                f"--assignment_idx={args.assignment_idx} out of range for dataset={args.dataset}. "
-                f"Valid range: 0..{n_assignments - 1}"
-            )
+        assignment_indices = list(parse_assignment_indices(args.assignment_idx, n_assignments))
+
+    # Batched null runs parse each load config once under the observed labels
+    # and relabel in memory per assignment.
+    batch = len(assignment_indices) > 1
 
     model_name = args.model
     metric = "f1_macro"
     out_csv = _resolve_out_csv(args.out_csv)
     n_jobs = max(1, int(args.n_jobs))
 
-    # Outer splits encode the human/AI group pairings used for held-out
-    # evaluation, optionally under a randomized actor-label assignment.
-    all_outer_splits = make_val_test_splits(
-        args.dataset,
-        randomize_actor_labels=args.randomize_actor_labels,
-        assignment_idx=args.assignment_idx,
-    )
-    outer_splits = all_outer_splits
-    if args.limit_outer and args.limit_outer > 0:
-        outer_splits = outer_splits[: args.limit_outer]
-
-    load_grid = make_load_configs(
-        args.dataset,
-        args.log_type,
-        randomize_actor_labels=args.randomize_actor_labels,
-        assignment_idx=args.assignment_idx,
-    )
     cand_grid = [c for c in make_candidates() if c.model_name == model_name]
 
     if not cand_grid:
         raise RuntimeError(f"No candidates for model {model_name}")
-    
+
+    out_csvs = {
+        idx: _out_csv_for_assignment(out_csv, idx, batch=batch)
+        for idx in assignment_indices
+    }
+
+    # Outer splits encode the human/AI group pairings used for held-out
+    # evaluation, optionally under a randomized actor-label assignment.
+    # Splits already recorded in an assignment's journal are not rerun.
+    worker_args = []
+    journals: Dict[Optional[int], RowJournal] = {}
+    journal_configs: Dict[Optional[int], Dict[str, object]] = {}
+    n_outer_total = 0
+    n_outer = 0
+    for assignment_idx in assignment_indices:
+        all_outer_splits = make_val_test_splits(
+            args.dataset,
+            randomize_actor_labels=args.randomize_actor_labels,
+            assignment_idx=assignment_idx,
+        )
+        n_outer_total = len(all_outer_splits)
+        outer_splits = all_outer_splits
+        if args.limit_outer and args.limit_outer > 0:
+            outer_splits = outer_splits[: args.limit_outer]
+        n_outer = len(outer_splits)
+
+        load_grid = make_load_configs(
+            args.dataset,
+            args.log_type,
+            randomize_actor_labels=args.randomize_actor_labels,
+            assignment_idx=assignment_idx,
+        )
+        journal_configs[assignment_idx] = {
+            "runner": "tfidf_360_nested",
+            "dataset": args.dataset,
+            "log_type": args.log_type,
+            "model": model_name,
+            "metric": metric,
+            "randomize_actor_labels": args.randomize_actor_labels,
+            "assignment_idx": assignment_idx,
+            "outer_splits": all_outer_splits,
+            "load_grid": load_grid,
+            "candidates": cand_grid,
+        }
+        if args.prune_load_configs:
+            journal_configs[assignment_idx]["pruning"] = {
+                "warmup": args.prune_warmup,
+                "alpha": args.prune_alpha,
+            }
+        journal = RowJournal(
+            out_csvs[assignment_idx],
+            journal_configs[assignment_idx],
+            resume=not args.no_resume,
+        )
+        journals[assignment_idx] = journal
+        done = journal.completed()
+        if done:
+            print(f"Resuming {out_csvs[assignment_idx]}: {len(done)} outer splits already in journal")
+
+        worker_args.extend(
+            (assignment_idx, outer_i, len(outer_splits), val_groups, test_groups)
+            for outer_i, (val_groups, test_groups) in enumerate(outer_splits, 1)
+            if outer_i not in done
+        )
+
+    if args.queue:
+        # Queued null tasks follow the local rule: only multi-assignment runs
+        # relabel the observed load, so a single --assignment_idx gives the
+        # same windows with and without --queue.
+        queue = WorkQueue(args.queue)
+        added = queue.enqueue(
+            {
+                "runner": "tfidf_360_nested",
+                "dataset": args.dataset,
+                "log_type": args.log_type,
+                "model": model_name,
+                "assignment_idx": assignment_idx,
+                "outer_i": outer_i,
+                "out_csv": out_csvs[assignment_idx],
+                "payload": {
+                    "outer_i": outer_i,
+                    "total_outer": total_outer,
+                    "val_groups": val_groups,
+                    "test_groups": test_groups,
+                    "kwargs": {
+                        "model_name": model_name,
+                        "metric": metric,
+                        "dataset": args.dataset,
+                        "log_type": args.log_type,
+                        "benchmark": args.benchmark,
+                        "randomize_actor_labels": args.randomize_actor_labels,
+                        "assignment_idx": assignment_idx,
+                        "reuse_observed_load": batch,
+                    },
+                },
+                "journal_config": journal_configs[assignment_idx],
+            }
+            for assignment_idx, outer_i, total_outer, val_groups, test_groups in worker_args
+        )
+        queue.close()
+        print(f"Enqueued {added} new tasks ({len(worker_args) - added} already queued) -> {args.queue}")
+        return
+
+    pending = {idx: 0 for idx in assignment_indices}
+    for task in worker_args:
+        pending[task[0]] += 1
+
     print(f"Dataset     : {args.dataset}")
     print(f"Log type    : {args.log_type}")
     print("MODEL:", model_name)
-    print(f"Outer splits: {len(outer_splits)} (of {len(all_outer_splits)})")
+    print(f"Outer splits: {n_outer} (of {n_outer_total})")
+    print(f"Pending runs: {len(worker_args)}")
+    if batch:
+        print(f"Assignments : {len(assignment_indices)} ({args.assignment_idx})")
     print(f"LoadConfigs : {len(load_grid)}")
     print(f"Candidates  : {len(cand_grid)}")
     print(f"Parallel jobs: {n_jobs}")
-    print(f"Writing CSV : {out_csv}")
-
-    rows: List[Dict[str, object]] = []
-
-    worker_args = [
-        (outer_i, len(outer_splits), val_groups, test_groups)
-        for outer_i, (val_groups, test_groups) in enumerate(outer_splits, 1)
-    ]
-
-    if n_jobs == 1:
-        for outer_i, total_outer, val_groups, test_groups in worker_args:
-            row = _run_one_outer_split(
-                outer_i,
-                total_outer,
-                val_groups,
-                test_groups,
-                model_name=model_name,
-                metric=metric,
+    if batch:
+        print(f"Writing CSVs: {out_csvs[assignment_indices[0]]} ... {out_csvs[assignment_indices[-1]]}")
+    else:
+        print(f"Writing CSV : {out_csv}")
+
+    # One racer per assignment; on resume it is rebuilt from the journaled
+    # per-config validation scores.
+    racers: Dict[Optional[int], LoadConfigRacer] = {}
+    if args.prune_load_configs:
+        for assignment_idx in assignment_indices:
+            log_path = pruning_log_path(out_csvs[assignment_idx])
+            if args.no_resume and Path(log_path).exists():
+                Path(log_path).unlink()
+            racer = LoadConfigRacer(
+                [named.name for named in load_grid],
+                warmup=args.prune_warmup,
+                alpha=args.prune_alpha,
+                n_splits=len(outer_splits),
+                log_path=log_path,
+            )
+            done_rows = journals[assignment_idx].rows()
+            for row in done_rows:
+                racer.observe(int(row["outer_i"]), json.loads(row["load_val_scores"]))
+            if done_rows:
+                racer.log(event="resume", outer_splits=[int(r["outer_i"]) for r in done_rows])
+                racer.update()
+            racers[assignment_idx] = racer
+
+    def _task_kwargs(assignment_idx: Optional[int]) -> Dict[str, object]:
+        kwargs: Dict[str, object] = dict(
+            model_name=model_name,
+            metric=metric,
+            dataset=args.dataset,
+            log_type=args.log_type,
+            benchmark=args.benchmark,
+            randomize_actor_labels=args.randomize_actor_labels,
+            assignment_idx=assignment_idx,
+            reuse_observed_load=batch,
+        )
+        if racers:
+            kwargs.update(active_loads=racers[assignment_idx].active(), record_load_scores=True)
+        return kwargs
+
+    def _collect(assignment_idx: Optional[int], outer_i: int, row: Optional[Dict[str, object]]) -> None:
+        journals[assignment_idx].append(outer_i, row)
+        if racers and row is not None:
+            racers[assignment_idx].observe(outer_i, json.loads(str(row["load_val_scores"])))
+        pending[assignment_idx] -= 1
+        # Write each assignment as soon as its last outer split finishes so
+        # an interrupted batch keeps every completed assignment.
+        if pending[assignment_idx] == 0:
+            _finish(assignment_idx)
+
+    def _finish(assignment_idx: Optional[int]) -> None:
+        rows = journals[assignment_idx].rows()
+        _write_rows(rows, out_csvs[assignment_idx])
+        if args.results_db and rows:
+            record_run(
+                args.results_db,
+                rows,
+                kind="ml",
+                tool="tfidf",
                 dataset=args.dataset,
                 log_type=args.log_type,
-                benchmark=args.benchmark,
-                randomize_actor_labels=args.randomize_actor_labels,
-                assignment_idx=args.assignment_idx,
+                model=model_name,
+                assignment_idx=assignment_idx,
+                source=out_csvs[assignment_idx],
             )
-            if row is not None:
-                rows.append(row)
-    else:
-        with ProcessPoolExecutor(max_workers=n_jobs) as ex:
-            futures = [
-                ex.submit(
-                    _run_one_outer_split,
-                    outer_i,
-                    total_outer,
-                    val_groups,
-                    test_groups,
-                    model_name=model_name,
-                    metric=metric,
-                    dataset=args.dataset,
-                    log_type=args.log_type,
-                    benchmark=args.benchmark,
-                    randomize_actor_labels=args.randomize_actor_labels,
-                    assignment_idx=args.assignment_idx,
-                )
-                for outer_i, total_outer, val_groups, test_groups in worker_args
-            ]
-            for fut in as_completed(futures):
-                row = fut.result()
-                if row is not None:
-                    rows.append(row)
 
-    # -------------------------
-    # Write results
-    # -------------------------
-    if not rows:
-        print("\nNo rows collected; nothing to write.")
-        return
+    # Without pruning everything is one round. With pruning, rounds of n_jobs
+    # splits run between racing decisions, so the decisions depend on n_jobs
+    # but not on the order in which workers finish.
+    if racers:
+        rounds = [worker_args[i : i + n_jobs] for i in range(0, len(worker_args), n_jobs)]
+    else:
+        rounds = [worker_args]
 
-    rows.sort(key=lambda r: int(r["outer_i"]))
+    # Split the core budget between pool workers and their library threads.
+    budget = configure_threads(n_jobs, cpu_budget=args.cpu_budget)
 
-    fieldnames = list(rows[0].keys())
-    with open(out_csv, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        w.writerows(rows)
-
-    # -------------------------
-    # Aggregate summary
-    # -------------------------
-    test_f1s = np.array([r["test_f1_macro"] for r in rows], dtype=float)
-    test_bals = np.array([r["test_balanced_accuracy"] for r in rows], dtype=float)
+    pool = None
+    if n_jobs > 1:
+        # Parse every load config once here; forked workers inherit the corpus.
+        n_cached = preload(
+            {_corpus_key(named.cfg, reuse_observed_load=batch) for named in load_grid},
+            benchmark=args.benchmark,
+        )
+        print(f"Shared corpus: {n_cached} examples")
+        pool = make_process_pool(n_jobs, threads_per_worker=budget.threads_per_proc)
 
-    print("\n" + "#" * 100)
-    print("DONE. Summary over outer splits (selected-by-VAL per split):")
-    print(f"Rows written: {len(rows)} -> {out_csv}")
-    print(f"TEST f1_macro: mean={np.nanmean(test_f1s):.4f} median={np.nanmedian(test_f1s):.4f} std={np.nanstd(test_f1s):.4f}")
-    print(f"TEST bal_acc : mean={np.nanmean(test_bals):.4f} median={np.nanmedian(test_bals):.4f} std={np.nanstd(test_bals):.4f}")
-    print("#" * 100)
+    try:
+        for round_args in rounds:
+            round_idxs = list(dict.fromkeys(task[0] for task in round_args))
+            if racers:
+                for assignment_idx in round_idxs:
+                    racers[assignment_idx].log_round(
+                        [task[1] for task in round_args if task[0] == assignment_idx]
+                    )
+
+            if pool is None:
+                for assignment_idx, outer_i, total_outer, val_groups, test_groups in round_args:
+                    row = _run_one_outer_split(
+                        outer_i,
+                        total_outer,
+                        val_groups,
+                        test_groups,
+                        **_task_kwargs(assignment_idx),
+                    )
+                    _collect(assignment_idx, outer_i, row)
+            else:
+                futures = {
+                    pool.submit(
+                        _run_one_outer_split,
+                        outer_i,
+                        total_outer,
+                        val_groups,
+                        test_groups,
+                        **_task_kwargs(assignment_idx),
+                    ): (assignment_idx, outer_i)
+                    for assignment_idx, outer_i, total_outer, val_groups, test_groups in round_args
+                }
+                for fut in as_completed(futures):
+                    _collect(*futures[fut], fut.result())
+
+            if racers:
+                for assignment_idx in round_idxs:
+                    dropped = racers[assignment_idx].update()
+                    if dropped:
+                        print(f"\n>>> PRUNED load configs {dropped}; remaining {racers[assignment_idx].active()}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    # Assignments fully restored from their journal had nothing pending.
+    scheduled = {task[0] for task in worker_args}
+    for assignment_idx in assignment_indices:
+        if assignment_idx not in scheduled:
+            _finish(assignment_idx)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,90 @@
+"""Benchmark process-pool throughput with and without the CPU thread budget.
+
+Each task mimics the CPU profile of an inter-times outer split: a random forest
+with ``n_jobs=library_n_jobs()``, a logistic regression and a few BLAS-bound
+matrix products on synthetic data. The same tasks are run twice on a pool of
+``--n_jobs`` workers: first unmanaged (every library sizes its pool to the
+whole machine) and then under ``configure_threads``.
+
+    python -m src.runners.ml.thread_budget_bench --n_jobs 8 --n_tasks 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from src.core.ml.corpus_cache import make_process_pool
+from src.core.ml.resources import configure_threads, library_n_jobs
+
+
+def parse_args():
+    """Parse the benchmark size and pool settings."""
+    p = argparse.ArgumentParser()
+    p.add_argument("--n_jobs", type=int, default=max(2, (os.cpu_count() or 2) // 4), help="Pool size.")
+    p.add_argument("--n_tasks", type=int, default=16, help="Number of tasks per mode.")
+    p.add_argument("--n_samples", type=int, default=4000, help="Rows in each synthetic task.")
+    p.add_argument("--cpu_budget", type=int, default=None, help="Core budget for the managed run.")
+    return p.parse_args()
+
+
+def _n_threads() -> Optional[int]:
+    # Native threads of this process (BLAS, OpenMP and joblib pools included).
+    try:
+        return len(os.listdir("/proc/self/task"))
+    except OSError:
+        return None
+
+
+def _task(seed: int, n_samples: int) -> Tuple[float, Optional[int]]:
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_samples, 40))
+    y = (X[:, :5].sum(axis=1) + rng.normal(scale=2.0, size=n_samples) > 0).astype(int)
+
+    t0 = time.perf_counter()
+    RandomForestClassifier(n_estimators=150, random_state=seed, n_jobs=library_n_jobs()).fit(X, y)
+    LogisticRegression(max_iter=500).fit(X, y)
+    A = rng.normal(size=(600, 600))
+    for _ in range(6):
+        A = np.tanh(A @ A.T / 600.0)
+    return time.perf_counter() - t0, _n_threads()
+
+
+def _run(pool: ProcessPoolExecutor, n_tasks: int, n_samples: int) -> Tuple[float, int]:
+    t0 = time.perf_counter()
+    results = list(pool.map(_task, range(n_tasks), [n_samples] * n_tasks))
+    wall = time.perf_counter() - t0
+    max_threads = max((n for _, n in results if n is not None), default=-1)
+    return wall, max_threads
+
+
+def main():
+    """Run the unmanaged and the budgeted pool on identical tasks and compare."""
+    args = parse_args()
+    n_jobs = max(1, int(args.n_jobs))
+    print(f"cores={os.cpu_count()} n_jobs={n_jobs} n_tasks={args.n_tasks} n_samples={args.n_samples}")
+
+    # The unmanaged run must come first: workers forked after
+    # configure_threads would inherit the budget.
+    with ProcessPoolExecutor(max_workers=n_jobs, mp_context=mp.get_context("fork")) as pool:
+        wall_free, thr_free = _run(pool, args.n_tasks, args.n_samples)
+    print(f"unmanaged : wall={wall_free:8.2f}s  max threads/worker={thr_free}")
+
+    budget = configure_threads(n_jobs, cpu_budget=args.cpu_budget)
+    with make_process_pool(n_jobs, threads_per_worker=budget.threads_per_proc) as pool:
+        wall_budget, thr_budget = _run(pool, args.n_tasks, args.n_samples)
+    print(f"budgeted  : wall={wall_budget:8.2f}s  max threads/worker={thr_budget}")
+
+    print(f"speedup   : {wall_free / wall_budget:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
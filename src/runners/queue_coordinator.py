@@ -0,0 +1,146 @@
+"""Coordinator commands for the SQLite work queue used by distributed nested runs.
+
+Typical flow:
+
+    python -m src.runners.queue_coordinator init --queue q.db --journal_mode delete   # NFS only
+    python -m src.runners.ml.tfidf_360_nested ... --queue q.db                         # enqueue
+    python -m src.runners.worker --queue q.db --n_procs 6                              # on each box
+    python -m src.runners.queue_coordinator status --queue q.db
+    python -m src.runners.queue_coordinator assemble --queue q.db
+
+``assemble`` merges the finished rows into each run's journal and writes the
+CSV in the same format the runner would have produced locally.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.core.ml.checkpoint import RowJournal
+from src.core.ml.work_queue import WorkQueue
+from src.core.shared.results_store import record_run
+
+
+def parse_args():
+    """Parse the coordinator subcommands."""
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest="command", required=True)
+
+    p_init = sub.add_parser("init", help="Create an empty queue database.")
+    p_init.add_argument("--queue", type=str, required=True)
+    p_init.add_argument(
+        "--journal_mode",
+        type=str,
+        default="wal",
+        choices=["wal", "delete"],
+        help="Use 'delete' when workers on several machines share the database over NFS.",
+    )
+
+    p_status = sub.add_parser("status", help="Show task counts per state and per output CSV.")
+    p_status.add_argument("--queue", type=str, required=True)
+    p_status.add_argument("--show_errors", action="store_true", help="Print the last error of failed tasks.")
+
+    p_requeue = sub.add_parser("requeue", help="Return stale claims (and optionally failed tasks) to pending.")
+    p_requeue.add_argument("--queue", type=str, required=True)
+    p_requeue.add_argument("--stale_after_s", type=float, default=600.0)
+    p_requeue.add_argument("--failed", action="store_true", help="Also retry failed tasks.")
+
+    p_assemble = sub.add_parser("assemble", help="Write the result CSVs of finished runs.")
+    p_assemble.add_argument("--queue", type=str, required=True)
+    p_assemble.add_argument(
+        "--allow_partial",
+        action="store_true",
+        help="Also write CSVs of runs that still have unfinished or failed tasks.",
+    )
+    p_assemble.add_argument(
+        "--results_db",
+        type=str,
+        default=None,
+        help="Also store each assembled run in this results database.",
+    )
+
+    return p.parse_args()
+
+
+def _write_csv(rows: List[Dict[str, object]], out_csv: str) -> None:
+    fieldnames = list(rows[0].keys())
+    with open(out_csv, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=fieldnames)
+        w.writeheader()
+        w.writerows(rows)
+
+    test_f1s = np.array([r["test_f1_macro"] for r in rows], dtype=float)
+    print(f"  {out_csv}: {len(rows)} rows, TEST f1_macro mean={np.nanmean(test_f1s):.4f}")
+
+
+def assemble(q: WorkQueue, *, allow_partial: bool, results_db: Optional[str] = None) -> None:
+    """Merge finished queue results into the run journals and write the CSVs."""
+    for info in q.out_csvs():
+        out_csv = info["out_csv"]
+        if info["n_done"] < info["n_tasks"] and not allow_partial:
+            print(f"  skip {out_csv}: {info['n_done']}/{info['n_tasks']} tasks done")
+            continue
+
+        tasks = q.tasks_for(out_csv)
+        journal = RowJournal(out_csv, tasks[0]["journal_config"])
+        done = journal.completed()
+        for t in tasks:
+            if t["state"] == "done" and t["outer_i"] not in done:
+                journal.append(t["outer_i"], t["result"])
+
+        rows = journal.rows()
+        if not rows:
+            print(f"  {out_csv}: no rows collected; nothing to write.")
+            continue
+        _write_csv(rows, out_csv)
+        if results_db:
+            t = tasks[0]
+            record_run(
+                results_db,
+                rows,
+                kind="ml",
+                tool=t["runner"].removesuffix("_360_nested"),
+                dataset=t["dataset"],
+                log_type=t["log_type"],
+                model=t["model"],
+                assignment_idx=t["assignment_idx"],
+                source=out_csv,
+            )
+
+
+def main():
+    """Dispatch to the selected coordinator subcommand."""
+    args = parse_args()
+
+    if args.command == "init":
+        WorkQueue(args.queue, journal_mode=args.journal_mode).close()
+        print(f"Initialized {args.queue} (journal_mode={args.journal_mode})")
+        return
+
+    q = WorkQueue(args.queue, stale_after_s=getattr(args, "stale_after_s", 600.0))
+    try:
+        if args.command == "status":
+            counts = q.counts()
+            print("Tasks: " + " ".join(f"{k}={v}" for k, v in counts.items()))
+            for info in q.out_csvs():
+                print(f"  {info['n_done']:5d}/{info['n_tasks']:<5d} failed={info['n_failed']:<3d} {info['out_csv']}")
+            if args.show_errors:
+                for t in q.failures():
+                    print(f"\n--- task {t['id']} ({t['out_csv']} outer={t['outer_i']}) ---\n{t['error']}")
+
+        elif args.command == "requeue":
+            n = q.requeue(stale=True, failed=args.failed)
+            print(f"Requeued {n} tasks")
+
+        elif args.command == "assemble":
+            assemble(q, allow_partial=args.allow_partial, results_db=args.results_db)
+    finally:
+        q.close()
+
+
+if __name__ == "__main__":
+    main()
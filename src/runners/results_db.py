@@ -0,0 +1,65 @@
+"""Import result CSV trees into a results database and inspect its contents.
+
+    python -m src.runners.results_db import --db results.db results_2026_04_15
+    python -m src.runners.results_db summary --db results.db
+
+Re-running ``import`` only re-reads CSVs whose size or modification time
+changed. The analysis scripts in ``src.analysis`` read the database with
+``--db`` instead of globbing result directories.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from src.core.shared.results_store import ResultsStore
+
+
+def parse_args():
+    """Parse the results database subcommands."""
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest="command", required=True)
+
+    p_import = sub.add_parser("import", help="Import result CSV trees.")
+    p_import.add_argument("--db", type=str, required=True)
+    p_import.add_argument("roots", nargs="+", help="Results roots, e.g. results_2026_04_15.")
+    p_import.add_argument("--force", action="store_true", help="Re-import unchanged files too.")
+    p_import.add_argument("--show_skipped", action="store_true", help="List CSVs outside the known layout.")
+
+    p_summary = sub.add_parser("summary", help="Show run counts per tool, dataset and log type.")
+    p_summary.add_argument("--db", type=str, required=True)
+
+    return p.parse_args()
+
+
+def main():
+    """Dispatch to the selected subcommand."""
+    args = parse_args()
+    store = ResultsStore(args.db)
+    try:
+        if args.command == "import":
+            for root in args.roots:
+                t0 = time.perf_counter()
+                imported, unchanged, skipped = store.import_tree(root, force=args.force)
+                print(
+                    f"{root}: imported={imported} unchanged={unchanged} "
+                    f"skipped={len(skipped)} ({time.perf_counter() - t0:.1f}s)"
+                )
+                if args.show_skipped:
+                    for path in skipped:
+                        print(f"  skipped {path}")
+
+        elif args.command == "summary":
+            print(f"{'kind':5s} {'dataset':10s} {'log_type':16s} {'tool':22s} {'model':20s} {'obs':>4s} {'null':>5s} {'rows':>7s}")
+            for r in store.summary():
+                print(
+                    f"{r['kind']:5s} {r['dataset']:10s} {r['log_type'] or '-':16s} {r['tool']:22s} "
+                    f"{r['model'] or '-':20s} {r['n_observed']:4d} {r['n_null']:5d} {r['n_rows']:7d}"
+                )
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
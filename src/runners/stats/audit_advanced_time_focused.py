@@ -37,7 +37,6 @@ from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Sequence, Any
 
-import matplotlib.pyplot as plt
 import numpy as np
 
 from src.core.stats.data_catalog import get_log_path, analysis_actors
@@ -508,6 +507,8 @@ def plot_log_hist(
     Non-positive and non-finite values are discarded because the visualization
     is defined on log-scaled delays only.
     """
+    import matplotlib.pyplot as plt
+
     values = [v for v in values if np.isfinite(v) and v > 0]
     if not values:
         print(f"[WARN] No positive finite values to plot for: {label}")
@@ -12,8 +12,6 @@ from pathlib import Path
 from typing import Pattern, Sequence, List, Dict, Any, Optional, Tuple
 from collections import Counter
 
-import matplotlib.pyplot as plt
-
 from src.core.stats.data_catalog import get_log_path, analysis_actors
 
 
@@ -510,6 +508,8 @@ def build_actor_color_map(actor_names: Sequence[str]) -> Dict[str, Any]:
     Human actors receive shades of blue, AI actors receive shades of orange.
     This keeps actor identity visible while making the human/AI split obvious.
     """
+    import matplotlib.pyplot as plt
+
     humans = [name for name in actor_names if not is_ai_actor(name)]
     ais = [name for name in actor_names if is_ai_actor(name)]
 
@@ -546,6 +546,8 @@ def plot_actor_distributions(
     The vocabulary is chosen globally across actors so bar positions remain
     comparable. Counts can be shown directly or normalized to probabilities.
     """
+    import matplotlib.pyplot as plt
+
     if not actor_distributions:
         print("No actor distributions to plot.")
         return
@@ -63,6 +63,12 @@ def parse_args() -> argparse.Namespace:
             "If omitted, a dataset-specific default path is used."
         ),
     )
+    parser.add_argument(
+        "--results_db",
+        type=str,
+        default=None,
+        help="Also append each result row to this results database (see src.runners.results_db).",
+    )
 
     parser.add_argument(
         "--log_type",
@@ -102,6 +108,10 @@ def parse_args() -> argparse.Namespace:
             "--assignment_idx may only be used when --assignment_mode indexed_stratified"
         )
 
+    # Stored runs are either observed or tied to one enumerated assignment.
+    if args.results_db is not None and args.assignment_mode == "random_stratified":
+        parser.error("--results_db cannot be used with --assignment_mode random_stratified")
+
     if args.mode == "single":
         missing = []
         if args.log_type is None:
@@ -134,6 +144,7 @@ def run_complexity_metrics(
     stride: int | None = None,
     metric_name: str | None = None,
     out_csv: str | None = None,
+    results_db: str | None = None,
 ) -> None:
     """Execute one complexity-metric run or a sweep of predefined configurations.
 
@@ -189,6 +200,8 @@ def run_complexity_metrics(
             assignment_idx=assignment_idx,
             output_path=output_path,
             plot=True,
+            results_db=results_db,
+            dataset=dataset,
         )
 
     elif mode == "sweep":
@@ -273,6 +286,8 @@ def run_complexity_metrics(
                     assignment_idx=assignment_idx,
                     output_path=output_path,
                     plot=False,
+                    results_db=results_db,
+                    dataset=dataset,
                 )
 
     else:
@@ -296,4 +311,5 @@ if __name__ == "__main__":
         stride=args.stride,
         metric_name=metric_name,
         out_csv=args.out_csv,
+        results_db=args.results_db,
     )
@@ -57,6 +57,12 @@ def parse_args() -> argparse.Namespace:
             "If omitted, a dataset-specific default path is used."
         ),
     )
+    parser.add_argument(
+        "--results_db",
+        type=str,
+        default=None,
+        help="Also append each result row to this results database (see src.runners.results_db).",
+    )
 
     parser.add_argument(
         "--log_type",
@@ -93,6 +99,10 @@ def parse_args() -> argparse.Namespace:
             "--assignment_idx may only be used when --assignment_mode indexed_stratified"
         )
 
+    # Stored runs are either observed or tied to one enumerated assignment.
+    if args.results_db is not None and args.assignment_mode == "random_stratified":
+        parser.error("--results_db cannot be used with --assignment_mode random_stratified")
+
     # Single mode executes one concrete configuration and therefore requires
     # all fields needed to build that configuration explicitly.
     if args.mode == "single":
@@ -132,6 +142,7 @@ def run_one_gram(
     ngram_mode: str | None = None,
     metric: str | None = None,
     out_csv: str | None = None,
+    results_db: str | None = None,
 ) -> None:
     """Run one-gram analysis for one configuration or a predefined sweep.
 
@@ -169,6 +180,8 @@ def run_one_gram(
             assignment_idx=assignment_idx,
             plot=True,
             output_path=output_path,
+            results_db=results_db,
+            dataset=dataset,
         )
 
     elif mode == "sweep":
@@ -225,6 +238,8 @@ def run_one_gram(
                 assignment_idx=assignment_idx,
                 output_path=output_path,
                 plot=False,
+                results_db=results_db,
+                dataset=dataset,
             )
 
     else:
@@ -243,4 +258,5 @@ if __name__ == "__main__":
         ngram_mode=args.ngram_mode,
         metric=args.metric,
         out_csv=args.out_csv,
+        results_db=args.results_db,
     )
@@ -0,0 +1,169 @@
+"""Queue worker that executes nested outer splits claimed from a SQLite queue.
+
+Start one or more workers on every machine that can reach the queue database:
+
+    python -m src.runners.worker --queue results/queue.db --n_procs 6
+
+Each worker process claims one task at a time, keeps its claim alive with a
+heartbeat thread, and writes the resulting CSV row back into the queue. Workers
+exit once no task is pending or claimed anymore.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import multiprocessing as mp
+import os
+import socket
+import threading
+import time
+import traceback
+from typing import Optional
+
+from src.core.ml.resources import apply_thread_budget, plan_budget
+from src.core.ml.work_queue import WorkQueue
+
+# Runner name stored in the queue -> module exposing ``run_queue_task``.
+RUNNERS = {
+    "tfidf_360_nested": "src.runners.ml.tfidf_360_nested",
+    "inter_times_360_nested": "src.runners.ml.inter_times_360_nested",
+}
+
+
+def parse_args():
+    """Parse the command-line interface for queue workers."""
+    p = argparse.ArgumentParser()
+    p.add_argument("--queue", type=str, required=True, help="Path to the SQLite queue database.")
+    p.add_argument("--n_procs", type=int, default=1, help="Number of worker processes to start on this machine.")
+    p.add_argument("--worker_id", type=str, default=None, help="Worker name prefix (default: hostname).")
+    p.add_argument("--heartbeat_s", type=float, default=30.0, help="Seconds between claim heartbeats.")
+    p.add_argument(
+        "--stale_after_s",
+        type=float,
+        default=600.0,
+        help="Claims without a heartbeat for this long are handed to another worker.",
+    )
+    p.add_argument("--max_attempts", type=int, default=3, help="Give up on a task after this many claims.")
+    p.add_argument("--poll_s", type=float, default=10.0, help="Sleep between polls while other workers hold claims.")
+    p.add_argument("--max_tasks", type=int, default=0, help="If >0, exit after this many tasks (debug).")
+    p.add_argument(
+        "--cpu_budget",
+        type=int,
+        default=None,
+        help="Cores to use on this machine (default: all available), split across --n_procs.",
+    )
+    return p.parse_args()
+
+
+def _heartbeat_loop(queue_path: str, task_id: int, worker: str, every_s: float, stop: threading.Event) -> None:
+    # SQLite connections are not shared across threads; use a dedicated one.
+    q = WorkQueue(queue_path)
+    try:
+        while not stop.wait(every_s):
+            if not q.heartbeat(task_id, worker):
+                print(f"[{worker}] ⚠ lost claim on task {task_id}")
+                return
+    finally:
+        q.close()
+
+
+def run_worker(
+    queue_path: str,
+    worker: str,
+    *,
+    heartbeat_s: float,
+    stale_after_s: float,
+    max_attempts: int,
+    poll_s: float,
+    max_tasks: int = 0,
+    threads: Optional[int] = None,
+) -> int:
+    """Claim and execute tasks until the queue is drained. Returns tasks completed."""
+    if threads is not None:
+        apply_thread_budget(threads)
+
+    q = WorkQueue(queue_path, stale_after_s=stale_after_s, max_attempts=max_attempts)
+    n_done = 0
+
+    try:
+        while max_tasks <= 0 or n_done < max_tasks:
+            task = q.claim(worker)
+            if task is None:
+                if not q.has_open_tasks():
+                    break
+                # Other workers still hold claims; stale ones return to the
+                # pending state on a later claim attempt.
+                time.sleep(poll_s)
+                continue
+
+            idx = task["assignment_idx"]
+            print(
+                f"[{worker}] task {task['id']}: {task['runner']} {task['dataset']} {task['log_type']} "
+                f"{task['model']} idx={idx} outer={task['outer_i']} (attempt {task['attempts'] + 1})"
+            )
+
+            stop = threading.Event()
+            hb = threading.Thread(
+                target=_heartbeat_loop,
+                args=(queue_path, task["id"], worker, heartbeat_s, stop),
+                daemon=True,
+            )
+            hb.start()
+            try:
+                module = importlib.import_module(RUNNERS[task["runner"]])
+                row = module.run_queue_task(task["payload"])
+            except Exception:
+                err = traceback.format_exc()
+                print(f"[{worker}] ⚠ task {task['id']} failed:\n{err}")
+                q.fail(task["id"], worker, err)
+                continue
+            finally:
+                stop.set()
+                hb.join()
+
+            q.complete(task["id"], worker, row)
+            n_done += 1
+    finally:
+        q.close()
+
+    print(f"[{worker}] done after {n_done} tasks")
+    return n_done
+
+
+def _worker_main(queue_path: str, worker: str, kwargs: dict) -> None:
+    run_worker(queue_path, worker, **kwargs)
+
+
+def main():
+    """Start ``--n_procs`` local worker processes against one queue."""
+    args = parse_args()
+    prefix = args.worker_id or socket.gethostname()
+    kwargs = dict(
+        heartbeat_s=args.heartbeat_s,
+        stale_after_s=args.stale_after_s,
+        max_attempts=args.max_attempts,
+        poll_s=args.poll_s,
+        max_tasks=args.max_tasks,
+    )
+
+    n_procs = max(1, int(args.n_procs))
+    budget = plan_budget(n_procs, cpu_budget=args.cpu_budget)
+    kwargs["threads"] = budget.threads_per_proc
+    print(f"CPU budget  : {budget.total_cores} cores = {budget.n_procs} procs x {budget.threads_per_proc} threads")
+
+    if n_procs == 1:
+        run_worker(args.queue, f"{prefix}:{os.getpid()}", **kwargs)
+        return
+
+    procs = []
+    for i in range(n_procs):
+        proc = mp.Process(target=_worker_main, args=(args.queue, f"{prefix}:{os.getpid()}:{i}", kwargs))
+        proc.start()
+        procs.append(proc)
+    for proc in procs:
+        proc.join()
+
+
+if __name__ == "__main__":
+    main()
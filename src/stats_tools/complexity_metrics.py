@@ -12,7 +12,6 @@ from pathlib import Path
 from textwrap import shorten
 from typing import Any, Optional
 
-import matplotlib.pyplot as plt
 import numpy as np
 from scipy.spatial.distance import jensenshannon
 
@@ -9,7 +9,6 @@ from itertools import combinations
 from collections import Counter
 
 import numpy as np
-import matplotlib.pyplot as plt
 from scipy.spatial.distance import jensenshannon
 
 from src.core.stats.data_catalog import analysis_actors, get_log_path
@@ -145,6 +144,8 @@ def plot_diff(rows, title: str = "Top 1-gram frequency differences"):
     Positive values indicate higher relative frequency in the first file and
     negative values indicate enrichment in the second file.
     """
+    import matplotlib.pyplot as plt
+
     if not rows:
         print("No differences to plot.")
         return
@@ -191,6 +192,8 @@ def plot_two_histograms(
     The plotting subset is derived from the pooled vocabulary and can be sorted
     either by contrast or by prominence in one or both files.
     """
+    import matplotlib.pyplot as plt
+
     pooled = cnt1 + cnt2
     vocab = [tok for tok, c in pooled.items() if c >= min_count]
 